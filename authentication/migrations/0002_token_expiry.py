@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:53
+
+import authentication.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resetpasswordm',
+            name='expires_at',
+            field=models.DateTimeField(default=authentication.models.reset_token_expiry),
+        ),
+        migrations.AddIndex(
+            model_name='resetpasswordm',
+            index=models.Index(fields=['expires_at'], name='reset_password_expiry'),
+        ),
+    ]
@@ -1,5 +1,7 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 import uuid
 
 class UserM(AbstractUser):
@@ -9,10 +11,20 @@ class UserM(AbstractUser):
         swappable = "AUTH_USER_MODEL"
 
 
+def reset_token_expiry():
+    return timezone.now() + settings.RESET_PASSWORD_TTL
+
+
 class ResetPasswordM(models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, unique=True)
     is_used = models.BooleanField(default=False)
     user = models.ForeignKey(UserM, on_delete=models.CASCADE)
+    # Using the token also ends it, so every row past ``expires_at`` can be purged.
+    expires_at = models.DateTimeField(default=reset_token_expiry)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Not partial on ``is_used=False``: using a token sets ``expires_at``, and the purge needs used rows too.
+        indexes = [models.Index(fields=['expires_at'], name='reset_password_expiry')]
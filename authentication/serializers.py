@@ -1,9 +1,11 @@
 from authentication.models import UserM
 from rest_framework import serializers
+from . import tokens
 from .models import ResetPasswordM
 from django.core.exceptions import ObjectDoesNotExist
 from .utils import send_password_reset_email
 from django.db import transaction
+from django.utils import timezone
 from rest_framework.response import Response
 
 class LoginSerializer(serializers.Serializer):
@@ -71,6 +73,8 @@ class ResetPasswordConfSerializer(serializers.Serializer):
             pass_reset_obj = ResetPasswordM.objects.get(uuid=uuid)
             if pass_reset_obj.is_used:
                 raise serializers.ValidationError('This reset token is already used.')
+            if pass_reset_obj.expires_at <= timezone.now():
+                raise serializers.ValidationError('This reset token has expired.')
             attrs['reset_obj'] = pass_reset_obj
             return attrs
         except ObjectDoesNotExist:
@@ -84,4 +88,6 @@ class ResetPasswordConfSerializer(serializers.Serializer):
             user.set_password(password)
             user.save()
             reset_obj.is_used = True
-            reset_obj.save()
\ No newline at end of file
+            reset_obj.expires_at = timezone.now()
+            reset_obj.save()
+        tokens.revoke_user(user)
\ No newline at end of file
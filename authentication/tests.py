@@ -1,9 +1,18 @@
+from datetime import timedelta
+from unittest import mock
+
 from django.contrib.auth.models import User
+from django.core.cache import caches
 from django.test import TestCase
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from authentication import tokens
+from authentication.models import ResetPasswordM, UserM
+
 
 class AuthenticationTests(TestCase):
     def setUp(self):
@@ -135,3 +144,111 @@ class AuthenticationTests(TestCase):
         response = self.client.post('/api/auth/refresh')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+
+
+class ResetPasswordExpiryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserM.objects.create_user(username='reset', email='reset@example.com', password='old-pass')
+
+    def _confirm(self, token):
+        return self.client.post('/api/auth/reset-password-conf/', {'token': str(token), 'password': 'new-pass'},
+                                format='json')
+
+    def test_expired_and_used_tokens_are_rejected(self):
+        expired = ResetPasswordM.objects.create(user=self.user, expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self._confirm(expired.uuid).status_code, status.HTTP_400_BAD_REQUEST)
+
+        token = ResetPasswordM.objects.create(user=self.user)
+        self.assertGreater(token.expires_at, timezone.now() + timedelta(minutes=59))
+        self.assertEqual(self._confirm(token.uuid).status_code, status.HTTP_200_OK)
+        token.refresh_from_db()
+        self.assertTrue(token.is_used)
+        self.assertLessEqual(token.expires_at, timezone.now())
+        self.assertEqual(self._confirm(token.uuid).status_code, status.HTTP_400_BAD_REQUEST)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new-pass'))
+
+
+class RefreshTokenFamilyTests(TestCase):
+    def setUp(self):
+        caches['tokens'].clear()
+        self.user = UserM.objects.create_user(username='family', email='family@example.com', password='pass-1234')
+
+    def _login(self):
+        client = APIClient()
+        response = client.post('/api/auth/login', {'email': 'family@example.com', 'password': 'pass-1234'},
+                               format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return client
+
+    def _refresh(self, raw):
+        client = APIClient()
+        client.cookies['refresh_token'] = raw
+        response = client.post('/api/auth/refresh')
+        return response.status_code, response.cookies.get('refresh_token')
+
+    def test_rotation_and_reuse_detection(self):
+        client = self._login()
+        first = client.cookies['refresh_token'].value
+        code, cookie = self._refresh(first)
+        self.assertEqual(code, status.HTTP_200_OK)
+        second = cookie.value
+        self.assertNotEqual(second, first)
+        self.assertEqual(self._refresh(second)[0], status.HTTP_200_OK)
+
+        # Outside the grace period a replaced token revokes the whole family.
+        with self.settings(REFRESH_REUSE_GRACE=-1):
+            self.assertEqual(self._refresh(second)[0], status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._refresh(second)[0], status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._refresh(first)[0], status.HTTP_401_UNAUTHORIZED)
+
+    def test_concurrent_refresh_gets_the_same_token(self):
+        raw = self._login().cookies['refresh_token'].value
+        _, a = self._refresh(raw)
+        code, b = self._refresh(raw)
+        self.assertEqual(code, status.HTTP_200_OK)
+        self.assertEqual(RefreshToken(a.value)['jti'], RefreshToken(b.value)['jti'])
+        self.assertEqual(self._refresh(b.value)[0], status.HTTP_200_OK)
+
+    def test_racing_refreshes_get_the_same_token(self):
+        raw = RefreshToken(self._login().cookies['refresh_token'].value)
+        key = f'token-family:{raw["family"]}'
+        cache = caches['tokens']
+        before = cache.get(key)
+        first = tokens.rotate(str(raw))
+        # The second refresh read the family before the first one wrote it.
+        with mock.patch.object(cache, 'get_many', return_value={key: before}):
+            second = tokens.rotate(str(raw))
+        self.assertEqual(first['jti'], second['jti'])
+        self.assertEqual(cache.get(key)['jti'], first['jti'])
+        self.assertEqual(self._refresh(str(second))[0], status.HTTP_200_OK)
+
+    def test_revocations_survive_a_full_cache(self):
+        revoked = tokens.issue(self.user)
+        tokens.revoke(str(revoked))
+        # Enough responses to evict anything from the default cache, and unrelated token state.
+        for i in range(400):
+            caches['default'].set(f'response-{i}', b'x')
+        other = caches['tokens']
+        with mock.patch.object(other, '_max_entries', 100):
+            for i in range(400):
+                other.set(f'token-family:other-{i}', {'jti': str(i)})
+        with self.assertRaises(TokenError):
+            tokens.rotate(str(revoked))
+
+    def test_logout_and_logout_everywhere(self):
+        client = self._login()
+        other = self._login().cookies['refresh_token'].value
+        raw = client.cookies['refresh_token'].value
+        self.assertEqual(client.post('/api/auth/logout').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self._refresh(raw)[0], status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._refresh(other)[0], status.HTTP_200_OK)
+
+        # Tokens issued before the logout, within the same second, would stay valid.
+        client = self._login()
+        token = RefreshToken(client.cookies['refresh_token'].value)
+        token['iat'] -= 5
+        self.assertEqual(client.post('/api/auth/logout-all').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self._refresh(str(token))[0], status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._refresh(self._login().cookies['refresh_token'].value)[0], status.HTTP_200_OK)
@@ -0,0 +1,125 @@
+"""
+Refresh token families.
+
+Every login starts a family: its refresh tokens carry a ``family`` claim, and
+each refresh rotates the token, so only the newest one in a family is valid.
+The cache keeps one small entry per family — the jti of its newest token, the
+one it replaced and when — and one entry per user that has logged out
+everywhere. Both expire with the refresh token lifetime, so nothing grows
+without bound and a refresh costs one ``get_many`` and one ``set``, with no
+table lookups. These entries live in their own cache (``TOKEN_FAMILY_CACHE_ALIAS``,
+``tokens``), which must never evict: a dropped revocation would let a revoked
+token in again as an unknown family.
+
+Presenting a replaced token means it was copied: the family is revoked and
+whoever holds its newest token has to log in again. The one exception is the
+token replaced less than ``REFRESH_REUSE_GRACE`` seconds ago, which is what
+two tabs refreshing at once send; it is answered with the newest token again.
+The jti of a replacement is derived from the family and the jti it replaces,
+so two refreshes racing past the cache check still hand out the same token
+and write the same family entry.
+
+Families the cache does not know (tokens from before a cache restart or from
+before families existed) are accepted and tracked from then on: losing the
+cache must not log everybody out. Access tokens are not checked and stay
+valid for their 15 minutes after a logout.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+FAMILY_CLAIM = 'family'
+REVOKED = 'revoked'
+
+
+def _cache():
+    return caches[getattr(settings, 'TOKEN_FAMILY_CACHE_ALIAS', 'tokens')]
+
+
+def _reuse_grace():
+    return getattr(settings, 'REFRESH_REUSE_GRACE', 10)
+
+
+def _lifetime():
+    return int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+
+
+def _family_key(family):
+    return f'token-family:{family}'
+
+
+def _user_key(user_id):
+    return f'token-user:{user_id}'
+
+
+def issue(user):
+    """A refresh token starting a new family for ``user``."""
+    refresh = RefreshToken.for_user(user)
+    refresh[FAMILY_CLAIM] = refresh[api_settings.JTI_CLAIM]
+    _cache().set(_family_key(refresh[FAMILY_CLAIM]), {'jti': refresh[api_settings.JTI_CLAIM]}, _lifetime())
+    return refresh
+
+
+def rotate(raw_token):
+    """
+    Validate ``raw_token`` and return the refresh token replacing it. Raises
+    ``TokenError`` if it is invalid, expired, revoked or was already replaced.
+    """
+    token = RefreshToken(raw_token)
+    jti = token[api_settings.JTI_CLAIM]
+    user_id = token[api_settings.USER_ID_CLAIM]
+    family = token.get(FAMILY_CLAIM, jti)
+    family_key, user_key = _family_key(family), _user_key(user_id)
+    cache = _cache()
+    found = cache.get_many([family_key, user_key])
+    if token['iat'] < found.get(user_key, 0):
+        raise TokenError('Token was revoked')
+    state = found.get(family_key)
+    if state == REVOKED:
+        raise TokenError('Token was revoked')
+
+    now = time.time()
+    if state is not None and state['jti'] != jti:
+        if state.get('previous') == jti and now - state['rotated_at'] <= _reuse_grace():
+            # A concurrent refresh of the same token: hand out the current one again.
+            return _token(user_id, family, state['jti'])
+        cache.set(family_key, REVOKED, _lifetime())
+        raise TokenError('Token was already used')
+
+    refresh = _token(user_id, family, _successor(family, jti))
+    cache.set(family_key, {'jti': refresh[api_settings.JTI_CLAIM], 'previous': jti, 'rotated_at': now}, _lifetime())
+    return refresh
+
+
+def _successor(family, jti):
+    """The jti of the token replacing ``jti``: the same for every rotation of it."""
+    return uuid.uuid5(uuid.NAMESPACE_URL, f'{_family_key(family)}:{jti}').hex
+
+
+def _token(user_id, family, jti):
+    refresh = RefreshToken()
+    refresh[api_settings.USER_ID_CLAIM] = user_id
+    refresh[FAMILY_CLAIM] = family
+    refresh[api_settings.JTI_CLAIM] = jti
+    return refresh
+
+
+def revoke(raw_token):
+    """End the family of ``raw_token``; invalid tokens are ignored."""
+    try:
+        token = RefreshToken(raw_token)
+    except TokenError:
+        return
+    family = token.get(FAMILY_CLAIM, token[api_settings.JTI_CLAIM])
+    _cache().set(_family_key(family), REVOKED, _lifetime())
+
+
+def revoke_user(user):
+    """End every refresh token issued to ``user`` so far."""
+    # ``iat`` has whole seconds: tokens issued later in the current second stay valid.
+    _cache().set(_user_key(user.pk), int(time.time()), _lifetime())
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import LoginView, LogoutView, MeView, TokenRefreshView, RegisterView, ChangePasswordView, GoogleLoginView, ResetPasswordViewSet, ResetPasswordConfViewSet
+from .views import LoginView, LogoutView, LogoutAllView, MeView, TokenRefreshView, RegisterView, ChangePasswordView, GoogleLoginView, ResetPasswordViewSet, ResetPasswordConfViewSet
 
 router = DefaultRouter()
 router.register(r'reset-password', ResetPasswordViewSet)
@@ -12,6 +12,7 @@ urlpatterns = [
     path('register', RegisterView.as_view(), name='auth-register'),
     path('change-password', ChangePasswordView.as_view(), name='auth-change-password'),
     path('logout', LogoutView.as_view(), name='auth-logout'),
+    path('logout-all', LogoutAllView.as_view(), name='auth-logout-all'),
     path('refresh', TokenRefreshView.as_view(), name='auth-token-refresh'),
     path('me', MeView.as_view(), name='auth-me'),
     path('google/', GoogleLoginView.as_view(), name='google-login'),
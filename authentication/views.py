@@ -8,6 +8,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
+from . import tokens
 from .serializers import LoginSerializer, UserSerializer, RegisterSerializer, ResetPasswordSerializer, \
     ResetPasswordConfSerializer
 from google.oauth2 import id_token
@@ -75,7 +76,7 @@ class LoginView(APIView):
                 status=status.HTTP_401_UNAUTHORIZED,
             )
 
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens.issue(user)
         response = Response(UserSerializer(user).data, status=status.HTTP_200_OK)
         _set_token_cookies(response, refresh)
         return response
@@ -105,7 +106,7 @@ class RegisterView(APIView):
             )
             user.first_name = name
             user.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = tokens.issue(user)
             response = Response(UserSerializer(user).data, status=status.HTTP_200_OK)
             _set_token_cookies(response, refresh)
             return response
@@ -127,13 +128,31 @@ class ChangePasswordView(APIView):
 
         user.set_password(new_password)
         user.save()
-        return Response({'message': 'Password changed successfully.'})
+        # Sign out every other session; this one continues with a new family.
+        tokens.revoke_user(user)
+        response = Response({'message': 'Password changed successfully.'})
+        _set_token_cookies(response, tokens.issue(user))
+        return response
         
 
 class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        raw_refresh = request.COOKIES.get(REFRESH_COOKIE)
+        if raw_refresh:
+            tokens.revoke(raw_refresh)
+        response = Response(status=status.HTTP_204_NO_CONTENT)
+        response.delete_cookie(ACCESS_COOKIE)
+        response.delete_cookie(REFRESH_COOKIE)
+        return response
+
+
+class LogoutAllView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        tokens.revoke_user(request.user)
         response = Response(status=status.HTTP_204_NO_CONTENT)
         response.delete_cookie(ACCESS_COOKIE)
         response.delete_cookie(REFRESH_COOKIE)
@@ -152,7 +171,7 @@ class TokenRefreshView(APIView):
             )
 
         try:
-            refresh = RefreshToken(raw_refresh)
+            refresh = tokens.rotate(raw_refresh)
         except (InvalidToken, TokenError):
             return Response(
                 {'message': 'Invalid or expired refresh token.'},
@@ -170,6 +189,16 @@ class MeView(APIView):
     def get(self, request):
         return Response(UserSerializer(request.user).data)
 
+    def delete(self, request):
+        # Imported here: ``projects`` depends on this app's models.
+        from projects.deletion import delete_account
+        delete_account(request.user)
+        tokens.revoke_user(request.user)
+        response = Response(status=status.HTTP_204_NO_CONTENT)
+        response.delete_cookie(ACCESS_COOKIE)
+        response.delete_cookie(REFRESH_COOKIE)
+        return response
+
 
 class GoogleLoginView(APIView):
     permission_classes = (AllowAny,)
@@ -181,7 +210,7 @@ class GoogleLoginView(APIView):
             with transaction.atomic():
                 email = id_info['email']
                 user, _ = UserM.objects.get_or_create(email=email, username=email, is_google_user=True)
-                refresh = RefreshToken.for_user(user)
+                refresh = tokens.issue(user)
                 response = Response(UserSerializer(user).data, status=status.HTTP_200_OK)
                 _set_token_cookies(response, refresh)
                 return response
@@ -0,0 +1,296 @@
+"""Pure-asyncio HTTP/1.1 load driver.
+
+The driver keeps one keep-alive connection per virtual user and replays the
+same request mix the editor produces: login, token refresh, project list,
+autosave PUT, shared-project view with its asset fetches and a model upload.
+Only the standard library is used so the numbers are not skewed by a third
+party client.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+from .seed import BENCH_PASSWORD, fake_data_url, make_project_document
+
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 client with a cookie jar."""
+
+    def __init__(self, base_url, timeout=30.0):
+        parts = urlsplit(base_url)
+        if parts.scheme != 'http':
+            raise ValueError('Only plain http:// targets are supported.')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.cookies = {}
+        self._reader = None
+        self._writer = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        """Send one request and return ``(status, headers, body_bytes)``."""
+        payload = b''
+        lines = [
+            f'{method} {self.prefix}{path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Connection: keep-alive',
+            'Accept: application/json',
+        ]
+        if body is not None:
+            payload = json.dumps(body).encode()
+            lines.append('Content-Type: application/json')
+        lines.append(f'Content-Length: {len(payload)}')
+        if self.cookies:
+            lines.append('Cookie: ' + '; '.join(f'{k}={v}' for k, v in self.cookies.items()))
+        for key, value in (headers or {}).items():
+            lines.append(f'{key}: {value}')
+        raw = ('\r\n'.join(lines) + '\r\n\r\n').encode() + payload
+
+        for attempt in (0, 1):
+            if self._writer is None:
+                await self._connect()
+            try:
+                self._writer.write(raw)
+                await self._writer.drain()
+                return await asyncio.wait_for(self._read_response(method), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # The server dropped an idle keep-alive connection; retry once.
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _read_response(self, method):
+        status_line = await self._reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        headers = {}
+        set_cookies = []
+        while True:
+            line = await self._reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            key, value = key.strip().lower(), value.strip()
+            if key == 'set-cookie':
+                set_cookies.append(value)
+            headers[key] = value
+
+        if method == 'HEAD' or status in (204, 304):
+            body = b''
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await self._read_chunked()
+        elif 'content-length' in headers:
+            body = await self._reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self._reader.read()
+            await self.close()
+
+        for value in set_cookies:
+            for name, morsel in SimpleCookie(value).items():
+                if morsel.value:
+                    self.cookies[name] = morsel.value
+                else:
+                    self.cookies.pop(name, None)
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, headers, body
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self._reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            if size == 0:
+                await self._reader.readuntil(b'\r\n')
+                return b''.join(chunks)
+            chunks.append(await self._reader.readexactly(size))
+            await self._reader.readexactly(2)
+
+
+class Recorder:
+    """Collects latency samples per endpoint label."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.bytes = defaultdict(int)
+        # 429s: the server's throttles answered, not the endpoint, so they stay out of the latencies.
+        self.throttled = defaultdict(int)
+
+    def add(self, label, elapsed, ok, size):
+        self.samples[label].append(elapsed)
+        self.bytes[label] += size
+        if not ok:
+            self.errors[label] += 1
+
+    def throttle(self, label):
+        self.throttled[label] += 1
+
+
+def percentile(sorted_values, q):
+    """Linear-interpolated percentile of an already sorted list (``q`` in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(recorder, wall_time):
+    endpoints = {}
+    for label in sorted(set(recorder.samples) | set(recorder.throttled)):
+        values = sorted(recorder.samples.get(label, ()))
+        endpoints[label] = {
+            'requests': len(values),
+            'errors': recorder.errors[label],
+            'throttled': recorder.throttled[label],
+            'rps': round(len(values) / wall_time, 2) if wall_time else 0.0,
+            'bytes_received': recorder.bytes[label],
+            'mean_ms': round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+            'p50_ms': round(percentile(values, 50) * 1000, 3),
+            'p95_ms': round(percentile(values, 95) * 1000, 3),
+            'p99_ms': round(percentile(values, 99) * 1000, 3),
+            'max_ms': round(values[-1] * 1000, 3) if values else 0.0,
+        }
+    total = sum(e['requests'] for e in endpoints.values())
+    return {
+        'wall_time_s': round(wall_time, 3),
+        'total_requests': total,
+        'total_errors': sum(e['errors'] for e in endpoints.values()),
+        'total_throttled': sum(e['throttled'] for e in endpoints.values()),
+        'rps': round(total / wall_time, 2) if wall_time else 0.0,
+        'endpoints': endpoints,
+    }
+
+
+class VirtualUser:
+    """One editor session replaying the weighted request mix."""
+
+    # (scenario, weight) – roughly what the editor does in a working session.
+    MIX = [
+        ('list_projects', 20),
+        ('autosave', 40),
+        ('shared_view', 30),
+        ('refresh', 5),
+        ('upload_model', 5),
+    ]
+
+    def __init__(self, base_url, account, recorder, rng, asset_bytes, steps_per_project):
+        self.conn = Connection(base_url)
+        self.account = account
+        self.recorder = recorder
+        self.rng = rng
+        self.asset_bytes = asset_bytes
+        self.steps_per_project = steps_per_project
+
+    async def call(self, label, method, path, body=None, expect=(200,)):
+        started = time.perf_counter()
+        try:
+            status, _, payload = await self.conn.request(method, path, body)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            self.recorder.add(label, time.perf_counter() - started, False, 0)
+            return None
+        if status == 429:
+            self.recorder.throttle(label)
+            return None
+        self.recorder.add(label, time.perf_counter() - started, status in expect, len(payload))
+        if status not in expect:
+            return None
+        return payload
+
+    async def login(self):
+        await self.call('login', 'POST', '/api/auth/login',
+                        {'email': self.account.email, 'password': BENCH_PASSWORD})
+
+    async def list_projects(self):
+        await self.call('project_list', 'GET', '/api/projects/')
+
+    async def refresh(self):
+        await self.call('refresh', 'POST', '/api/auth/refresh')
+
+    async def autosave(self):
+        project_id = self.rng.choice(self.account.project_ids)
+        document = make_project_document(
+            self.steps_per_project,
+            self.account.element_ids[0] if self.account.element_ids else None,
+            self.account.model_ids[0] if self.account.model_ids else None,
+            self.rng,
+        )
+        body = {
+            'name': f'Bench project {project_id}',
+            'projectType': 'builder',
+            'projectModelUrl': None,
+            'steps': document['steps'],
+            'connections': document['connections'],
+            'guide': document['guide'],
+            'nodePositions': document['node_positions'],
+        }
+        await self.call('project_autosave', 'PUT', f'/api/projects/{project_id}/', body)
+
+    async def shared_view(self):
+        token = self.rng.choice(self.account.share_tokens)
+        await self.call('shared_project', 'GET', f'/api/shared/{token}')
+        for element_id in self.account.element_ids:
+            await self.call('shared_element_asset', 'GET',
+                            f'/api/elements/{element_id}/public_element/?project_uuid={token}')
+        for model_id in self.account.model_ids:
+            await self.call('shared_model_asset', 'GET',
+                            f'/api/models/{model_id}/public_model/?project_uuid={token}')
+
+    async def upload_model(self):
+        body = {
+            'name': 'Bench upload',
+            'model_file_name': 'upload.glb',
+            'model_scale': 1.0,
+            'model_data_url': fake_data_url(self.asset_bytes, rng=self.rng),
+        }
+        payload = await self.call('model_upload', 'POST', '/api/models/', body, expect=(201,))
+        if payload:
+            # Keep the per-user upload quota from tripping on long runs.
+            model_id = json.loads(payload)['id']
+            await self.call('model_delete', 'DELETE', f'/api/models/{model_id}/', expect=(204,))
+
+    async def run(self, deadline, iterations):
+        scenarios = [name for name, _ in self.MIX]
+        weights = [weight for _, weight in self.MIX]
+        try:
+            await self.login()
+            done = 0
+            while time.perf_counter() < deadline and (iterations is None or done < iterations):
+                scenario = self.rng.choices(scenarios, weights)[0]
+                await getattr(self, scenario)()
+                done += 1
+        finally:
+            await self.conn.close()
+
+
+async def run_load(base_url, accounts, concurrency, duration, iterations=None,
+                   asset_bytes=64 * 1024, steps_per_project=40, seed=0):
+    """Drive ``concurrency`` virtual users for ``duration`` seconds and return the report."""
+    recorder = Recorder()
+    master = random.Random(seed)
+    users = [
+        VirtualUser(base_url, accounts[i % len(accounts)], recorder,
+                    random.Random(master.random()), asset_bytes, steps_per_project)
+        for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(user.run(deadline, iterations) for user in users))
+    return summarize(recorder, time.perf_counter() - started)
@@ -0,0 +1,68 @@
+import base64
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from authentication.models import UserM
+from benchmarks.seed import BENCH_EMAIL_DOMAIN, make_png
+from projects.atlas import get_atlas
+from projects.models import Created3DModelM, Project
+from projects.serializers import Created3dModelSerializer
+from projects.views import ATLAS_PROJECT_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Compare requests and bytes for per-element textures against one texture atlas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--elements', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # Everything is created inside a transaction that is rolled back at the end.
+        with transaction.atomic():
+            user = UserM.objects.create(username=f'atlas@{BENCH_EMAIL_DOMAIN}', email=f'atlas@{BENCH_EMAIL_DOMAIN}')
+            elements = Created3DModelM.objects.bulk_create([
+                Created3DModelM(
+                    owner=user, name=f'Label {i}', text=f'Label {i}', color='#ffffff',
+                    texture_data_url='data:image/png;base64,' + base64.b64encode(
+                        make_png(rng.choice([128, 256, 512]), rng.choice([32, 64, 128]), rng)).decode(),
+                )
+                for i in range(options['elements'])
+            ])
+            steps = [{'id': f'step-{i}', 'custom3dElementId': e.pk} for i, e in enumerate(elements)]
+            project = Project.objects.create(owner=user, name='Atlas bench', steps=steps)
+            row = Project.objects.values(*ATLAS_PROJECT_FIELDS).get(pk=project.pk)
+
+            renderer = JSONRenderer()
+            per_element = sum(len(renderer.render(Created3dModelSerializer(e).data)) for e in elements)
+
+            # Build in this thread, as requests with ``BACKGROUND_WORKERS = 0`` do.
+            with override_settings(BACKGROUND_WORKERS=0):
+                started = time.perf_counter()
+                manifest, _ = get_atlas(row)
+                cold = time.perf_counter() - started
+                started = time.perf_counter()
+                get_atlas(row)
+                warm = time.perf_counter() - started
+
+            atlas_bytes = len(renderer.render(manifest)) + sum(a['bytes'] for a in manifest['atlases'])
+            report = {
+                'elements': len(elements),
+                'per_element': {'requests': len(elements), 'bytes': per_element},
+                'atlas': {
+                    'requests': 1 + len(manifest['atlases']),
+                    'bytes': atlas_bytes,
+                    'atlases': [f'{a["width"]}x{a["height"]}' for a in manifest['atlases']],
+                    'build_ms': round(cold * 1000, 1),
+                    'cached_ms': round(warm * 1000, 2),
+                },
+            }
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps(report, indent=2))
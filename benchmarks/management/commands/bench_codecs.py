@@ -0,0 +1,78 @@
+import io
+import json
+import random
+import time
+import zlib
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks.seed import fake_data_url, make_project_document
+from threeddocs.parsers import CBORParser, MessagePackParser, ORJSONParser
+from threeddocs.renderers import CBORRenderer, MessagePackRenderer, ORJSONRenderer
+
+CODECS = [
+    ('json (drf)', JSONRenderer, JSONParser),
+    ('json (orjson)', ORJSONRenderer, ORJSONParser),
+    ('msgpack', MessagePackRenderer, MessagePackParser),
+    ('cbor', CBORRenderer, CBORParser),
+]
+
+
+def _best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def build_payload(steps, embedded_kb, seed=0):
+    """A serialized ``Project`` shaped exactly like ``ProjectSerializer`` output."""
+    rng = random.Random(seed)
+    document = make_project_document(steps, element_id=1, model_id=1, rng=rng)
+    if embedded_kb:
+        for step in document['steps'][::10]:
+            step['customModelUrl'] = fake_data_url(embedded_kb * 1024, rng=rng)
+    return {
+        'id': 1,
+        'name': 'Codec benchmark',
+        'projectType': 'builder',
+        'projectModelUrl': None,
+        'steps': document['steps'],
+        'connections': document['connections'],
+        'guide': document['guide'],
+        'nodePositions': document['node_positions'],
+        'lastModified': 1700000000000,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Measure encode/decode time and wire size of the API codecs on a large Project payload.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--steps', type=int, default=2000)
+        parser.add_argument('--embedded-kb', type=int, default=0,
+                            help='Attach a base64 data URL of this size to every 10th step.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        payload = build_payload(options['steps'], options['embedded_kb'])
+        results = {}
+        for name, renderer_class, parser_class in CODECS:
+            renderer, parser = renderer_class(), parser_class()
+            body = renderer.render(payload)
+            assert parser.parse(io.BytesIO(body)) == payload, name
+            results[name] = {
+                'encode_ms': round(_best_of(lambda: renderer.render(payload), options['repeat']) * 1000, 3),
+                'decode_ms': round(_best_of(lambda: parser.parse(io.BytesIO(body)), options['repeat']) * 1000, 3),
+                'bytes': len(body),
+                'gzip_bytes': len(zlib.compress(body, 6)),
+            }
+        self.stdout.write(json.dumps({
+            'steps': options['steps'],
+            'embedded_kb': options['embedded_kb'],
+            'codecs': results,
+        }, indent=2))
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import UserM
+from benchmarks.seed import BENCH_EMAIL_DOMAIN
+from projects import collab, storage
+
+
+class Editor:
+    """One simulated WebSocket client driving ``projects.collab.application`` in-process."""
+
+    def __init__(self, project_id, token):
+        self.inbox = asyncio.Queue()
+        self.received = []
+        self.bytes = 0
+        self.closed = asyncio.Event()
+        self.accepted = asyncio.Event()
+        scope = {
+            'type': 'websocket', 'path': f'/ws/projects/{project_id}/',
+            'headers': [(b'cookie', f'{settings.ACCESS_TOKEN_COOKIE}={token}'.encode())],
+        }
+        self.inbox.put_nowait({'type': 'websocket.connect'})
+        self.task = asyncio.create_task(collab.application(scope, self.inbox.get, self._send))
+
+    async def _send(self, event):
+        if event['type'] == 'websocket.accept':
+            self.accepted.set()
+        elif event['type'] == 'websocket.send':
+            self.bytes += len(event['text'])
+            self.received.append((time.perf_counter(), json.loads(event['text'])))
+        elif event['type'] == 'websocket.close':
+            self.closed.set()
+
+    def send(self, op):
+        self.inbox.put_nowait({'type': 'websocket.receive', 'text': json.dumps(op)})
+
+    async def close(self):
+        self.inbox.put_nowait({'type': 'websocket.disconnect', 'code': 1000})
+        await self.task
+
+
+class Command(BaseCommand):
+    help = 'Simulate concurrent editors on one project over the collaboration WebSocket.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--editors', type=int, default=50)
+        parser.add_argument('--seconds', type=float, default=3.0)
+        parser.add_argument('--move-rate', type=int, default=60, help='node.move messages per editor per second')
+        parser.add_argument('--edit-rate', type=float, default=1.0, help='step.update messages per editor per second')
+
+    def handle(self, *args, **options):
+        # Everything is created inside a transaction that is rolled back at the end.
+        with transaction.atomic():
+            owner = UserM.objects.create(username=f'collab@{BENCH_EMAIL_DOMAIN}', email=f'collab@{BENCH_EMAIL_DOMAIN}')
+            editors = UserM.objects.bulk_create([
+                UserM(username=f'collab-{i}@{BENCH_EMAIL_DOMAIN}', email=f'collab-{i}@{BENCH_EMAIL_DOMAIN}')
+                for i in range(options['editors'] - 1)
+            ])
+            project = storage.create(
+                [{'id': f'step-{i}', 'title': f'Step {i}'} for i in range(options['editors'])], [],
+                owner=owner, name='Collab bench',
+            )
+            project.editors.add(*editors)
+            tokens = [str(AccessToken.for_user(user)) for user in [owner, *editors]]
+            report = async_to_sync(self.simulate)(project.pk, tokens, options)
+            project.refresh_from_db()
+            steps, _ = storage.documents(project)
+            report['persisted'] = {
+                'storage': project.storage,
+                'node_positions': len(project.node_positions),
+                'steps_edited': sum(1 for step in steps if step['title'].startswith('edit')),
+            }
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    async def simulate(self, project_id, tokens, options):
+        clients = [Editor(project_id, token) for token in tokens]
+        await asyncio.wait_for(asyncio.gather(*(c.accepted.wait() for c in clients)), timeout=30)
+        sent_at, moves, edits = {}, 0, 0
+        started = time.perf_counter()
+        interval = 1 / options['move_rate']
+        edit_every = max(1, round(options['move_rate'] / options['edit_rate'])) if options['edit_rate'] else 0
+        tick = 0
+        while time.perf_counter() - started < options['seconds']:
+            for index, client in enumerate(clients):
+                client.send({'type': 'node.move', 'node': f'step-{index}', 'position': {'x': tick, 'y': index}})
+                moves += 1
+                if edit_every and (tick + index) % edit_every == 0:
+                    title = f'edit {index}:{tick}'
+                    sent_at[title] = time.perf_counter()
+                    client.send({'type': 'step.update', 'step': f'step-{index}', 'fields': {'title': title}})
+                    edits += 1
+            tick += 1
+            await asyncio.sleep(interval)
+        await asyncio.sleep(2 * settings.COLLAB_TICK)
+        elapsed = time.perf_counter() - started
+        for client in clients:
+            await client.close()
+
+        latencies, broadcasts, delivered = [], 0, 0
+        for client in clients:
+            for received_at, message in client.received:
+                delivered += 1
+                if message['type'] == 'nodes.moved':
+                    broadcasts += 1
+                elif message['type'] == 'step.updated':
+                    latencies.append(received_at - sent_at[message['fields']['title']])
+        latencies.sort()
+        return {
+            'editors': len(clients),
+            'seconds': round(elapsed, 2),
+            'sent': {'node.move': moves, 'step.update': edits},
+            'delivered': {
+                'messages': delivered,
+                'nodes.moved_per_editor_per_second': round(broadcasts / len(clients) / elapsed, 1),
+                'bytes_per_editor_per_second': round(sum(c.bytes for c in clients) / len(clients) / elapsed),
+            },
+            'step_update_latency_ms': {
+                'p50': round(statistics.median(latencies) * 1000, 2) if latencies else None,
+                'p95': round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None,
+            },
+        }
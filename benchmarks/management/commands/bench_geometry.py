@@ -0,0 +1,31 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.seed import make_glb, make_grid_mesh
+from projects.geometry import extract_metadata
+
+
+class Command(BaseCommand):
+    help = 'Time geometry metadata extraction on a synthetic GLB (about 10 MB by default).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grid', type=int, default=540,
+                            help='Grid resolution; 540 gives a ~10 MB GLB.')
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        positions, indices = make_grid_mesh(options['grid'])
+        glb = make_glb(positions, indices, image_bytes=b'\x89PNG' + b'\0' * 1024)
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            metadata = extract_metadata(glb, 'bench.glb')
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(json.dumps({
+            'file_mb': round(len(glb) / 1024 / 1024, 2),
+            'best_ms': round(min(timings) * 1000, 3),
+            'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+            'metadata': metadata,
+        }, indent=2))
@@ -0,0 +1,83 @@
+import json
+import random
+import time
+
+import zstandard
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from benchmarks.seed import make_project_document
+from projects.fields import ZSTD, decode, dumps, encode, use_dictionary
+
+TABLE = 'bench_json_%s'
+
+
+def _table_bytes(table):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+        else:
+            # Payload bytes only; SQLite has no per-table size without the dbstat extension.
+            cursor.execute(f'SELECT SUM(LENGTH(doc)) FROM {table}')
+        return cursor.fetchone()[0]
+
+
+def _jsonfield_read(value):
+    # Django reads jsonb/text as a string and ``JSONField`` decodes it.
+    return json.loads(value) if isinstance(value, str) else value
+
+
+class Command(BaseCommand):
+    help = 'Compare table size and read/write latency of project JSON stored as JSON vs zstd (with and without a dictionary).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=300)
+        parser.add_argument('--min-steps', type=int, default=5)
+        parser.add_argument('--max-steps', type=int, default=300)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        documents = []
+        for _ in range(options['projects']):
+            document = make_project_document(rng.randint(options['min_steps'], options['max_steps']), rng=rng)
+            documents += [document['steps'], document['guide']]
+        # Trained on every other project, so half of the measured documents were never seen.
+        dictionary = zstandard.train_dictionary(112640, [dumps(d) for d in documents[::4] + documents[1::4]])
+
+        no_dictionary = zstandard.ZstdCompressor(level=settings.PROJECT_JSON_LEVEL)
+
+        json_type = 'jsonb' if connection.vendor == 'postgresql' else 'text'
+        binary_type = 'bytea' if connection.vendor == 'postgresql' else 'blob'
+        variants = [
+            ('jsonfield', json_type, lambda value: json.dumps(value), _jsonfield_read),
+            ('zstd', binary_type, lambda value: ZSTD + no_dictionary.compress(dumps(value)), decode),
+            ('zstd+dict', binary_type, lambda value: encode(value, 'zstd'), decode),
+        ]
+        report = {'documents': len(documents), 'json_bytes': sum(len(dumps(d)) for d in documents)}
+        for name, column_type, write, read in variants:
+            table = TABLE % name.replace('+', '_')
+            use_dictionary(dictionary if name == 'zstd+dict' else None)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'CREATE TABLE {table} (id integer PRIMARY KEY, doc {column_type})')
+                    started = time.perf_counter()
+                    cursor.executemany(f'INSERT INTO {table} (id, doc) VALUES (%s, %s)',
+                                       [(i, write(d)) for i, d in enumerate(documents)])
+                    write_ms = (time.perf_counter() - started) * 1000
+                    started = time.perf_counter()
+                    cursor.execute(f'SELECT doc FROM {table} ORDER BY id')
+                    decoded = [read(row[0]) for row in cursor.fetchall()]
+                    read_ms = (time.perf_counter() - started) * 1000
+                assert decoded == documents
+                report[name] = {
+                    'table_bytes': _table_bytes(table),
+                    'write_ms_per_doc': round(write_ms / len(documents), 3),
+                    'read_ms_per_doc': round(read_ms / len(documents), 3),
+                }
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE IF EXISTS {table}')
+        use_dictionary(None)
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,121 @@
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from projects.models import Project
+
+SCHEMA = 'bench_partitions'
+SAMPLE_STEP = {'id': 'step', 'title': 'Step', 'description': 'Loosen the four bolts. ' * 8, 'modelPath': 'box',
+               'cameraPosition': {'x': 5, 'y': 5, 'z': 5}, 'shapeType': 'cube'}
+
+
+class Command(BaseCommand):
+    help = ('Compare a plain and an owner-hash-partitioned copy of the project table (PostgreSQL): '
+            'per-owner query latency and vacuum time. Builds its tables in a scratch schema.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=10_000_000)
+        parser.add_argument('--owners', type=int, default=200_000)
+        parser.add_argument('--partitions', type=int, default=16)
+        parser.add_argument('--steps', type=int, default=20, help='steps in each seeded project')
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--keep', action='store_true', help='keep the scratch schema for inspection')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('bench_partitions needs PostgreSQL.')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+            cursor.execute(f'CREATE SCHEMA {SCHEMA}')
+            try:
+                report = {'projects': options['projects'], 'owners': options['owners'],
+                          'partitions': options['partitions']}
+                for name in ('plain', 'hashed'):
+                    report[name] = self.measure(cursor, name, options)
+            finally:
+                if not options['keep']:
+                    cursor.execute(f'DROP SCHEMA {SCHEMA} CASCADE')
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def measure(self, cursor, name, options):
+        table = f'{SCHEMA}.{name}'
+        partitioned = name == 'hashed'
+        # The project table's columns, keys and indexes, without the data.
+        cursor.execute(f'CREATE TABLE {table} (LIKE {Project._meta.db_table} INCLUDING DEFAULTS)'
+                       + (' PARTITION BY HASH (owner_id)' if partitioned else ''))
+        if partitioned:
+            for remainder in range(options['partitions']):
+                cursor.execute(f'CREATE TABLE {table}_p{remainder} PARTITION OF {table} '
+                               f'FOR VALUES WITH (MODULUS {options["partitions"]}, REMAINDER {remainder})')
+
+        started = time.perf_counter()
+        self.seed(cursor, table, options)
+        cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY ({"id, owner_id" if partitioned else "id"})')
+        cursor.execute(f'CREATE INDEX ON {table} (owner_id)')
+        cursor.execute(f'CREATE INDEX ON {table} (deleted_at)')
+        cursor.execute(f'VACUUM ANALYZE {table}')
+        result = {'load_s': round(time.perf_counter() - started, 1)}
+        # ``pg_partition_tree`` has no rows for a plain table.
+        cursor.execute('SELECT coalesce((SELECT sum(pg_total_relation_size(relid)) FROM pg_partition_tree(%s)), '
+                       'pg_total_relation_size(%s))', [table, table])
+        result['size_mb'] = round(cursor.fetchone()[0] / 2 ** 20)
+
+        rng = random.Random(0)
+        # The project list of one owner, as ``GET /api/projects`` asks for it.
+        result['owner_list_ms'] = self.latency(cursor, options['queries'], (
+            f'SELECT id, name, updated_at FROM {table} WHERE deleted_at IS NULL AND owner_id = %s '
+            f'ORDER BY updated_at DESC'
+        ), lambda: [rng.randrange(1, options['owners'] + 1)])
+        # A project by id alone (shared links, collaboration): cannot be pruned.
+        result['by_id_ms'] = self.latency(cursor, options['queries'], f'SELECT id, name FROM {table} WHERE id = %s',
+                                          lambda: [rng.randrange(1, options['projects'] + 1)])
+
+        # Dirty 1% of the rows, as edits would, then time the vacuum that cleans them up.
+        cursor.execute(f'UPDATE {table} SET updated_at = now() WHERE mod(id, 100) = 0')
+        if partitioned:
+            t0 = time.perf_counter()
+            cursor.execute(f'VACUUM {table}_p0')
+            result['vacuum_one_partition_s'] = round(time.perf_counter() - t0, 2)
+            cursor.execute(f'UPDATE {table}_p0 SET updated_at = now() WHERE mod(id, 100) = 0')
+        t0 = time.perf_counter()
+        cursor.execute(f'VACUUM {table}')
+        result['vacuum_s'] = round(time.perf_counter() - t0, 2)
+        return result
+
+    def seed(self, cursor, table, options):
+        """Insert ``--projects`` rows spread evenly over ``--owners``, a million per transaction."""
+        steps = [{**SAMPLE_STEP, 'id': f'step-{i}'} for i in range(options['steps'])]
+        columns, values, params = [], [], []
+        for field in Project._meta.concrete_fields:
+            columns.append(field.column)
+            if field.name == 'id':
+                values.append('g')
+            elif field.name == 'owner':
+                values.append(f'1 + g %% {options["owners"]}')
+            elif field.name == 'name':
+                values.append("'Project ' || g")
+            elif field.name in ('created_at', 'updated_at'):
+                values.append("now() - g * interval '1 second'")
+            else:
+                values.append('%s')
+                params.append(field.get_db_prep_save(steps if field.name == 'steps' else field.get_default(),
+                                                     connection))
+        sql = (f'INSERT INTO {table} ({", ".join(columns)}) SELECT {", ".join(values)} '
+               f'FROM generate_series(%s, %s) AS g')
+        for start in range(1, options['projects'] + 1, 1_000_000):
+            with transaction.atomic():
+                cursor.execute(sql, [*params, start, min(start + 999_999, options['projects'])])
+
+    def latency(self, cursor, count, sql, params):
+        timings = []
+        for _ in range(count):
+            t0 = time.perf_counter()
+            cursor.execute(sql, params())
+            cursor.fetchall()
+            timings.append((time.perf_counter() - t0) * 1000)
+        return {'p50': round(statistics.median(timings), 3),
+                'p99': round(statistics.quantiles(timings, n=100)[98], 3)}
@@ -0,0 +1,64 @@
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.seed import make_project_document
+from projects.models import Project, Uploaded3DModel
+from projects.serializers import (
+    ProjectReadSerializer, ProjectSerializer, Uploaded3dModelReadSerializer, Uploaded3dModelSerializer,
+)
+
+
+def _per_thousand(fn, count, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return round(best / count * 1000 * 1000, 3)
+
+
+class Command(BaseCommand):
+    help = 'Compare serialization time per 1,000 objects for the DRF and fast-path read serializers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--objects', type=int, default=1000)
+        parser.add_argument('--steps', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        count, repeat = options['objects'], options['repeat']
+        rng = random.Random(0)
+        now = datetime.now(timezone.utc)
+
+        # Built in memory so the numbers measure serialization only, not the database.
+        projects, project_rows = [], []
+        for i in range(count):
+            document = make_project_document(options['steps'], rng=rng)
+            project = Project(id=i + 1, name=f'Project {i}', updated_at=now, **document)
+            projects.append(project)
+            project_rows.append({field: getattr(project, field) for field in ProjectReadSerializer.values_fields})
+
+        models, model_rows = [], []
+        for i in range(count):
+            model = Uploaded3DModel(id=i + 1, name=f'Model {i}', model_file_name='m.glb',
+                                    model_data_url='data:model/gltf-binary;base64,AAAA')
+            models.append(model)
+            model_rows.append({field: getattr(model, field) for field in Uploaded3dModelReadSerializer.values_fields})
+
+        report = {
+            'objects': count,
+            'unit': 'ms per 1000 objects',
+            'project': {
+                'drf': _per_thousand(lambda: ProjectSerializer(projects, many=True).data, count, repeat),
+                'fast': _per_thousand(lambda: ProjectReadSerializer(project_rows, many=True).data, count, repeat),
+            },
+            'uploaded_model': {
+                'drf': _per_thousand(lambda: Uploaded3dModelSerializer(models, many=True).data, count, repeat),
+                'fast': _per_thousand(lambda: Uploaded3dModelReadSerializer(model_rows, many=True).data, count, repeat),
+            },
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,86 @@
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from authentication.models import ResetPasswordM, UserM
+from benchmarks.seed import BENCH_EMAIL_DOMAIN
+from projects.deletion import delete_in_batches
+
+
+class Command(BaseCommand):
+    help = 'Time reset token lookups and the batched purge on a table with many expired tokens.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--expired', type=float, default=0.9, help='share of the seeded tokens already expired')
+        parser.add_argument('--lookups', type=int, default=2000)
+        parser.add_argument('--batch', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        email = f'tokens@{BENCH_EMAIL_DOMAIN}'
+        UserM.objects.filter(email=email).delete()
+        user = UserM.objects.create(username=email, email=email)
+        try:
+            report = self.run(user, options)
+        finally:
+            # Purged rows are committed batch by batch, so clean up explicitly.
+            ResetPasswordM.objects.filter(user=user).delete()
+            user.delete()
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run(self, user, options):
+        now = timezone.now()
+        rng = random.Random(0)
+        started = time.perf_counter()
+        tokens = []
+        for offset in range(0, options['rows'], 10_000):
+            rows = []
+            for _ in range(min(10_000, options['rows'] - offset)):
+                expired = rng.random() < options['expired']
+                token = uuid.UUID(int=rng.getrandbits(128), version=4)
+                rows.append(ResetPasswordM(
+                    user=user, uuid=token, is_used=expired and rng.random() < 0.5,
+                    expires_at=now + timedelta(minutes=rng.randint(-10_000, -1) if expired else rng.randint(1, 60)),
+                ))
+                tokens.append(token)
+            with transaction.atomic():
+                ResetPasswordM.objects.bulk_create(rows)
+        seeded = time.perf_counter() - started
+
+        lookups = []
+        for token in rng.sample(tokens, min(options['lookups'], len(tokens))):
+            t0 = time.perf_counter()
+            ResetPasswordM.objects.filter(uuid=token, is_used=False, expires_at__gt=timezone.now()).first()
+            lookups.append((time.perf_counter() - t0) * 1000)
+
+        batches = []
+        purge_started = t0 = time.perf_counter()
+        for deleted in delete_in_batches(ResetPasswordM.objects.filter(expires_at__lte=now), options['batch']):
+            batches.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+        purge = time.perf_counter() - purge_started
+        expired_left = ResetPasswordM.objects.filter(user=user, expires_at__lte=now).count()
+
+        return {
+            'rows': options['rows'],
+            'seed_s': round(seeded, 1),
+            'lookup_ms': {
+                'p50': round(statistics.median(lookups), 3),
+                'p99': round(statistics.quantiles(lookups, n=100)[98], 3),
+            },
+            'purge': {
+                'seconds': round(purge, 1),
+                'batches': len(batches),
+                'batch_ms_p50': round(statistics.median(batches), 1) if batches else 0,
+                'batch_ms_max': round(max(batches), 1) if batches else 0,
+                'expired_left': expired_left,
+                'remaining': ResetPasswordM.objects.filter(user=user).count(),
+            },
+        }
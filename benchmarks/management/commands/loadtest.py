@@ -0,0 +1,112 @@
+import asyncio
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.driver import run_load
+from benchmarks.seed import BENCH_EMAIL_DOMAIN, SeededUser, seed_dataset
+from projects.models import ProjectShare
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _load_existing_dataset():
+    """Rebuild the account list from a dataset seeded by an earlier run."""
+    accounts = {}
+    shares = ProjectShare.objects.select_related('project__owner').filter(
+        project__owner__email__endswith=f'@{BENCH_EMAIL_DOMAIN}',
+    )
+    for share in shares:
+        owner = share.project.owner
+        account = accounts.get(owner.pk)
+        if account is None:
+            account = accounts[owner.pk] = SeededUser(
+                email=owner.email,
+                element_ids=list(owner.created3d_models.values_list('pk', flat=True)),
+                model_ids=list(owner.uploaded3d_models.values_list('pk', flat=True)),
+            )
+        account.project_ids.append(share.project_id)
+        account.share_tokens.append(str(share.token))
+    return list(accounts.values())
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic dataset and replay a realistic request mix against a running '
+        'server, reporting p50/p95/p99 latency and RPS per endpoint as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=10, help='Number of virtual users.')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run the mix for.')
+        parser.add_argument('--iterations', type=int, default=None,
+                            help='Stop each virtual user after this many scenarios.')
+        parser.add_argument('--users', type=int, default=20, help='Accounts to seed.')
+        parser.add_argument('--projects-per-user', type=int, default=10)
+        parser.add_argument('--steps', type=int, default=40, help='Steps per seeded project.')
+        parser.add_argument('--asset-kb', type=int, default=64, help='Size of seeded model assets in KiB.')
+        parser.add_argument('--seed', type=int, default=0, help='RNG seed for dataset and request mix.')
+        parser.add_argument('--no-seed', action='store_true', help='Reuse the previously seeded dataset.')
+        parser.add_argument('--output', default=None, help='Write the JSON report to this file.')
+
+    def handle(self, *args, **options):
+        asset_bytes = options['asset_kb'] * 1024
+        if options['no_seed']:
+            accounts = _load_existing_dataset()
+            if not accounts:
+                raise CommandError('No benchmark dataset found; run without --no-seed first.')
+        else:
+            accounts = seed_dataset(
+                users=options['users'],
+                projects_per_user=options['projects_per_user'],
+                steps_per_project=options['steps'],
+                asset_bytes=asset_bytes,
+                seed=options['seed'],
+            )
+            self.stderr.write(f'Seeded {len(accounts)} accounts.')
+
+        result = asyncio.run(run_load(
+            options['base_url'],
+            accounts,
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            iterations=options['iterations'],
+            asset_bytes=asset_bytes,
+            steps_per_project=options['steps'],
+            seed=options['seed'],
+        ))
+        report = {
+            'commit': _git_revision(),
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'config': {
+                key: options[key]
+                for key in ('base_url', 'concurrency', 'duration', 'iterations', 'users',
+                            'projects_per_user', 'steps', 'asset_kb', 'seed')
+            },
+            **result,
+        }
+        if report['total_throttled']:
+            self.stderr.write(
+                f'{report["total_throttled"]} requests were throttled (429) and left out of the latencies; '
+                'start the server with DJANGO_DISABLE_THROTTLING=1 to measure the endpoints alone.'
+            )
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+            self.stderr.write(f'Report written to {options["output"]}.')
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Compare two JSON reports produced by `loadtest` endpoint by endpoint.'
+
+    METRICS = ('rps', 'p50_ms', 'p95_ms', 'p99_ms')
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline')
+        parser.add_argument('candidate')
+
+    def handle(self, *args, **options):
+        with open(options['baseline']) as fh:
+            baseline = json.load(fh)
+        with open(options['candidate']) as fh:
+            candidate = json.load(fh)
+
+        self.stdout.write(f'baseline {baseline.get("commit")}  ->  candidate {candidate.get("commit")}')
+        header = f'{"endpoint":<24}' + ''.join(f'{m:>28}' for m in self.METRICS)
+        self.stdout.write(header)
+        for label in sorted(set(baseline['endpoints']) | set(candidate['endpoints'])):
+            old = baseline['endpoints'].get(label, {})
+            new = candidate['endpoints'].get(label, {})
+            row = f'{label:<24}'
+            for metric in self.METRICS:
+                a, b = old.get(metric), new.get(metric)
+                if a is None or b is None:
+                    row += f'{"n/a":>28}'
+                    continue
+                change = f'{(b - a) / a * 100:+.1f}%' if a else ''
+                row += f'{f"{a:g} -> {b:g} {change}":>28}'
+            self.stdout.write(row)
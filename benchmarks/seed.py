@@ -0,0 +1,202 @@
+"""Synthetic dataset used by the load-testing command.
+
+Every seeded row is tagged with ``BENCH_EMAIL_DOMAIN`` so the dataset can be
+rebuilt (or removed) without touching real accounts.
+"""
+import base64
+import json
+import random
+import struct
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from authentication.models import UserM
+from projects.models import Project, ProjectShare, Created3DModelM, Uploaded3DModel
+
+BENCH_EMAIL_DOMAIN = 'bench.local'
+BENCH_PASSWORD = 'bench-password'
+
+
+@dataclass
+class SeededUser:
+    email: str
+    project_ids: list = field(default_factory=list)
+    share_tokens: list = field(default_factory=list)
+    element_ids: list = field(default_factory=list)
+    model_ids: list = field(default_factory=list)
+
+
+def bench_email(index):
+    return f'bench-user-{index}@{BENCH_EMAIL_DOMAIN}'
+
+
+def fake_data_url(size, mime='model/gltf-binary', rng=None):
+    """Return a base64 data URL wrapping ``size`` pseudo-random bytes."""
+    rng = rng or random
+    payload = rng.randbytes(size)
+    return f'data:{mime};base64,{base64.b64encode(payload).decode("ascii")}'
+
+
+def make_glb(positions, indices, materials=1, image_bytes=b''):
+    """
+    Pack float32 ``positions`` (n, 3) and uint32 ``indices`` into a minimal GLB.
+
+    ``positions`` and ``indices`` are NumPy arrays; an optional embedded image
+    is stored in its own buffer view.
+    """
+    position_bytes = positions.astype('<f4').tobytes()
+    index_bytes = indices.astype('<u4').tobytes()
+    binary = position_bytes + index_bytes + image_bytes
+    binary += b'\0' * (-len(binary) % 4)
+    views = [
+        {'buffer': 0, 'byteOffset': 0, 'byteLength': len(position_bytes)},
+        {'buffer': 0, 'byteOffset': len(position_bytes), 'byteLength': len(index_bytes)},
+    ]
+    gltf = {
+        'asset': {'version': '2.0'},
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [{'mesh': 0}],
+        'meshes': [{'primitives': [{'attributes': {'POSITION': 0}, 'indices': 1, 'material': 0}]}],
+        'materials': [{'name': f'm{i}'} for i in range(materials)],
+        'accessors': [
+            {'bufferView': 0, 'componentType': 5126, 'count': len(positions), 'type': 'VEC3',
+             'min': positions.min(axis=0).tolist(), 'max': positions.max(axis=0).tolist()},
+            {'bufferView': 1, 'componentType': 5125, 'count': len(indices), 'type': 'SCALAR'},
+        ],
+        'bufferViews': views,
+        'buffers': [{'byteLength': len(binary)}],
+    }
+    if image_bytes:
+        views.append({'buffer': 0, 'byteOffset': len(position_bytes) + len(index_bytes),
+                      'byteLength': len(image_bytes)})
+        gltf['images'] = [{'bufferView': 2, 'mimeType': 'image/png'}]
+        gltf['textures'] = [{'source': 0}]
+    json_chunk = json.dumps(gltf).encode()
+    json_chunk += b' ' * (-len(json_chunk) % 4)
+    length = 12 + 8 + len(json_chunk) + 8 + len(binary)
+    return b''.join([
+        struct.pack('<4sII', b'glTF', 2, length),
+        struct.pack('<II', len(json_chunk), 0x4E4F534A), json_chunk,
+        struct.pack('<II', len(binary), 0x004E4942), binary,
+    ])
+
+
+def make_png(width, height, rng=None):
+    """A ``width`` x ``height`` RGBA PNG with a random gradient (compresses like a real label)."""
+    import io
+    from PIL import Image
+    rng = rng or random
+    start, end = np.array([rng.randrange(256) for _ in range(4)]), np.array([rng.randrange(256) for _ in range(4)])
+    ramp = np.linspace(0, 1, width)[None, :, None]
+    pixels = np.broadcast_to(start + (end - start) * ramp, (height, width, 4)).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(np.ascontiguousarray(pixels), 'RGBA').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def make_grid_mesh(size, rng=None):
+    """A ``size`` x ``size`` height-field grid: returns ``(positions, indices)`` arrays."""
+    rng = np.random.default_rng(0 if rng is None else rng.randrange(2 ** 32))
+    xs, zs = np.meshgrid(np.linspace(-1, 1, size), np.linspace(-1, 1, size))
+    ys = rng.normal(scale=0.05, size=xs.shape)
+    positions = np.stack([xs, ys, zs], axis=-1).reshape(-1, 3)
+    cell = np.arange(size * size).reshape(size, size)[:-1, :-1].reshape(-1)
+    quads = np.stack([cell, cell + 1, cell + size, cell + 1, cell + size + 1, cell + size], axis=-1)
+    return positions, quads.reshape(-1)
+
+
+def make_steps(count, element_id=None, model_id=None, rng=None):
+    """Build a ``steps`` array shaped like the editor's ``InstructionStep``."""
+    rng = rng or random
+    steps = []
+    for i in range(count):
+        step = {
+            'id': f'step-{i}',
+            'title': f'Step {i + 1}',
+            'description': '<p>' + 'Lorem ipsum dolor sit amet. ' * rng.randint(2, 12) + '</p>',
+            'modelPath': 'box',
+            'cameraPosition': {'x': rng.uniform(-10, 10), 'y': rng.uniform(0, 10), 'z': rng.uniform(-10, 10)},
+            'shapeType': rng.choice(['cube', 'sphere', 'cylinder', 'cone']),
+            'highlightColor': '#ff0000',
+            'annotations': [],
+            'modelScale': 1,
+        }
+        if element_id is not None and i % 3 == 0:
+            step['custom3dElementId'] = element_id
+        if model_id is not None and i % 3 == 1:
+            step['uploadedModelId'] = model_id
+        steps.append(step)
+    return steps
+
+
+def make_project_document(steps_count, element_id=None, model_id=None, rng=None):
+    steps = make_steps(steps_count, element_id, model_id, rng)
+    return {
+        'steps': steps,
+        'connections': [
+            {'id': f'e{i}-{i + 1}', 'source': f'step-{i}', 'target': f'step-{i + 1}'}
+            for i in range(steps_count - 1)
+        ],
+        'guide': [{'stepId': s['id'], 'label': str(i + 1)} for i, s in enumerate(steps)],
+        'node_positions': {s['id']: {'x': i * 150, 'y': 100} for i, s in enumerate(steps)},
+    }
+
+
+def clear_dataset():
+    """Delete every user created by a previous seed (cascades to their rows)."""
+    UserM.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').delete()
+
+
+@transaction.atomic
+def seed_dataset(users=20, projects_per_user=10, steps_per_project=40,
+                 asset_bytes=64 * 1024, seed=0):
+    """Create a reproducible dataset and return one ``SeededUser`` per account.
+
+    The same ``seed`` always produces byte-identical rows, so two runs on two
+    commits replay exactly the same payloads.
+    """
+    rng = random.Random(seed)
+    clear_dataset()
+
+    password = make_password(BENCH_PASSWORD)
+    accounts = UserM.objects.bulk_create([
+        UserM(username=bench_email(i), email=bench_email(i), password=password)
+        for i in range(users)
+    ])
+
+    elements = Created3DModelM.objects.bulk_create([
+        Created3DModelM(
+            owner=user, name=f'Label {user.pk}', text='Bench', color='#00ff00',
+            texture_data_url=fake_data_url(asset_bytes // 4, 'image/png', rng),
+        )
+        for user in accounts
+    ])
+    models = Uploaded3DModel.objects.bulk_create([
+        Uploaded3DModel(
+            owner=user, name=f'Model {user.pk}', model_file_name='bench.glb',
+            model_data_url=fake_data_url(asset_bytes, rng=rng),
+        )
+        for user in accounts
+    ])
+
+    projects = []
+    for user, element, model in zip(accounts, elements, models):
+        for p in range(projects_per_user):
+            document = make_project_document(steps_per_project, element.pk, model.pk, rng)
+            projects.append(Project(owner=user, name=f'Bench project {p}', **document))
+    projects = Project.objects.bulk_create(projects)
+    shares = ProjectShare.objects.bulk_create([ProjectShare(project=p) for p in projects])
+
+    seeded = {user.pk: SeededUser(email=user.email) for user in accounts}
+    for element in elements:
+        seeded[element.owner_id].element_ids.append(element.pk)
+    for model in models:
+        seeded[model.owner_id].model_ids.append(model.pk)
+    for project, share in zip(projects, shares):
+        seeded[project.owner_id].project_ids.append(project.pk)
+        seeded[project.owner_id].share_tokens.append(str(share.token))
+    return list(seeded.values())
@@ -0,0 +1,58 @@
+from django.test import TestCase
+
+from authentication.models import UserM
+from projects.models import Project, ProjectShare
+
+from .driver import Recorder, percentile, summarize
+from .seed import BENCH_EMAIL_DOMAIN, seed_dataset
+
+
+class SeedTests(TestCase):
+    def test_seed_creates_tagged_dataset(self):
+        accounts = seed_dataset(users=3, projects_per_user=2, steps_per_project=4, asset_bytes=128)
+        self.assertEqual(len(accounts), 3)
+        self.assertEqual(UserM.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').count(), 3)
+        self.assertEqual(Project.objects.count(), 6)
+        self.assertEqual(ProjectShare.objects.count(), 6)
+        self.assertEqual(len(accounts[0].share_tokens), 2)
+
+    def test_seed_is_reproducible_and_replaces_previous_run(self):
+        seed_dataset(users=2, projects_per_user=1, steps_per_project=3, asset_bytes=64, seed=7)
+        first = [[s['description'] for s in steps] for steps in Project.objects.values_list('steps', flat=True)]
+        seed_dataset(users=2, projects_per_user=1, steps_per_project=3, asset_bytes=64, seed=7)
+        second = [[s['description'] for s in steps] for steps in Project.objects.values_list('steps', flat=True)]
+        self.assertEqual(first, second)
+        self.assertEqual(UserM.objects.count(), 2)
+
+
+class ReportTests(TestCase):
+    def test_percentile_interpolates(self):
+        values = [1, 2, 3, 4, 5]
+        self.assertEqual(percentile(values, 50), 3)
+        self.assertEqual(percentile(values, 100), 5)
+        self.assertAlmostEqual(percentile(values, 95), 4.8)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_summarize_reports_per_endpoint(self):
+        recorder = Recorder()
+        for elapsed in (0.01, 0.02, 0.03):
+            recorder.add('project_list', elapsed, True, 100)
+        recorder.add('login', 0.05, False, 10)
+        report = summarize(recorder, wall_time=2.0)
+        self.assertEqual(report['total_requests'], 4)
+        self.assertEqual(report['total_errors'], 1)
+        self.assertEqual(report['endpoints']['project_list']['p50_ms'], 20.0)
+        self.assertEqual(report['endpoints']['project_list']['rps'], 1.5)
+        self.assertEqual(report['endpoints']['project_list']['bytes_received'], 300)
+
+    def test_summarize_keeps_throttled_requests_apart(self):
+        recorder = Recorder()
+        recorder.add('project_list', 0.01, True, 100)
+        recorder.throttle('project_list')
+        recorder.throttle('login')
+        report = summarize(recorder, wall_time=1.0)
+        self.assertEqual(report['total_requests'], 1)
+        self.assertEqual(report['total_throttled'], 2)
+        self.assertEqual(report['endpoints']['project_list']['p99_ms'], 10.0)
+        self.assertEqual(report['endpoints']['login']['requests'], 0)
+        self.assertEqual(report['endpoints']['login']['throttled'], 1)
@@ -1,3 +1,27 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import DeletionJob, Project, Uploaded3DModel
+
+
+@admin.register(Uploaded3DModel)
+class Uploaded3DModelAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'model_file_name', 'owner', 'system_model')
+    list_filter = ('system_model',)
+    search_fields = ('name', 'model_file_name')
+    raw_id_fields = ('owner',)
+
+
+@admin.register(Project)
+class ProjectAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'project_type', 'owner', 'is_template', 'updated_at')
+    list_filter = ('is_template', 'project_type')
+    list_editable = ('is_template',)
+    search_fields = ('name',)
+    raw_id_fields = ('owner', 'template')
+    list_select_related = ('owner',)
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'user_id', 'status', 'deleted_rows', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
@@ -0,0 +1,104 @@
+"""
+Share link analytics: how often each project's share link is opened, per day.
+
+Counting with ``UPDATE ... SET views = views + 1`` on every open would make
+every request for a popular link queue on one row lock. Opens are counted in
+this process's memory instead (``record_share_view`` takes a lock and bumps a
+counter, nothing more) and written every ``SHARE_VIEW_FLUSH_INTERVAL``
+seconds as one statement adding each project's increment to its
+``ShareViewCount`` row for the day. Every worker process flushes its own
+counts; the increments add up in the database, so no coordination is needed.
+
+Counts can lag by up to the flush interval, and a process that is killed
+without a clean exit loses the opens it had not flushed. The flush always
+runs on a timer, even with ``BACKGROUND_WORKERS = 0``: writing inline would
+put the write back on every open.
+
+Opens are only written to the database they were counted against. When the
+connection has moved on since (the test runner swaps the test database back
+for the real one before the exit flush), they are dropped.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import jobs
+from .models import Project, ShareViewCount
+
+logger = logging.getLogger(__name__)
+
+FLUSH_KEY = ('share-views',)
+
+_pending = Counter()  # (project id, day) -> opens not yet written
+_pending_database = None  # the database ``_pending`` was counted against
+_pending_lock = threading.Lock()
+
+
+def record_share_view(project_id):
+    """Count one open of ``project_id``'s share link."""
+    global _pending, _pending_database
+    key = (project_id, timezone.localdate())
+    database = connection.settings_dict['NAME']
+    with _pending_lock:
+        if database != _pending_database:
+            _pending, _pending_database = Counter(), database
+        _pending[key] += 1
+    transaction.on_commit(_schedule_flush)
+
+
+def _schedule_flush():
+    jobs.defer(FLUSH_KEY, settings.SHARE_VIEW_FLUSH_INTERVAL, flush, inline=False)
+
+
+def flush(retry=True):
+    """
+    Add the counted opens to ``ShareViewCount``; returns how many were
+    written. If the write fails they are kept for the next flush, which
+    ``retry`` schedules.
+    """
+    global _pending
+    with _pending_lock:
+        pending, _pending = _pending, Counter()
+        database = _pending_database
+    if not pending:
+        return 0
+    if database != connection.settings_dict['NAME']:
+        logger.warning('Dropping %d share views counted against database %s', sum(pending.values()), database)
+        return 0
+    table = connection.ops.quote_name(ShareViewCount._meta.db_table)
+    projects = connection.ops.quote_name(Project._meta.db_table)
+    # The SELECT skips projects deleted since they were viewed.
+    sql = (f'INSERT INTO {table} (project_id, day, views) SELECT id, %s, %s FROM {projects} WHERE id = %s '
+           f'ON CONFLICT (project_id, day) DO UPDATE SET views = {table}.views + EXCLUDED.views')
+    try:
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [(day, views, project_id) for (project_id, day), views in pending.items()])
+    except DatabaseError:
+        logger.exception('Could not write %d share views; retrying later', sum(pending.values()))
+        with _pending_lock:
+            _pending.update(pending)
+        if retry:
+            _schedule_flush()
+        return 0
+    return sum(pending.values())
+
+
+def share_views(project_id, days):
+    """Opens of the share link in total and for each of the last ``days`` days that had any."""
+    counts = ShareViewCount.objects.filter(project_id=project_id)
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return {
+        'totalViews': counts.aggregate(total=Sum('views'))['total'] or 0,
+        'days': [{'date': row['day'].isoformat(), 'views': row['views']}
+                 for row in counts.filter(day__gte=since).order_by('day').values('day', 'views')],
+    }
+
+
+atexit.register(flush, retry=False)
@@ -0,0 +1,67 @@
+"""
+Content-addressed store for derived binaries (texture variants, ...).
+
+Assets never change once written, so their URLs can be cached forever and
+identical content produced for different rows is stored once.
+"""
+import hashlib
+import mimetypes
+import re
+
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Created3DModelM, LabelTexture, Project, StoredAsset, Uploaded3DModel
+
+EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp', 'model/gltf-binary': 'glb'}
+# The digest in an ``asset_url``.
+URL_DIGEST = re.compile(r'/assets/([0-9a-f]{64})\.')
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def asset_url(digest, content_type):
+    extension = EXTENSIONS.get(content_type) or (mimetypes.guess_extension(content_type) or '.bin')[1:]
+    return reverse('asset', args=[f'{digest}.{extension}'])
+
+
+def save_asset(data, content_type):
+    """Store ``data`` (only ``stored_at`` is refreshed when it already exists) and return its digest."""
+    digest = content_digest(data)
+    if not StoredAsset.objects.filter(pk=digest).update(stored_at=timezone.now()):
+        StoredAsset.objects.get_or_create(
+            digest=digest, defaults={'content_type': content_type, 'data': data, 'size': len(data)},
+        )
+    return digest
+
+
+def store_asset(data, content_type):
+    """Store ``data`` and return its URL."""
+    return asset_url(save_asset(data, content_type), content_type)
+
+
+def referenced_digests():
+    """
+    Digests of the assets rows point at: element texture variants, project
+    and model thumbnails (soft-deleted projects included) and label renders.
+    Atlas images are only referenced from cached manifests; ``ASSET_GC_GRACE``
+    outlasts those.
+    """
+    digests = set(LabelTexture.objects.values_list('asset_id', flat=True))
+    urls = [Project._base_manager.exclude(thumbnail_url=None).values_list('thumbnail_url', flat=True),
+            Uploaded3DModel.objects.exclude(thumbnail_url=None).values_list('thumbnail_url', flat=True)]
+    for textures in Created3DModelM.objects.exclude(textures=[]).values_list('textures', flat=True).iterator():
+        digests.update(URL_DIGEST.findall(' '.join(str(v.get('url')) for v in textures if isinstance(v, dict))))
+    for queryset in urls:
+        for url in queryset.iterator():
+            digests.update(URL_DIGEST.findall(url))
+    return digests
+
+
+def unreferenced_assets(stored_before):
+    """Digests of assets last stored before ``stored_before`` that no row references."""
+    referenced = referenced_digests()
+    candidates = StoredAsset.objects.filter(stored_at__lt=stored_before).values_list('digest', flat=True)
+    return [digest for digest in candidates.iterator() if digest not in referenced]
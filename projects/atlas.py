@@ -0,0 +1,128 @@
+"""
+Texture atlases for the created elements a project references.
+
+The atlas depends only on which elements are referenced and on their
+texture content, so the manifest is cached under a hash of
+``(element id, texture hash)`` pairs. A project edit that keeps the same
+elements reuses it; replacing any element's texture changes the key.
+Atlas images are stored content-addressed and served from ``/api/assets/``.
+
+Requests never build an atlas themselves: a missing one is queued (once per
+key, however many requests ask) and packed in the ``projects.jobs`` pool,
+while requests get the project's previous atlas, if any.
+"""
+import hashlib
+import logging
+from functools import partial
+
+from django.core.cache import cache
+
+from . import jobs
+from .assets import content_digest, store_asset
+from .cloning import asset_owner_ids
+from .models import Created3DModelM
+from .packing import build_atlases
+from .storage import asset_ids
+from .utils import split_data_url
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'atlas:%s'
+# The last manifest built for a project, served while its current one is built.
+LAST_KEY = 'atlas-last:%s'
+# Held while a key's atlas is being built; expires in case the build dies.
+BUILDING_KEY = 'atlas-building:%s'
+BUILD_TIMEOUT = 60 * 5
+# Stored atlas images outlive the manifests by ``ASSET_GC_GRACE`` (see ``sweep_assets``).
+CACHE_TIMEOUT = 60 * 60 * 24 * 7
+ATLAS_MAX_SIZE = 2048
+ATLAS_PADDING = 2
+# Bump when the packing or encoding changes so cached manifests are rebuilt.
+ATLAS_VERSION = 1
+
+
+def _element_ids(project):
+    return sorted(set(asset_ids(project, 'custom3dElementId')))
+
+
+def atlas_key(project):
+    """Return ``(key, element_ids)`` for the elements a project row references."""
+    # Only the owner's (or template author's) elements are packed, so references
+    # cannot pull in other users' textures.
+    rows = dict(Created3DModelM.objects.filter(owner_id__in=asset_owner_ids(project), pk__in=_element_ids(project))
+                .values_list('id', 'texture_hash'))
+    unhashed = [pk for pk, digest in rows.items() if digest is None]
+    if unhashed:
+        # Rows saved before texture processing existed: hash the data URL itself.
+        for pk, data_url in Created3DModelM.objects.filter(pk__in=unhashed).values_list('id', 'texture_data_url'):
+            rows[pk] = content_digest((data_url or '').encode())
+    fingerprint = ';'.join(f'{pk}:{rows[pk]}' for pk in sorted(rows))
+    key = hashlib.sha256(f'v{ATLAS_VERSION}:{ATLAS_MAX_SIZE}:{ATLAS_PADDING}:{fingerprint}'.encode()).hexdigest()
+    return key, sorted(rows)
+
+
+def load_textures(element_ids):
+    textures = {}
+    for pk, data_url in Created3DModelM.objects.filter(pk__in=element_ids).values_list('id', 'texture_data_url'):
+        _, content = split_data_url(data_url)
+        if content is not None:
+            textures[pk] = content
+    return textures
+
+
+def manifest_for(key, element_ids, atlas_images, entries):
+    return {
+        'key': key,
+        'atlases': [
+            {'url': store_asset(a['data'], 'image/webp'), 'width': a['width'], 'height': a['height'],
+             'bytes': len(a['data'])}
+            for a in atlas_images
+        ],
+        'elements': {str(pk): entry for pk, entry in sorted(entries.items())},
+        # Referenced elements without a decodable texture.
+        'missing': [pk for pk in element_ids if pk not in entries],
+    }
+
+
+def build_manifest(key, element_ids):
+    """Build the manifest in this thread."""
+    return manifest_for(key, element_ids, *build_atlases(load_textures(element_ids), ATLAS_MAX_SIZE, ATLAS_PADDING))
+
+
+def _save(key, element_ids, project_id, result):
+    try:
+        manifest = manifest_for(key, element_ids, *result())
+    except Exception:
+        logger.exception('Atlas build %s failed', key)
+    else:
+        cache.set_many({CACHE_KEY % key: manifest, LAST_KEY % project_id: manifest}, CACHE_TIMEOUT)
+    finally:
+        cache.delete(BUILDING_KEY % key)
+
+
+def _build(key, element_ids, project_id):
+    try:
+        textures = load_textures(element_ids)
+    except Exception:
+        cache.delete(BUILDING_KEY % key)
+        raise
+    jobs.submit(build_atlases, (textures, ATLAS_MAX_SIZE, ATLAS_PADDING), partial(_save, key, element_ids, project_id))
+
+
+def get_atlas(project):
+    """
+    Return ``(manifest, current)`` for a project row with ``ATLAS_PROJECT_FIELDS``
+    (see ``projects.views``). When the current manifest is not built yet its
+    build is queued, and ``manifest`` is the project's previous one or ``None``.
+    """
+    key, element_ids = atlas_key(project)
+    manifest = cache.get(CACHE_KEY % key)
+    if manifest is not None:
+        return manifest, True
+    if cache.add(BUILDING_KEY % key, True, BUILD_TIMEOUT):
+        # Texture data is read off the request thread too.
+        jobs.defer(('atlas', key), 0, partial(_build, key, element_ids, project['id']))
+    manifest = cache.get(CACHE_KEY % key)
+    if manifest is not None:
+        return manifest, True
+    return cache.get(LAST_KEY % project['id']), False
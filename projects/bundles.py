@@ -0,0 +1,562 @@
+"""
+Streaming project bundles: export a project with its assets and import it back.
+
+A bundle is a zip or tar archive holding ``project.json`` first, followed by
+one file per referenced asset: ``elements/<id>.<ext>`` (element textures),
+``models/<id>.<ext>`` (uploaded models) and ``project/model.<ext>`` (an
+embedded project model).
+
+Export decodes each stored data URL into the archive in 1 MB slices and
+yields archive bytes as they are produced, so memory is bounded by one asset
+row however large the bundle is. Import reads entries one at a time (tar
+straight from the request stream, zip from a spooled temporary file because
+its index is at the end), deduplicates assets by SHA-256 against the bundle
+and the user's existing rows, and inserts rows with ``bulk_create`` in
+batches of at most ``FLUSH_BYTES``. A bundle is read no further than the
+largest one the quotas could need (``bundle_max_bytes``), and every asset
+file the manifest names must be in it.
+"""
+import base64
+import hashlib
+import json
+import mimetypes
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Substr
+
+from threeddocs.parsers import RequestTooLarge
+from . import storage
+from .assets import EXTENSIONS
+from .cloning import asset_owner_ids
+from .lod import schedule_lods
+from .models import Created3DModelM, Project, Uploaded3DModel
+from .serializers import (
+    CREATED_MODEL_LIMIT, PROJECT_LIMIT, UPLOADED_MODEL_LIMIT, UPLOADED_MODEL_MAX_BYTES, geometry_metadata,
+)
+from .texture_jobs import schedule_textures
+from .thumbnails import queue_model
+from .utils import referenced_ids
+
+FORMAT = 'threeddocs-project'
+VERSION = 1
+MANIFEST_NAME = 'project.json'
+ARCHIVE_TYPES = {'zip': 'application/zip', 'tar': 'application/x-tar'}
+# Base64 characters decoded per export write; a multiple of 4.
+B64_SLICE = 1024 * 1024
+# Bytes read per import chunk; a multiple of 3 so chunks base64-encode independently.
+READ_CHUNK = 768 * 1024
+SPOOL_SIZE = 8 * 1024 * 1024
+FLUSH_BYTES = 32 * 1024 * 1024
+# Enough of a data URL to read its media type.
+HEADER_LENGTH = 128
+
+PROJECT_FIELDS = ('name', 'project_type', 'project_model_url', 'steps', 'connections', 'guide', 'node_positions')
+ELEMENT_FIELDS = ('id', 'name', 'text', 'color', 'description')
+MODEL_FIELDS = ('id', 'name', 'model_file_name', 'model_scale', 'description')
+# Manifest keys of a project's JSON columns, their type and their ``JSON_MAX_ITEMS`` key.
+DOCUMENT_JSON = {'steps': (list, 'steps'), 'connections': (list, 'connections'), 'guide': (list, 'guide'),
+                 'node_positions': (dict, 'nodePositions')}
+MIME = re.compile(r'[\w.+-]+/[\w.+-]+\Z')
+
+
+class BundleError(ValueError):
+    pass
+
+
+def _data_url_parts(value):
+    """Return ``(mime, base64 payload)`` of a base64 data URL, or ``(None, None)``."""
+    if not value or not value.startswith('data:') or ';base64,' not in value:
+        return None, None
+    header, payload = value.split(';base64,', 1)
+    return header[len('data:'):] or 'application/octet-stream', payload
+
+
+def _extension(mime, file_name=''):
+    if mime in EXTENSIONS:
+        return EXTENSIONS[mime]
+    if '.' in (file_name or ''):
+        return file_name.rsplit('.', 1)[1].lower()
+    guessed = mimetypes.guess_extension(mime or '')
+    return guessed[1:] if guessed else 'bin'
+
+
+def _asset_ref(header, file_name, prefix):
+    """Return ``(archive name, mime)`` for a stored base64 data URL, or ``(None, None)`` for anything else."""
+    mime, _ = _data_url_parts(header)
+    if mime is None:
+        return None, None
+    return f'{prefix}.{_extension(mime, file_name)}', mime
+
+
+def build_manifest(project):
+    """
+    Return ``(manifest, files)`` for a project row; ``files`` is a list of
+    ``(archive name, loader)`` where ``loader()`` fetches that asset's data URL.
+    """
+    element_ids = referenced_ids(project['steps'], project['connections'], 'custom3dElementId')
+    model_ids = referenced_ids(project['steps'], project['connections'], 'uploadedModelId')
+    owners = asset_owner_ids(project)
+    files = []
+
+    elements = []
+    element_rows = (Created3DModelM.objects.filter(owner_id__in=owners, pk__in=element_ids).order_by('pk')
+                    .values(*ELEMENT_FIELDS, header=Substr('texture_data_url', 1, HEADER_LENGTH)))
+    for row in element_rows:
+        header = row.pop('header')
+        name, mime = _asset_ref(header, '', f'elements/{row["id"]}')
+        row.update(texture_file=name, texture_mime=mime, texture_data_url=None)
+        if name:
+            files.append((name, lambda pk=row['id']: Created3DModelM.objects.values_list(
+                'texture_data_url', flat=True).get(pk=pk)))
+        elif header:
+            row['texture_data_url'] = (Created3DModelM.objects.values_list('texture_data_url', flat=True)
+                                       .get(pk=row['id']))
+        elements.append(row)
+
+    models = []
+    model_rows = (Uploaded3DModel.objects.filter(Q(owner_id__in=owners) | Q(system_model=True), pk__in=model_ids)
+                  .order_by('pk').values(*MODEL_FIELDS, header=Substr('model_data_url', 1, HEADER_LENGTH)))
+    for row in model_rows:
+        header = row.pop('header')
+        name, mime = _asset_ref(header, row['model_file_name'], f'models/{row["id"]}')
+        row.update(file=name, mime=mime, model_data_url=None, model_scale=float(row['model_scale']))
+        if name:
+            files.append((name, lambda pk=row['id']: Uploaded3DModel.objects.values_list(
+                'model_data_url', flat=True).get(pk=pk)))
+        else:
+            row['model_data_url'] = Uploaded3DModel.objects.values_list('model_data_url', flat=True).get(pk=row['id'])
+        models.append(row)
+
+    document = {field: project[field] for field in PROJECT_FIELDS}
+    name, mime = _asset_ref(project['project_model_url'], '', 'project/model')
+    document['project_model_file'], document['project_model_mime'] = name, mime
+    if name:
+        document['project_model_url'] = None
+        files.append((name, lambda pk=project['id']: Project.objects.values_list(
+            'project_model_url', flat=True).get(pk=pk)))
+
+    manifest = {'format': FORMAT, 'version': VERSION, 'project': document, 'elements': elements, 'models': models}
+    return manifest, files
+
+
+class _Sink:
+    """Write-only file object whose contents are drained by the export generator."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts.clear()
+        return data
+
+
+class ZipStream:
+    """Zip writer over an unseekable sink (sizes and CRCs go in data descriptors)."""
+
+    def __init__(self):
+        self.sink = _Sink()
+        self.zip = zipfile.ZipFile(self.sink, 'w', allowZip64=True)
+
+    def add(self, name, chunks, size, compress=False):
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+        # Assets are already compressed (PNG/JPEG/WebP/GLB); only the manifest is deflated.
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        with self.zip.open(info, 'w', force_zip64=size >= zipfile.ZIP64_LIMIT) as entry:
+            for chunk in chunks:
+                entry.write(chunk)
+                yield self.sink.drain()
+        yield self.sink.drain()
+
+    def close(self):
+        self.zip.close()
+        yield self.sink.drain()
+
+
+class TarStream:
+    """Tar writer emitting headers and data blocks directly; entry sizes must be known up front."""
+
+    def add(self, name, chunks, size, compress=False):
+        info = tarfile.TarInfo(name)
+        info.size, info.mtime, info.mode = size, int(time.time()), 0o644
+        yield info.tobuf(tarfile.PAX_FORMAT)
+        written = 0
+        for chunk in chunks:
+            written += len(chunk)
+            yield chunk
+        if written != size:
+            raise BundleError(f'{name}: wrote {written} bytes, expected {size}.')
+        yield tarfile.NUL * (-size % tarfile.BLOCKSIZE)
+
+    def close(self):
+        yield tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+
+
+def _decoded_slices(payload):
+    for start in range(0, len(payload), B64_SLICE):
+        yield base64.b64decode(payload[start:start + B64_SLICE])
+
+
+def _decoded_size(payload):
+    return len(payload) * 3 // 4 - payload[-2:].count('=')
+
+
+def export_bundle(project, archive='zip'):
+    """
+    Yield the bytes of a bundle for a project row (``id``, ``owner_id``,
+    ``template_id``, ``storage`` and ``PROJECT_FIELDS``).
+    """
+    manifest, files = build_manifest(storage.load_documents([project])[0])
+    writer = ZipStream() if archive == 'zip' else TarStream()
+    document = json.dumps(manifest, ensure_ascii=False).encode()
+    yield from filter(None, writer.add(MANIFEST_NAME, [document], len(document), compress=True))
+    for name, load in files:
+        # One row at a time: memory holds at most one asset's data URL.
+        _, payload = _data_url_parts(load())
+        if payload is not None:
+            yield from filter(None, writer.add(name, _decoded_slices(payload), _decoded_size(payload)))
+    yield from filter(None, writer.close())
+
+
+class _LimitedReader:
+    """Reads ``fileobj`` and raises ``RequestTooLarge`` once more than ``limit`` bytes came through."""
+
+    def __init__(self, fileobj, limit):
+        self.fileobj, self.limit, self.read_bytes = fileobj, limit, 0
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.read_bytes += len(data)
+        if self.read_bytes > self.limit:
+            raise RequestTooLarge(f'Bundle is larger than {self.limit} bytes.')
+        return data
+
+
+def bundle_max_bytes():
+    """The largest bundle the quotas could use: a manifest, a project model and a full quota of assets."""
+    asset = _data_url_max_bytes()
+    # A megabyte for archive headers and padding.
+    return (settings.REQUEST_MAX_BODY_BYTES + (CREATED_MODEL_LIMIT + 1) * asset
+            + UPLOADED_MODEL_LIMIT * UPLOADED_MODEL_MAX_BYTES + 1024 * 1024)
+
+
+def archive_entries(fileobj, archive):
+    """Yield ``(name, file object)`` for every regular file, ``project.json`` first for zips."""
+    limit = bundle_max_bytes()
+    if hasattr(fileobj, 'seekable') and fileobj.seekable():
+        size = fileobj.seek(0, 2)
+        fileobj.seek(0)
+        if size > limit:
+            raise RequestTooLarge(f'Bundle is larger than {limit} bytes.')
+    else:
+        fileobj = _LimitedReader(fileobj, limit)
+    if archive == 'tar':
+        try:
+            with tarfile.open(fileobj=fileobj, mode='r|*') as tar:
+                for member in tar:
+                    if member.isfile():
+                        yield member.name, tar.extractfile(member)
+        except tarfile.TarError as exc:
+            raise BundleError(f'Invalid tar archive: {exc}')
+        return
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+        if isinstance(fileobj, _LimitedReader):
+            shutil.copyfileobj(fileobj, spool, READ_CHUNK)
+            spool.seek(0)
+            fileobj = spool
+        try:
+            bundle = zipfile.ZipFile(fileobj)
+        except zipfile.BadZipFile as exc:
+            raise BundleError(f'Invalid zip archive: {exc}')
+        with bundle:
+            for info in sorted(bundle.infolist(), key=lambda i: i.filename != MANIFEST_NAME):
+                if not info.is_dir():
+                    with bundle.open(info) as entry:
+                        yield info.filename, entry
+
+
+def _clean(values, model, fields, label, strings):
+    """
+    Check a manifest object's ``fields`` against ``model``'s columns (type,
+    length, choices, nullability) and its ``strings`` keys for a string or
+    null; returns them cleaned. Missing fields take the column default.
+    """
+    if not isinstance(values, dict):
+        raise BundleError(f'Invalid {label} in {MANIFEST_NAME}.')
+    cleaned = {}
+    for name in fields:
+        field = model._meta.get_field(name)
+        value = values.get(name, field.get_default())
+        if field.get_internal_type() in ('CharField', 'TextField') and not isinstance(value, (str, type(None))):
+            raise BundleError(f'Invalid {label} {name}: must be a string.')
+        try:
+            cleaned[name] = field.clean(value, None)
+        except ValidationError as exc:
+            raise BundleError(f'Invalid {label} {name}: {" ".join(exc.messages)}')
+    for name in strings:
+        cleaned[name] = values.get(name)
+        if cleaned[name] is not None and not isinstance(cleaned[name], str):
+            raise BundleError(f'Invalid {label} {name}: must be a string.')
+    if 'id' in fields and cleaned['id'] is None:
+        raise BundleError(f'Invalid {label}: no id.')
+    return cleaned
+
+
+def _mime(value, default):
+    if value is None:
+        return default
+    if not MIME.match(value):
+        raise BundleError(f'Invalid media type {value[:HEADER_LENGTH]!r}.')
+    return value
+
+
+def _clean_manifest(manifest):
+    """Return ``(document, elements, models)`` of a decoded manifest, validated; raises ``BundleError``."""
+    if not isinstance(manifest, dict):
+        raise BundleError(f'Invalid {MANIFEST_NAME}.')
+    if manifest.get('format') != FORMAT or manifest.get('version') != VERSION:
+        raise BundleError(f'Unsupported bundle format {manifest.get("format")!r} v{manifest.get("version")}.')
+    project = manifest.get('project')
+    document = _clean(project, Project, [f for f in PROJECT_FIELDS if f not in DOCUMENT_JSON], 'project',
+                      ('project_model_file', 'project_model_mime'))
+    for key, (kind, limit_key) in DOCUMENT_JSON.items():
+        document[key] = project.get(key, kind())
+        if not isinstance(document[key], kind):
+            raise BundleError(f'Invalid project {key}: must be a {"list" if kind is list else "object"}.')
+        limit = settings.JSON_MAX_ITEMS.get(limit_key)
+        if limit is not None and len(document[key]) > limit:
+            raise BundleError(f'Invalid project {key}: more than {limit} items.')
+    document['project_model_mime'] = _mime(document['project_model_mime'], 'application/octet-stream')
+    lists = []
+    for key, model, fields, label, strings in (
+        ('elements', Created3DModelM, ELEMENT_FIELDS, 'element', ('texture_file', 'texture_mime', 'texture_data_url')),
+        ('models', Uploaded3DModel, MODEL_FIELDS, 'model', ('file', 'mime', 'model_data_url')),
+    ):
+        if not isinstance(manifest.get(key, []), list):
+            raise BundleError(f'Invalid {key} in {MANIFEST_NAME}.')
+        lists.append([_clean(meta, model, fields, label, strings) for meta in manifest.get(key, [])])
+    for meta in lists[0]:
+        meta['texture_mime'] = _mime(meta['texture_mime'], 'image/png')
+    for meta in lists[1]:
+        meta['mime'] = _mime(meta['mime'], 'model/gltf-binary')
+    return document, *lists
+
+
+def _data_url_max_bytes():
+    """Most bytes of an asset whose data URL the API would accept in a request (``JSON_MAX_STRING_BYTES``)."""
+    return settings.JSON_MAX_STRING_BYTES * 3 // 4
+
+
+def _read_asset(entry, mime, limit=None, keep_bytes=False):
+    """Stream one archive entry into ``(digest, size, data URL, raw bytes or None)``."""
+    digest, parts, carry, size = hashlib.sha256(), [], b'', 0
+    raw = bytearray() if keep_bytes else None
+    while chunk := entry.read(READ_CHUNK):
+        size += len(chunk)
+        if limit is not None and size > limit:
+            raise BundleError(f'Asset larger than {limit} bytes.')
+        digest.update(chunk)
+        if raw is not None:
+            raw += chunk
+        chunk = carry + chunk
+        cut = len(chunk) - len(chunk) % 3
+        parts.append(base64.b64encode(chunk[:cut]).decode('ascii'))
+        carry = chunk[cut:]
+    parts.append(base64.b64encode(carry).decode('ascii'))
+    return digest.hexdigest(), size, f'data:{mime};base64,' + ''.join(parts), raw
+
+
+def _remap(items, key, mapping):
+    """Point ``key`` references at imported rows; references to rows not in the bundle are cleared."""
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        for holder in (item, item.get('data')):
+            if isinstance(holder, dict) and holder.get(key) is not None:
+                holder[key] = mapping.get(str(holder[key]))
+
+
+class BundleImporter:
+    """Create a project (plus its elements and models) for ``user`` from archive entries."""
+
+    def __init__(self, user):
+        self.user = user
+        self.element_map, self.model_map = {}, {}
+        self.pending_elements, self.pending_models = [], []
+        self.pending_bytes = 0
+        self.created_elements, self.created_models = [], []
+        self.reused = {'elements': 0, 'models': 0}
+        # (kind, content key) -> bundle id of the first entry with that content.
+        self.seen = {}
+        # (kind, bundle id, first bundle id) for duplicates inside the bundle.
+        self.aliases = []
+        self.element_count = Created3DModelM.objects.filter(owner=user).count()
+        self.model_count = Uploaded3DModel.objects.filter(owner=user).count()
+
+    def _queue(self, kind, old_id, row, size):
+        if kind == 'elements':
+            self.element_count += 1
+            if self.element_count > CREATED_MODEL_LIMIT:
+                raise BundleError(f'Import would exceed the limit of {CREATED_MODEL_LIMIT} created 3D models.')
+            self.pending_elements.append((str(old_id), row))
+        else:
+            self.model_count += 1
+            if self.model_count > UPLOADED_MODEL_LIMIT:
+                raise BundleError(f'Import would exceed the limit of {UPLOADED_MODEL_LIMIT} uploaded 3D models.')
+            self.pending_models.append((str(old_id), row))
+        self.pending_bytes += size
+        if self.pending_bytes >= FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        if self.pending_elements:
+            rows = Created3DModelM.objects.bulk_create([row for _, row in self.pending_elements])
+            self.element_map.update((old, row.pk) for (old, _), row in zip(self.pending_elements, rows))
+            self.created_elements += rows
+        if self.pending_models:
+            rows = Uploaded3DModel.objects.bulk_create([row for _, row in self.pending_models])
+            self.model_map.update((old, row.pk) for (old, _), row in zip(self.pending_models, rows))
+            self.created_models += rows
+        self.pending_elements, self.pending_models, self.pending_bytes = [], [], 0
+
+    def add_element(self, meta, entry):
+        digest, size, data_url, _ = _read_asset(entry, meta['texture_mime'], limit=_data_url_max_bytes())
+        existing = (Created3DModelM.objects.filter(owner=self.user, texture_hash=digest, text=meta['text'],
+                                                   color=meta['color']).values_list('pk', flat=True).first())
+        if self._dedupe('elements', meta['id'], (digest, meta['text'], meta['color']), existing):
+            return
+        self._queue('elements', meta['id'], Created3DModelM(
+            owner=self.user, name=meta['name'], text=meta['text'], color=meta['color'],
+            description=meta['description'], texture_data_url=data_url, texture_hash=digest,
+        ), size)
+
+    def add_model(self, meta, entry):
+        digest, size, data_url, content = _read_asset(
+            entry, meta['mime'], limit=UPLOADED_MODEL_MAX_BYTES, keep_bytes=True,
+        )
+        existing = self._find_model(digest, size)
+        if self._dedupe('models', meta['id'], digest, existing):
+            return
+        self._queue('models', meta['id'], Uploaded3DModel(
+            owner=self.user, name=meta['name'], model_file_name=meta['model_file_name'],
+            model_scale=meta['model_scale'], description=meta['description'], model_data_url=data_url,
+            **geometry_metadata(bytes(content), meta['model_file_name']),
+        ), size)
+
+    def _find_model(self, digest, size):
+        # Only rows of the same size (or saved before sizes were recorded) are decoded and hashed.
+        candidates = (Uploaded3DModel.objects.filter(Q(owner=self.user) | Q(system_model=True))
+                      .filter(Q(file_bytes=size) | Q(file_bytes__isnull=True)).values_list('pk', flat=True))
+        for pk in candidates:
+            _, payload = _data_url_parts(Uploaded3DModel.objects.values_list('model_data_url', flat=True).get(pk=pk))
+            if payload is not None and hashlib.sha256(base64.b64decode(payload)).hexdigest() == digest:
+                return pk
+        return None
+
+    def _dedupe(self, kind, old_id, key, existing_pk):
+        """Map ``old_id`` onto an identical existing or already-imported row; True when it was."""
+        mapping = self.element_map if kind == 'elements' else self.model_map
+        if existing_pk is not None:
+            mapping[str(old_id)] = existing_pk
+            self.reused[kind] += 1
+            return True
+        first = self.seen.setdefault((kind, key), str(old_id))
+        if first != str(old_id):
+            self.aliases.append((kind, str(old_id), first))
+            self.reused[kind] += 1
+            return True
+        return False
+
+    def run(self, entries):
+        entries = iter(entries)
+        name, entry = next(entries, (None, None))
+        if name != MANIFEST_NAME:
+            raise BundleError(f'Bundle must start with {MANIFEST_NAME}.')
+        # Read whole, so no larger than a request body could be.
+        content = entry.read(settings.REQUEST_MAX_BODY_BYTES + 1)
+        if len(content) > settings.REQUEST_MAX_BODY_BYTES:
+            raise BundleError(f'{MANIFEST_NAME} is larger than {settings.REQUEST_MAX_BODY_BYTES} bytes.')
+        try:
+            manifest = json.loads(content)
+        except (ValueError, RecursionError) as exc:
+            raise BundleError(f'Invalid {MANIFEST_NAME}: {exc}')
+        document, element_list, model_list = _clean_manifest(manifest)
+        if Project.objects.filter(owner=self.user).count() >= PROJECT_LIMIT:
+            raise BundleError(f'You have reached the limit of {PROJECT_LIMIT} projects.')
+
+        elements = {e['texture_file']: e for e in element_list if e['texture_file']}
+        models = {m['file']: m for m in model_list if m['file']}
+        for name, entry in entries:
+            if name in elements:
+                self.add_element(elements.pop(name), entry)
+            elif name in models:
+                self.add_model(models.pop(name), entry)
+            elif name and name == document['project_model_file']:
+                document['project_model_url'] = _read_asset(entry, document['project_model_mime'],
+                                                            limit=_data_url_max_bytes())[2]
+                document['project_model_file'] = None
+        missing = [*elements, *models, *filter(None, [document['project_model_file']])]
+        if missing:
+            raise BundleError(f'Bundle is missing {", ".join(sorted(missing))}.')
+
+        # Elements without a texture file (no texture, or a remote URL) carry their value inline.
+        for meta in element_list:
+            if not meta['texture_file']:
+                self._queue('elements', meta['id'], Created3DModelM(
+                    owner=self.user, name=meta['name'], text=meta['text'], color=meta['color'],
+                    description=meta['description'], texture_data_url=meta['texture_data_url'],
+                ), 0)
+        for meta in model_list:
+            if not meta['file']:
+                self._queue('models', meta['id'], Uploaded3DModel(
+                    owner=self.user, name=meta['name'], model_file_name=meta['model_file_name'],
+                    model_scale=meta['model_scale'], description=meta['description'],
+                    model_data_url=meta['model_data_url'] or '',
+                ), 0)
+        self.flush()
+        for kind, alias, first in self.aliases:
+            mapping = self.element_map if kind == 'elements' else self.model_map
+            mapping[alias] = mapping[first]
+
+        steps, connections = document['steps'], document['connections']
+        for key, mapping in (('custom3dElementId', self.element_map), ('uploadedModelId', self.model_map)):
+            _remap(steps, key, mapping)
+            _remap(connections, key, mapping)
+        project = storage.create(
+            steps, connections, owner=self.user, name=document['name'], project_type=document['project_type'],
+            project_model_url=document['project_model_url'],
+            guide=document['guide'], node_positions=document['node_positions'],
+        )
+        # ``bulk_create`` skips the signals that start background processing.
+        elements_created, models_created = self.created_elements, self.created_models
+        transaction.on_commit(lambda: [schedule_textures(e) for e in elements_created])
+        transaction.on_commit(lambda: [(schedule_lods(m), queue_model(m.pk)) for m in models_created])
+        return project
+
+
+def import_bundle(fileobj, archive, user):
+    """Import a bundle for ``user``; returns ``(project, stats)``. Raises ``BundleError``."""
+    importer = BundleImporter(user)
+    with transaction.atomic():
+        project = importer.run(archive_entries(fileobj, archive))
+    stats = {
+        'elements': {'created': len(importer.created_elements), 'reused': importer.reused['elements']},
+        'models': {'created': len(importer.created_models), 'reused': importer.reused['models']},
+    }
+    return project, stats
@@ -0,0 +1,60 @@
+"""
+Cached catalogue of public (``system_model=True``) uploaded models.
+
+The catalogue is materialized once per version and kept in the cache. The
+version lives in ``PublicCatalogueState`` and is bumped by the model signals in
+``projects.signals`` whenever a system model is created, changed or deleted.
+Its single row is created by the migration that adds the table.
+"""
+from django.core.cache import cache
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import PublicCatalogueState, Uploaded3DModel
+from .serializers import DERIVED_FIELDS, GEOMETRY_FIELDS
+
+CACHE_KEY = 'public-models:catalogue:%s'
+CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+CATALOGUE_FIELDS = (
+    'id', 'name', 'model_file_name', 'model_scale', 'description', 'system_model', *GEOMETRY_FIELDS, *DERIVED_FIELDS,
+)
+
+
+def get_state():
+    return PublicCatalogueState.objects.get(pk=1)
+
+
+def bump_version():
+    PublicCatalogueState.objects.filter(pk=1).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def asset_url(model_id, version, lod=None):
+    url = f"{reverse('public-model-asset', args=[model_id])}?v={version}"
+    return url if lod is None else f'{url}&lod={lod}'
+
+
+def build_catalogue(state):
+    entries = []
+    for row in Uploaded3DModel.objects.filter(system_model=True).order_by('pk').values(*CATALOGUE_FIELDS):
+        row['model_scale'] = float(row['model_scale'])
+        row['model_url'] = asset_url(row['id'], state.version)
+        row['lods'] = [{**lod, 'model_url': asset_url(row['id'], state.version, lod['level'])} for lod in row['lods']]
+        entries.append(row)
+    return {
+        'version': state.version,
+        'last_modified': state.updated_at,
+        'etag': f'"public-models-{state.version}"',
+        'entries': entries,
+    }
+
+
+def get_catalogue():
+    """Return the current catalogue, materializing it on the first request after a change."""
+    state = get_state()
+    catalogue = cache.get(CACHE_KEY % state.version)
+    if catalogue is None:
+        catalogue = build_catalogue(state)
+        cache.set(CACHE_KEY % state.version, catalogue, CACHE_TIMEOUT)
+    return catalogue
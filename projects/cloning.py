@@ -0,0 +1,91 @@
+"""
+Server-side project copies for ``duplicate`` and the template gallery.
+
+A copy is an ``INSERT ... SELECT`` (plus one per row table for projects whose
+steps are stored as rows): step, connection and guide JSON never leave the
+database, and the quota check is part of the same statement.
+Referenced elements, models and the thumbnail are shared by id and URL rather
+than copied; copies of a template may keep using its author's elements and
+models (see ``asset_owner_ids``).
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ChangeLog, Project, ProjectConnection, ProjectStep
+from .serializers import PROJECT_LIMIT
+
+# Columns taken from the source row as they are.
+COPIED_FIELDS = (
+    'project_type', 'project_model_url', 'steps', 'connections', 'guide', 'node_positions',
+    'thumbnail_key', 'thumbnail_url', 'thumbnail_updated_at', 'storage',
+)
+# Row table columns copied for ``rows`` projects (see ``projects.storage``).
+COPIED_ROW_FIELDS = {
+    ProjectStep: ('step_id', 'position', 'element', 'model', 'data'),
+    ProjectConnection: ('position', 'source', 'target', 'element', 'model', 'data'),
+}
+COPY_SUFFIX = ' (copy)'
+
+
+def copy_name(name):
+    max_length = Project._meta.get_field('name').max_length
+    return name[:max_length - len(COPY_SUFFIX)] + COPY_SUFFIX
+
+
+def copy_project(source_id, owner_id, name, template_id=None):
+    """
+    Copy project ``source_id`` for ``owner_id``; returns the new id, or ``None``
+    when the owner is at ``PROJECT_LIMIT`` (or the source no longer exists or
+    is marked for deletion). Projects marked for deletion do not count.
+    """
+    opts, qn = Project._meta, connection.ops.quote_name
+    table = qn(opts.db_table)
+    copied = ', '.join(qn(opts.get_field(field).column) for field in COPIED_FIELDS)
+    targets = ', '.join(qn(opts.get_field(field).column) for field in (
+        'owner', 'name', 'template', 'is_template', 'created_at', 'updated_at'))
+    pk, owner = qn(opts.pk.column), qn(opts.get_field('owner').column)
+    deleted_at = qn(opts.get_field('deleted_at').column)
+    # ``Project.objects`` hides rows marked for deletion; raw SQL has to skip them itself.
+    sql = (
+        f'INSERT INTO {table} ({targets}, {copied}) '
+        f'SELECT %s, %s, %s, %s, %s, %s, {copied} FROM {table} WHERE {pk} = %s AND {deleted_at} IS NULL '
+        f'AND (SELECT COUNT(*) FROM {table} WHERE {owner} = %s AND {deleted_at} IS NULL) < %s'
+    )
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    params = [owner_id, name, template_id, False, now, now, source_id, owner_id, PROJECT_LIMIT]
+    returning = connection.features.can_return_columns_from_insert
+    if returning:
+        sql += f' RETURNING {pk}'
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        if returning:
+            row = cursor.fetchone()
+            project_id = row[0] if row else None
+        else:
+            project_id = cursor.lastrowid if cursor.rowcount else None
+        if project_id is not None:
+            for model, fields in COPIED_ROW_FIELDS.items():
+                _copy_rows(cursor, model, fields, source_id, project_id)
+    if project_id is not None:
+        # Raw SQL skips the model signals.
+        ChangeLog.record(Project, [project_id])
+    return project_id
+
+
+def _copy_rows(cursor, model, fields, source_id, project_id):
+    opts, qn = model._meta, connection.ops.quote_name
+    columns = ', '.join(qn(opts.get_field(field).column) for field in fields)
+    project = qn(opts.get_field('project').column)
+    cursor.execute(
+        f'INSERT INTO {qn(opts.db_table)} ({project}, {columns}) '
+        f'SELECT %s, {columns} FROM {qn(opts.db_table)} WHERE {project} = %s',
+        [project_id, source_id],
+    )
+
+
+def asset_owner_ids(project):
+    """Users whose elements and models a project row (``owner_id``, ``template_id``) may reference."""
+    owners = [project['owner_id']]
+    if project.get('template_id'):
+        owners += Project.objects.filter(pk=project['template_id']).values_list('owner_id', flat=True)
+    return owners
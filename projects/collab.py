@@ -0,0 +1,400 @@
+"""
+Real-time collaborative editing over WebSockets.
+
+The owner and editors of a project connect to ``/ws/projects/<id>/``
+(authenticated by the access-token cookie) and exchange small JSON
+operations instead of PUTting the whole project:
+
+- ``{"type": "node.move", "node": "<id>", "position": {"x": 1, "y": 2}}``
+- ``{"type": "step.update", "step": "<id>", "fields": {"title": "..."}}``
+
+Each process keeps one ``Room`` per open project. Step edits are broadcast
+at once. Node moves are coalesced per node and broadcast as one
+``nodes.moved`` message every ``COLLAB_TICK`` seconds, so a drag at pointer
+rate costs a handful of messages per second however many editors watch.
+Messages fan out through a broker: in-process, or Redis pub/sub when
+``REDIS_URL`` is set so editors on different workers see each other. The
+process that received an operation merges it into ``Project`` every
+``COLLAB_PERSIST_INTERVAL`` seconds and when the room empties. Access is
+checked again then: edits of users who are no longer editors are dropped
+and their connections closed. Only positions of existing steps are kept.
+"""
+import asyncio
+import json
+import logging
+import math
+import re
+import uuid
+from http.cookies import CookieError, SimpleCookie
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from authentication.backends import CookieJWTAuthentication
+from .models import Project, ProjectStep
+from .storage import ROWS, step_id, update_steps
+
+logger = logging.getLogger(__name__)
+
+PATH = re.compile(r'^/ws/projects/(?P<project_id>\d+)/?$')
+CHANNEL = 'collab:%s'
+MAX_MESSAGE = 64 * 1024
+# Messages buffered per connection before a slow client is told to reload.
+QUEUE_SIZE = 256
+# Close codes: the 4xxx range mirrors HTTP statuses.
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+
+rooms = {}
+
+
+class OperationError(ValueError):
+    pass
+
+
+def close_old_connections():
+    """
+    ``django.db.close_old_connections`` without the connections inside an
+    atomic block: those belong to a transaction still running on this thread
+    (a ``TestCase``), and closing them would break it.
+    """
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.close_if_unusable_or_obsolete()
+
+
+def database_sync_to_async(fn):
+    """
+    ``sync_to_async`` for ORM calls. No request signals fire on this path, so
+    connections that broke or outlived ``CONN_MAX_AGE`` are closed around each
+    call, as channels' helper of the same name does.
+    """
+    def call(*args, **kwargs):
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(call)
+
+
+def parse_operation(text):
+    """Validate one client message and return it normalized; raises ``OperationError``."""
+    if len(text) > MAX_MESSAGE:
+        raise OperationError(f'Messages are limited to {MAX_MESSAGE} bytes.')
+    try:
+        op = json.loads(text)
+    except ValueError:
+        raise OperationError('Messages must be JSON.')
+    if not isinstance(op, dict):
+        raise OperationError('Messages must be JSON objects.')
+    if op.get('type') == 'node.move':
+        position = op.get('position')
+        if not (isinstance(op.get('node'), (str, int)) and isinstance(position, dict) and all(
+                isinstance(position.get(axis), (int, float)) and math.isfinite(position[axis]) for axis in 'xy')):
+            raise OperationError('node.move needs "node" and a numeric "position" {"x", "y"}.')
+        return {'type': 'node.move', 'node': str(op['node']), 'position': {'x': position['x'], 'y': position['y']}}
+    if op.get('type') == 'step.update':
+        fields = op.get('fields')
+        if not (isinstance(op.get('step'), (str, int)) and isinstance(fields, dict) and fields):
+            raise OperationError('step.update needs "step" and a non-empty "fields" object.')
+        if 'id' in fields:
+            raise OperationError('A step id cannot be changed.')
+        return {'type': 'step.update', 'step': str(op['step']), 'fields': fields}
+    raise OperationError(f'Unknown operation type {op.get("type")!r}.')
+
+
+def apply_operations(project_id, steps, positions):
+    """
+    Merge step field edits (``{step id: fields}``) and node positions into
+    the stored project; positions of nodes that are not steps are dropped.
+    """
+    with transaction.atomic():
+        project = Project.objects.select_for_update().filter(pk=project_id).first()
+        if project is None:
+            return
+        update_fields = ['node_positions', 'updated_at']
+        if project.storage == ROWS:
+            # Only the edited step rows are rewritten.
+            update_steps(project, steps)
+            step_ids = set(ProjectStep.objects.filter(project=project, step_id__in=positions)
+                           .values_list('step_id', flat=True))
+        else:
+            for step in project.steps:
+                if isinstance(step, dict) and str(step.get('id')) in steps:
+                    step.update(steps[str(step['id'])])
+            step_ids = {step_id(step) for step in project.steps}
+            update_fields.append('steps')
+        positions = {node: position for node, position in positions.items() if node in step_ids}
+        project.node_positions = {**(project.node_positions or {}), **positions}
+        project.save(update_fields=update_fields)
+
+
+class LocalBroker:
+    """Fan messages out to the rooms of this process."""
+
+    def __init__(self):
+        self.subscribers = {}
+
+    async def subscribe(self, channel, deliver):
+        self.subscribers.setdefault(channel, set()).add(deliver)
+
+    async def unsubscribe(self, channel, deliver):
+        subscribers = self.subscribers.get(channel, set())
+        subscribers.discard(deliver)
+        if not subscribers:
+            self.subscribers.pop(channel, None)
+
+    async def publish(self, channel, message):
+        self.deliver(channel, message)
+
+    def deliver(self, channel, message):
+        for deliver in list(self.subscribers.get(channel, ())):
+            deliver(message)
+
+
+class RedisBroker(LocalBroker):
+    """Fan messages out across processes; local rooms receive them when Redis delivers them back."""
+
+    def __init__(self, url):
+        import redis.asyncio as redis
+        super().__init__()
+        self.redis = redis.from_url(url)
+        self.pubsub = self.redis.pubsub()
+        self.listener = None
+
+    async def subscribe(self, channel, deliver):
+        first = channel not in self.subscribers
+        await super().subscribe(channel, deliver)
+        if first:
+            await self.pubsub.subscribe(channel)
+            if self.listener is None or self.listener.done():
+                self.listener = asyncio.create_task(self._listen())
+
+    async def unsubscribe(self, channel, deliver):
+        await super().unsubscribe(channel, deliver)
+        if channel not in self.subscribers:
+            await self.pubsub.unsubscribe(channel)
+
+    async def publish(self, channel, message):
+        await self.redis.publish(channel, json.dumps(message))
+
+    async def _listen(self):
+        async for item in self.pubsub.listen():
+            if item['type'] == 'message':
+                self.deliver(item['channel'].decode(), json.loads(item['data']))
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = RedisBroker(settings.REDIS_URL) if settings.REDIS_URL else LocalBroker()
+    return _broker
+
+
+class Room:
+    """The connections of one process to one project, plus the edits it still has to persist."""
+
+    def __init__(self, project_id, broker):
+        self.project_id = project_id
+        self.channel = CHANNEL % project_id
+        self.broker = broker
+        self.connections = {}  # client id -> outgoing asyncio.Queue
+        self.users = {}  # client id -> user id
+        self.moves = {}  # node id -> position, until the next tick
+        self.step_edits = []  # (user id, step id, fields) in arrival order, until the next persist
+        self.positions = {}  # node id -> (user id, position), until the next persist
+        self.task = None
+
+    async def join(self, client_id, queue, user_id):
+        self.connections[client_id] = queue
+        self.users[client_id] = user_id
+        if self.task is None:
+            await self.broker.subscribe(self.channel, self.deliver)
+            self.task = asyncio.create_task(self.run())
+
+    async def leave(self, client_id):
+        self.connections.pop(client_id, None)
+        self.users.pop(client_id, None)
+        if self.connections:
+            return
+        # Unlisted first, so a client joining meanwhile starts a fresh room.
+        if rooms.get(self.project_id) is self:
+            del rooms[self.project_id]
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        await self.broker.unsubscribe(self.channel, self.deliver)
+        await self.flush_moves()
+        await self.persist()
+
+    def deliver(self, message):
+        sender = message.get('from')
+        for client_id, queue in self.connections.items():
+            if client_id == sender:
+                continue
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # The client fell behind; drop its backlog and have it reload the project.
+                _replace_backlog(queue, {'type': 'resync'})
+
+    async def receive(self, client_id, op):
+        if client_id not in self.users:
+            return
+        if op['type'] == 'node.move':
+            limit = settings.JSON_MAX_ITEMS['nodePositions']
+            if op['node'] not in self.positions and len(self.positions) >= limit:
+                queue = self.connections[client_id]
+                if not queue.full():
+                    queue.put_nowait({'type': 'error', 'detail': f'At most {limit} nodes can move between saves.'})
+                return
+            self.moves[op['node']] = op['position']
+            self.positions[op['node']] = (self.users[client_id], op['position'])
+            return
+        self.step_edits.append((self.users[client_id], op['step'], op['fields']))
+        await self.broker.publish(self.channel, {
+            'type': 'step.updated', 'step': op['step'], 'fields': op['fields'], 'from': client_id,
+        })
+
+    async def flush_moves(self):
+        if self.moves:
+            moves, self.moves = self.moves, {}
+            await self.broker.publish(self.channel, {'type': 'nodes.moved', 'positions': moves})
+
+    async def persist(self):
+        if not (self.step_edits or self.positions):
+            return
+        step_edits, positions = self.step_edits, self.positions
+        self.step_edits, self.positions = [], {}
+        try:
+            allowed = await database_sync_to_async(editor_ids)(self.project_id)
+            self.revoke(allowed)
+            steps = {}
+            for user_id, step, fields in step_edits:
+                if user_id in allowed:
+                    steps.setdefault(step, {}).update(fields)
+            positions = {node: position for node, (user_id, position) in positions.items() if user_id in allowed}
+            await database_sync_to_async(apply_operations)(self.project_id, steps, positions)
+        except Exception:
+            logger.exception('Could not persist edits to project %s', self.project_id)
+
+    def revoke(self, allowed):
+        """Close the connections of users no longer in ``allowed``; their later operations are ignored."""
+        for client_id, user_id in list(self.users.items()):
+            if user_id not in allowed:
+                del self.users[client_id]
+                _replace_backlog(self.connections[client_id], {'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        persisted = loop.time()
+        while True:
+            await asyncio.sleep(settings.COLLAB_TICK)
+            await self.flush_moves()
+            if loop.time() - persisted >= settings.COLLAB_PERSIST_INTERVAL:
+                await self.persist()
+                persisted = loop.time()
+
+
+def authenticate(scope):
+    """Return the user of the access-token cookie in ``scope``, or ``None``."""
+    cookies = SimpleCookie()
+    try:
+        for name, value in scope.get('headers', []):
+            if name == b'cookie':
+                cookies.load(value.decode('latin-1'))
+    except CookieError:
+        return None
+    token = cookies.get(settings.ACCESS_TOKEN_COOKIE)
+    if token is None:
+        return None
+    backend = CookieJWTAuthentication()
+    try:
+        return backend.get_user(backend.get_validated_token(token.value))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def origin_allowed(scope):
+    """Browsers send cookies on cross-site WebSocket handshakes, so only CORS origins may connect."""
+    origin = dict(scope.get('headers', [])).get(b'origin')
+    return origin is None or origin.decode('latin-1') in settings.CORS_ALLOWED_ORIGINS
+
+
+def can_edit(user, project_id):
+    return Project.objects.filter(Q(owner=user) | Q(editors=user), pk=project_id).exists()
+
+
+def editor_ids(project_id):
+    """Ids of the users who may edit the project: its owner and editors (none once it is gone)."""
+    project = Project.objects.filter(pk=project_id).values('owner_id').first()
+    if project is None:
+        return set()
+    return {project['owner_id'], *Project.editors.through.objects.filter(project_id=project_id)
+            .values_list('userm_id', flat=True)}
+
+
+def _replace_backlog(queue, message):
+    """Drop what ``queue`` still holds and queue ``message`` instead."""
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+async def _forward(queue, send):
+    while True:
+        message = await queue.get()
+        if message['type'] == 'websocket.close':
+            await send(message)
+            return
+        await send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+
+async def application(scope, receive, send):
+    """ASGI application for ``/ws/projects/<id>/``."""
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    match = PATH.match(scope['path'])
+    if match is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    project_id = int(match['project_id'])
+    user = await database_sync_to_async(authenticate)(scope) if origin_allowed(scope) else None
+    if user is None or not await database_sync_to_async(can_edit)(user, project_id):
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+    await send({'type': 'websocket.accept'})
+
+    client_id = uuid.uuid4().hex
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    queue.put_nowait({'type': 'hello', 'project': project_id, 'client': client_id})
+    room = rooms.get(project_id)
+    if room is None:
+        room = rooms[project_id] = Room(project_id, get_broker())
+    await room.join(client_id, queue, user.pk)
+    forward = asyncio.create_task(_forward(queue, send))
+    try:
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                break
+            try:
+                op = parse_operation(event.get('text') or (event.get('bytes') or b'').decode('utf-8', 'replace'))
+            except OperationError as exc:
+                if not queue.full():
+                    queue.put_nowait({'type': 'error', 'detail': str(exc)})
+                continue
+            await room.receive(client_id, op)
+    finally:
+        forward.cancel()
+        await room.leave(client_id)
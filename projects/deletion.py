@@ -0,0 +1,145 @@
+"""
+Deleting projects and accounts in the background.
+
+A project can carry megabytes of compressed steps and data URLs, and an
+account cascades to every project, element and model it owns. Deleting that
+in the request would hold locks and write a burst of WAL in one transaction.
+Instead the rows are marked first, which hides them at once: projects get
+``deleted_at`` (``Project.objects`` skips them) and the account is
+deactivated, so its tokens stop working. A ``DeletionJob`` then removes the
+rows a bounded batch per transaction, pausing ``DELETION_PAUSE`` seconds
+between batches and adding each batch to ``deleted_rows``.
+
+System models of a deleted account belong to the public catalogue: they are
+handed to the first active superuser instead. Without one the job fails and
+the deactivated account is kept with them.
+
+Jobs run on a background thread (``projects.jobs.defer``); a job that failed
+or was cut short by a restart is finished by ``python manage.py run_deletions``. Running a job
+twice is harmless: every batch deletes whatever is still there.
+"""
+import logging
+import time
+from functools import partial
+
+from authentication.models import UserM
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import jobs
+from .models import Created3DModelM, DeletionJob, Project, ProjectConnection, ProjectStep, Uploaded3DModel
+
+logger = logging.getLogger(__name__)
+
+# Rows per transaction: step and edge rows are small, the others may hold
+# data URLs of several megabytes each.
+ROW_BATCH = 500
+BLOB_BATCH = 10
+# Columns loaded for the delete signals; the data URLs are never read.
+SIGNAL_FIELDS = {
+    Project: ('pk', 'owner_id'),
+    Created3DModelM: ('pk', 'owner_id'),
+    Uploaded3DModel: ('pk', 'owner_id', 'system_model'),
+}
+
+
+class DeletionError(Exception):
+    pass
+
+
+def delete_projects(user, project_ids):
+    """Hide ``user``'s projects among ``project_ids`` and queue their deletion; ``None`` if none matched."""
+    with transaction.atomic():
+        projects = Project.objects.filter(owner=user, pk__in=project_ids)
+        marked = list(projects.values_list('pk', flat=True))
+        if not marked:
+            return None
+        # ``update()`` logs the projects, so synced clients drop them now.
+        projects.update(deleted_at=timezone.now())
+        job = DeletionJob.objects.create(kind='projects', user_id=user.pk, project_ids=marked)
+    _schedule(job)
+    return job
+
+
+def delete_account(user):
+    """Deactivate ``user``, hide their projects and queue the deletion of everything they own."""
+    with transaction.atomic():
+        UserM.objects.filter(pk=user.pk).update(is_active=False)
+        Project.objects.filter(owner=user).update(deleted_at=timezone.now())
+        job = DeletionJob.objects.create(kind='account', user_id=user.pk)
+    _schedule(job)
+    return job
+
+
+def _schedule(job):
+    transaction.on_commit(lambda: jobs.defer(('deletion', job.pk), 0, partial(run, job.pk)))
+
+
+def run(job_id):
+    job = DeletionJob.objects.filter(pk=job_id).exclude(status='done').first()
+    if job is None:
+        return
+    job_row = DeletionJob.objects.filter(pk=job_id)
+    job_row.update(status='running', started_at=job.started_at or timezone.now(), error='')
+    try:
+        for deleted in _batches(job):
+            job_row.update(deleted_rows=F('deleted_rows') + deleted)
+            if settings.DELETION_PAUSE:
+                time.sleep(settings.DELETION_PAUSE)
+    except Exception as exc:
+        logger.exception('Deletion job %s failed', job_id)
+        job_row.update(status='failed', error=str(exc))
+        return
+    job_row.update(status='done', finished_at=timezone.now())
+
+
+def _batches(job):
+    """Delete the job's rows, yielding the number deleted by each transaction."""
+    projects = Project._base_manager.filter(deleted_at__isnull=False)
+    if job.kind == 'account':
+        projects = projects.filter(owner_id=job.user_id)
+    else:
+        projects = projects.filter(pk__in=job.project_ids)
+    for project_id in list(projects.values_list('pk', flat=True)):
+        yield from delete_in_batches(ProjectStep.objects.filter(project_id=project_id), ROW_BATCH)
+        yield from delete_in_batches(ProjectConnection.objects.filter(project_id=project_id), ROW_BATCH)
+        # Takes the share, its view counts and the editor links along.
+        yield from delete_in_batches(Project._base_manager.filter(pk=project_id), 1)
+    if job.kind == 'account':
+        yield from delete_in_batches(Created3DModelM.objects.filter(owner_id=job.user_id), BLOB_BATCH)
+        yield from delete_in_batches(Uploaded3DModel.objects.filter(owner_id=job.user_id, system_model=False),
+                                     BLOB_BATCH)
+        if not _hand_over_system_models(job.user_id):
+            raise DeletionError(f'User {job.user_id} owns system models and there is no active superuser '
+                                f'to take them.')
+        # Whatever is left is small: reset tokens, suggestions (kept, unlinked), editor links.
+        yield from delete_in_batches(UserM.objects.filter(pk=job.user_id, is_active=False), 1)
+
+
+def _hand_over_system_models(user_id):
+    """Give ``user_id``'s system models to the first active superuser; ``False`` when they have to stay."""
+    models = Uploaded3DModel.objects.filter(owner_id=user_id, system_model=True)
+    if not models.exists():
+        return True
+    heir = UserM.objects.filter(is_superuser=True, is_active=True).exclude(pk=user_id).order_by('pk').first()
+    if heir is None:
+        return False
+    models.update(owner=heir)
+    return True
+
+
+def delete_in_batches(queryset, size):
+    """Delete ``queryset`` ``size`` rows per transaction, yielding the rows deleted by each."""
+    model = queryset.model
+    while True:
+        with transaction.atomic():
+            pks = list(queryset.values_list('pk', flat=True)[:size])
+            if not pks:
+                return
+            rows = model._base_manager.filter(pk__in=pks)
+            if model in SIGNAL_FIELDS:
+                rows = rows.only(*SIGNAL_FIELDS[model])
+            deleted, _ = rows.delete()
+        yield deleted
@@ -0,0 +1,150 @@
+"""
+``CompressedJSONField``: a ``JSONField`` stored as zstd-compressed bytes.
+
+Large guide and connection documents compress poorly with Postgres's pglz
+TOAST compression and not at all below its 2 kB threshold. This field writes
+``b'z'`` + a zstd frame instead, compressed against the newest shared
+dictionary in ``JSONDictionary`` (trained by ``train_json_dictionary``) so
+that even small documents shrink. Values under ``MIN_COMPRESS_SIZE`` bytes,
+and every value when ``settings.PROJECT_JSON_CODEC`` is ``json``, are stored as
+``b'j'`` + plain JSON. Reads accept both forms, whichever mode wrote them;
+``recompress_project_json`` rewrites stored values in the current mode.
+
+Python code sees ordinary lists and dicts; the column is opaque to the
+database, so JSON lookups and key transforms (``guide__0__stepId``,
+``guide__contains``) raise ``FieldError`` rather than build SQL that cannot
+work on bytes. Only ``isnull`` is kept.
+"""
+import json
+import threading
+
+import orjson
+from django.conf import settings
+from django.db import models
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+PLAIN = b'j'
+ZSTD = b'z'
+# Below this many bytes of JSON a zstd frame header costs more than it saves.
+MIN_COMPRESS_SIZE = 64
+
+_dictionaries = {}  # zstd dict id -> ZstdCompressionDict
+_write_dict_id = None  # dictionary used for writes (0: none); looked up on first write
+# zstd contexts are not thread-safe: each thread keeps its own.
+_local = threading.local()
+
+
+def _dictionary(dict_id):
+    if dict_id not in _dictionaries:
+        from .models import JSONDictionary
+        data = JSONDictionary.objects.filter(dict_id=dict_id).values_list('data', flat=True).first()
+        if data is None:
+            raise ValueError(f'Unknown zstd dictionary {dict_id}.')
+        _dictionaries[dict_id] = zstandard.ZstdCompressionDict(bytes(data))
+    return _dictionaries[dict_id]
+
+
+def _compressor():
+    global _write_dict_id
+    if _write_dict_id is None:
+        from .models import JSONDictionary
+        newest = JSONDictionary.objects.order_by('-id').values_list('dict_id', flat=True).first()
+        if newest is not None:
+            _dictionary(newest)
+        _write_dict_id = newest or 0
+    dict_id = _write_dict_id
+    cached = getattr(_local, 'compressor', None)
+    if cached is None or cached[0] != dict_id:
+        options = {'dict_data': _dictionaries[dict_id]} if dict_id else {}
+        cached = _local.compressor = (dict_id, zstandard.ZstdCompressor(level=settings.PROJECT_JSON_LEVEL, **options))
+    return cached[1]
+
+
+def _decompressor(dict_id):
+    decompressors = _local.__dict__.setdefault('decompressors', {})
+    if dict_id not in decompressors:
+        options = {'dict_data': _dictionary(dict_id)} if dict_id else {}
+        decompressors[dict_id] = zstandard.ZstdDecompressor(**options)
+    return decompressors[dict_id]
+
+
+def use_dictionary(dictionary=None):
+    """
+    Compress this process's writes against ``dictionary`` (a
+    ``ZstdCompressionDict``), or with ``None`` against the newest stored one,
+    looked up again on the next write. Other processes switch on restart.
+    """
+    global _write_dict_id
+    if dictionary is not None:
+        _dictionaries[dictionary.dict_id()] = dictionary
+        _write_dict_id = dictionary.dict_id()
+    else:
+        _write_dict_id = None
+
+
+def dumps(value):
+    """Compact JSON bytes, as stored before compression."""
+    try:
+        return orjson.dumps(value)
+    except orjson.JSONEncodeError:
+        # Integers wider than 64 bits and the like.
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def _loads(data):
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+
+def encode(value, codec=None):
+    """Bytes stored for ``value``; ``codec`` defaults to ``settings.PROJECT_JSON_CODEC``."""
+    data = dumps(value)
+    codec = codec or settings.PROJECT_JSON_CODEC
+    if codec != 'zstd' or zstandard is None or len(data) < MIN_COMPRESS_SIZE:
+        return PLAIN + data
+    return ZSTD + _compressor().compress(data)
+
+
+def decode(data):
+    """The JSON value stored in ``data`` by ``encode``."""
+    data = bytes(data)
+    if data[:1] == ZSTD:
+        frame = data[1:]
+        return _loads(_decompressor(zstandard.get_frame_parameters(frame).dict_id).decompress(frame))
+    if data[:1] == PLAIN:
+        return _loads(data[1:])
+    raise ValueError('Not a CompressedJSONField value.')
+
+
+class CompressedJSONField(models.JSONField):
+    description = 'JSON stored as zstd-compressed bytes'
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def get_lookup(self, lookup_name):
+        return super().get_lookup(lookup_name) if lookup_name == 'isnull' else None
+
+    def get_transform(self, name):
+        return None
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return decode(value)
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return decode(value)
+        return value
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is None or hasattr(value, 'as_sql'):
+            return value
+        return connection.Database.Binary(encode(value))
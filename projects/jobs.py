@@ -0,0 +1,89 @@
+"""
+Process pool for CPU-bound background work (LODs, textures, thumbnails).
+
+Tasks run in worker processes and must not touch the database; their results
+are handed to a ``done`` callback in this process, which does the writes.
+With ``BACKGROUND_WORKERS = 0`` tasks run inline, which is what tests and the
+backfill commands use.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_deferred = {}
+_deferred_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # ``spawn`` keeps forked copies of Django's DB connections out of the workers.
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def _finish(done, future):
+    try:
+        done(future.result)
+    except Exception:
+        logger.exception('Background job callback failed')
+    finally:
+        # Runs on the executor's management thread, which owns its own connection.
+        connection.close()
+
+
+def submit(task, args, done, inline=None):
+    """
+    Run ``task(*args)`` and call ``done(result)`` in this process.
+
+    ``result`` is a zero-argument callable returning the task's value or raising
+    its exception, so ``done`` handles failures the same way inline and pooled.
+    """
+    if inline or (inline is None and settings.BACKGROUND_WORKERS <= 0):
+        done(lambda: task(*args))
+        return
+    future = get_executor().submit(task, *args)
+    future.add_done_callback(lambda f: _finish(done, f))
+
+
+def _run_deferred(key, fn):
+    with _deferred_lock:
+        _deferred.pop(key, None)
+    try:
+        fn()
+    except Exception:
+        logger.exception('Deferred job %s failed', key)
+    finally:
+        connection.close()
+
+
+def defer(key, delay, fn, inline=None):
+    """
+    Call ``fn()`` on a background thread ``delay`` seconds from now.
+
+    Further calls with the same ``key`` while one is pending are dropped, so a
+    burst of edits costs one run; ``fn`` should read the latest state itself.
+    Runs ``fn`` immediately when ``BACKGROUND_WORKERS`` is 0, unless ``inline``
+    is ``False``.
+    """
+    if inline or (inline is None and settings.BACKGROUND_WORKERS <= 0):
+        fn()
+        return
+    with _deferred_lock:
+        if key in _deferred:
+            return
+        timer = threading.Timer(delay, _run_deferred, (key, fn))
+        timer.daemon = True
+        _deferred[key] = timer
+    timer.start()
@@ -0,0 +1,103 @@
+"""
+Server-rendered text-label textures for created elements.
+
+A label is fully determined by ``(text, color, font, size)`` plus
+``RENDER_VERSION``, so its URL carries those parameters and can be cached
+forever by browsers and proxies. Rendered PNGs are memoized in a bounded
+in-process LRU and persisted in the content-addressed asset store, keyed by a
+hash of the parameters: identical labels across projects and users are
+rendered once. Only labels with the text and color of an existing element are
+persisted; the endpoint is public, and other renders are kept in the shared
+cache, so requests cannot grow the database.
+"""
+import hashlib
+import io
+from functools import lru_cache
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from .assets import save_asset
+from .models import Created3DModelM, LabelTexture, StoredAsset
+
+# Bump when rendering changes; it is part of every label URL.
+RENDER_VERSION = 1
+DEFAULT_FONT = 'default'
+DEFAULT_SIZE = 64
+MIN_SIZE, MAX_SIZE = 8, 256
+MAX_TEXT_LENGTH = 255
+CACHE_SIZE = 512
+# Labels no element uses, in the shared cache.
+TRANSIENT_KEY = 'label:%s'
+TRANSIENT_TIMEOUT = 60 * 60 * 24
+
+
+class LabelError(ValueError):
+    pass
+
+
+def label_key(text, color, font, size):
+    return hashlib.sha256(f'v{RENDER_VERSION}\0{text}\0{color}\0{font}\0{size}'.encode()).hexdigest()
+
+
+def label_url(text, color, font=DEFAULT_FONT, size=DEFAULT_SIZE):
+    query = urlencode({'text': text, 'color': color, 'font': font, 'size': size, 'v': RENDER_VERSION})
+    return f"{reverse('label')}?{query}"
+
+
+def validate(text, color, font, size):
+    """Return normalized ``(text, color, font, size)`` or raise ``LabelError``."""
+    if not text or len(text) > MAX_TEXT_LENGTH:
+        raise LabelError(f'text must be 1-{MAX_TEXT_LENGTH} characters.')
+    try:
+        ImageColor.getrgb(color)
+    except (ValueError, AttributeError):
+        raise LabelError(f'Unknown color {color!r}.')
+    if font not in settings.LABEL_FONTS:
+        raise LabelError(f'Unknown font {font!r}; available: {", ".join(sorted(settings.LABEL_FONTS))}.')
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise LabelError('size must be an integer.')
+    if not MIN_SIZE <= size <= MAX_SIZE:
+        raise LabelError(f'size must be between {MIN_SIZE} and {MAX_SIZE}.')
+    return text, color, font, size
+
+
+@lru_cache(maxsize=32)
+def _load_font(font, size):
+    path = settings.LABEL_FONTS[font]
+    return ImageFont.load_default(size) if path is None else ImageFont.truetype(path, size)
+
+
+def render_label(text, color, font, size):
+    """Render ``text`` on a transparent background and return PNG bytes."""
+    face = _load_font(font, size)
+    padding = max(2, size // 8)
+    left, top, right, bottom = ImageDraw.Draw(Image.new('L', (1, 1))).multiline_textbbox((0, 0), text, font=face)
+    image = Image.new('RGBA', (right - left + 2 * padding, bottom - top + 2 * padding), (0, 0, 0, 0))
+    ImageDraw.Draw(image).multiline_text((padding - left, padding - top), text, font=face, fill=color, align='center')
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def get_label(text, color, font, size):
+    """Return ``(key, png bytes)``, rendering only when no process, database or cache copy exists."""
+    key = label_key(text, color, font, size)
+    stored = StoredAsset.objects.filter(labels__key=key).values_list('data', flat=True).first()
+    if stored is not None:
+        return key, bytes(stored)
+    data = cache.get(TRANSIENT_KEY % key)
+    if data is not None:
+        return key, data
+    data = render_label(text, color, font, size)
+    if Created3DModelM.objects.filter(text=text, color=color).exists():
+        LabelTexture.objects.get_or_create(key=key, defaults={'asset_id': save_asset(data, 'image/png')})
+    else:
+        cache.set(TRANSIENT_KEY % key, data, TRANSIENT_TIMEOUT)
+    return key, data
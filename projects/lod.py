@@ -0,0 +1,86 @@
+"""
+Background level-of-detail generation for uploaded models.
+
+Decimation (``projects.decimation``) is CPU bound, so it runs in the
+``projects.jobs`` process pool rather than in the request worker.
+"""
+import base64
+import logging
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+from . import jobs
+from .catalogue import bump_version
+from .decimation import build_lods
+from .geometry import GeometryError, is_gltf
+from .models import Uploaded3DModel, Uploaded3DModelLOD
+from .utils import split_data_url
+
+logger = logging.getLogger(__name__)
+
+FULL_LEVEL = 100
+
+
+def _set_status(model_id, lod_status):
+    Uploaded3DModel.objects.filter(pk=model_id).update(lod_status=lod_status)
+
+
+@transaction.atomic
+def save_lods(model_id, variants):
+    summary = [
+        {'level': v['level'], 'triangle_count': v['triangle_count'], 'file_bytes': len(v['glb'])}
+        for v in variants
+    ]
+    if not Uploaded3DModel.objects.filter(pk=model_id).update(lods=summary, lod_status='ready'):
+        return  # Deleted while the job was running.
+    Uploaded3DModelLOD.objects.filter(model_id=model_id).delete()
+    Uploaded3DModelLOD.objects.bulk_create([
+        Uploaded3DModelLOD(
+            model_id=model_id, level=v['level'], triangle_count=v['triangle_count'], file_bytes=len(v['glb']),
+            model_data_url='data:model/gltf-binary;base64,' + base64.b64encode(v['glb']).decode('ascii'),
+        )
+        for v in variants
+    ])
+    if Uploaded3DModel.objects.filter(pk=model_id, system_model=True).exists():
+        # ``update()`` skips the model signals; the catalogue lists LOD URLs.
+        bump_version()
+
+
+def _complete(model_id, result):
+    try:
+        variants = result()
+    except GeometryError as exc:
+        logger.warning('Could not build LODs for model %s: %s', model_id, exc)
+        _set_status(model_id, 'failed')
+    except Exception:
+        logger.exception('LOD job for model %s crashed', model_id)
+        _set_status(model_id, 'failed')
+    else:
+        save_lods(model_id, variants)
+
+
+def schedule_lods(model, inline=None):
+    """
+    Queue LOD generation for ``model`` (needs ``pk``, ``model_data_url`` and ``model_file_name``).
+
+    Only glTF/GLB uploads are simplified; other formats are marked ``unsupported``.
+    """
+    _, content = split_data_url(model.model_data_url)
+    if content is None or not is_gltf(content, model.model_file_name):
+        _set_status(model.pk, 'unsupported')
+        return
+    _set_status(model.pk, 'processing')
+    jobs.submit(build_lods, (content, list(settings.LOD_LEVELS)), partial(_complete, model.pk), inline)
+
+
+def select_lod(model_id, level):
+    """
+    Return ``{'level', 'model_data_url'}`` for the coarsest variant keeping at least
+    ``level`` percent of the triangles, or ``None`` when only the original fits.
+    """
+    if level >= FULL_LEVEL:
+        return None
+    return (Uploaded3DModelLOD.objects.filter(model_id=model_id, level__gte=level)
+            .order_by('level').values('level', 'model_data_url').first())
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from projects.models import Project
+from projects.storage import DOCUMENT, ROWS, convert
+
+
+class Command(BaseCommand):
+    help = 'Move project steps and connections between JSON documents and step/connection rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('engine', choices=[ROWS, DOCUMENT])
+        parser.add_argument('--project', type=int, action='append', help='Only this project (repeatable).')
+
+    def handle(self, *args, **options):
+        projects = Project.objects.exclude(storage=options['engine'])
+        if options['project']:
+            projects = projects.filter(pk__in=options['project'])
+        converted, skipped = 0, []
+        for project in projects.only('pk', 'storage').iterator(chunk_size=100):
+            if convert(project, options['engine']):
+                converted += 1
+            else:
+                skipped.append(project.pk)
+        self.stdout.write(f'Converted {converted} projects to {options["engine"]} storage.')
+        if skipped:
+            self.stdout.write(f'Kept {len(skipped)} projects whose steps lack unique ids: {skipped}')
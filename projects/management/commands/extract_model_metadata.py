@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from projects.catalogue import bump_version
+from projects.models import Uploaded3DModel
+from projects.serializers import GEOMETRY_FIELDS, geometry_metadata
+from projects.utils import split_data_url
+
+
+class Command(BaseCommand):
+    help = 'Backfill geometry metadata columns for uploaded models.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-extract models that already have metadata.')
+
+    def handle(self, *args, **options):
+        queryset = Uploaded3DModel.objects.order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(file_bytes__isnull=True)
+        done = 0
+        for pk in queryset.values_list('pk', flat=True):
+            # One row at a time: each row carries a multi-megabyte data URL.
+            model = Uploaded3DModel.objects.only('pk', 'model_data_url', 'model_file_name').get(pk=pk)
+            _, content = split_data_url(model.model_data_url)
+            metadata = geometry_metadata(content, model.model_file_name)
+            if metadata:
+                Uploaded3DModel.objects.filter(pk=pk).update(**{f: metadata.get(f) for f in GEOMETRY_FIELDS})
+                done += 1
+        if done:
+            # ``update()`` skips the model signals; the catalogue lists these columns.
+            bump_version()
+        self.stdout.write(f'Extracted metadata for {done} models.')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from projects.lod import schedule_lods
+from projects.models import Uploaded3DModel
+
+
+class Command(BaseCommand):
+    help = 'Build level-of-detail variants for uploaded models that do not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild models that already have LODs.')
+
+    def handle(self, *args, **options):
+        queryset = Uploaded3DModel.objects.order_by('pk')
+        if not options['all']:
+            queryset = queryset.exclude(lod_status__in=['ready', 'unsupported'])
+        counts = {}
+        for pk in queryset.values_list('pk', flat=True):
+            # One row at a time: each row carries a multi-megabyte data URL.
+            model = Uploaded3DModel.objects.only('pk', 'model_data_url', 'model_file_name').get(pk=pk)
+            schedule_lods(model, inline=True)
+            lod_status = Uploaded3DModel.objects.values_list('lod_status', flat=True).get(pk=pk)
+            counts[lod_status] = counts.get(lod_status, 0) + 1
+        summary = ', '.join(f'{count} {lod_status}' for lod_status, count in sorted(counts.items()))
+        self.stdout.write(f'Processed {sum(counts.values())} models ({summary or "nothing to do"}).')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.partitioning import PartitioningError, drop_unpartitioned, partition
+
+
+class Command(BaseCommand):
+    help = ('Hash-partition the project, step and connection tables (PostgreSQL). '
+            'Writes to them wait until it finishes; run it in a maintenance window.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partitions', type=int, default=16)
+        parser.add_argument('--drop-old', action='store_true',
+                            help='Drop the unpartitioned copies kept by an earlier run instead.')
+
+    def handle(self, *args, **options):
+        if options['drop_old']:
+            dropped = drop_unpartitioned()
+            self.stdout.write(f'Dropped {", ".join(dropped) or "nothing"}.')
+            return
+        if options['partitions'] < 2:
+            raise CommandError('--partitions must be at least 2.')
+        try:
+            copied = partition(options['partitions'])
+        except PartitioningError as exc:
+            raise CommandError(str(exc))
+        if not copied:
+            self.stdout.write('The project tables are already partitioned.')
+        for table, rows in copied.items():
+            self.stdout.write(f'Partitioned {table} into {options["partitions"]} partitions ({rows} rows).')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from projects.models import Created3DModelM
+from projects.texture_jobs import schedule_textures
+
+
+class Command(BaseCommand):
+    help = 'Build resized/WebP texture variants for created elements that do not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild elements that already have variants.')
+
+    def handle(self, *args, **options):
+        queryset = Created3DModelM.objects.order_by('pk')
+        if options['all']:
+            queryset.update(texture_status='pending')
+        else:
+            queryset = queryset.exclude(texture_status__in=['ready', 'none'])
+        counts = {}
+        for pk in queryset.values_list('pk', flat=True):
+            # One row at a time: each row carries an inline data URL.
+            element = Created3DModelM.objects.only('pk', 'texture_data_url').get(pk=pk)
+            schedule_textures(element, inline=True)
+            texture_status = Created3DModelM.objects.values_list('texture_status', flat=True).get(pk=pk)
+            counts[texture_status] = counts.get(texture_status, 0) + 1
+        summary = ', '.join(f'{count} {texture_status}' for texture_status, count in sorted(counts.items()))
+        self.stdout.write(f'Processed {sum(counts.values())} elements ({summary or "nothing to do"}).')
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from projects.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = 'Delete sync change-log entries older than --days; clients with older cursors get a fresh snapshot.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30)
+
+    def handle(self, *args, **options):
+        # The newest entry is always kept: the lowest remaining id tells ``projects.sync`` what was pruned.
+        newest = ChangeLog.objects.order_by('-id').values_list('id', flat=True).first()
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = ChangeLog.objects.filter(created_at__lt=cutoff).exclude(id=newest).delete()
+        self.stdout.write(f'Deleted {deleted} change-log entries older than {options["days"]} days.')
@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from authentication.models import ResetPasswordM
+from projects.deletion import delete_in_batches
+from projects.models import ProjectShare
+
+
+class Command(BaseCommand):
+    help = 'Delete expired password reset tokens and share links, a batch per transaction. Run it periodically.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        for label, model in (('password reset tokens', ResetPasswordM), ('share links', ProjectShare)):
+            deleted = 0
+            for rows in delete_in_batches(model.objects.filter(expires_at__lte=now), options['batch']):
+                deleted += rows
+                if settings.DELETION_PAUSE:
+                    time.sleep(settings.DELETION_PAUSE)
+            self.stdout.write(f'Deleted {deleted} expired {label}.')
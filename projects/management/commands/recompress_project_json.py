@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from projects.models import Project
+
+FIELDS = ('connections', 'guide')
+
+
+class Command(BaseCommand):
+    help = 'Rewrite stored project JSON with the current PROJECT_JSON_CODEC and newest dictionary.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=200)
+
+    def handle(self, *args, **options):
+        # The base manager does not log the rewrites: the documents themselves do not change.
+        projects = Project._base_manager.only('pk', *FIELDS).order_by('pk')
+        batch, total = [], 0
+        for project in projects.iterator(chunk_size=options['batch']):
+            batch.append(project)
+            if len(batch) == options['batch']:
+                total += Project._base_manager.bulk_update(batch, FIELDS)
+                batch = []
+        total += Project._base_manager.bulk_update(batch, FIELDS)
+        self.stdout.write(f'Rewrote {total} projects.')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from projects.models import Project, Uploaded3DModel
+from projects.thumbnails import refresh_model, refresh_project
+
+
+class Command(BaseCommand):
+    help = 'Render missing or stale thumbnails for projects and uploaded models.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-check every row, not only stale ones.')
+
+    def handle(self, *args, **options):
+        models = Uploaded3DModel.objects.order_by('pk')
+        projects = Project.objects.order_by('pk')
+        if not options['all']:
+            models = models.filter(thumbnail_key__isnull=True)
+            projects = projects.filter(Q(thumbnail_updated_at__isnull=True) | Q(thumbnail_updated_at__lt=F('updated_at')))
+        model_ids = list(models.values_list('pk', flat=True))
+        for pk in model_ids:
+            refresh_model(pk, inline=True)
+        project_ids = list(projects.values_list('pk', flat=True))
+        for pk in project_ids:
+            refresh_project(pk, inline=True)
+        self.stdout.write(f'Checked {len(model_ids)} models and {len(project_ids)} projects.')
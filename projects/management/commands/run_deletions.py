@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from projects.deletion import run
+from projects.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = 'Finish deletion jobs that are pending, failed, or were cut short by a restart.'
+
+    def handle(self, *args, **options):
+        job_ids = list(DeletionJob.objects.exclude(status='done').order_by('pk').values_list('pk', flat=True))
+        for job_id in job_ids:
+            run(job_id)
+        statuses = dict(DeletionJob.objects.filter(pk__in=job_ids).values_list('pk', 'status'))
+        failed = [job_id for job_id in job_ids if statuses.get(job_id) == 'failed']
+        self.stdout.write(f'Ran {len(job_ids)} deletion jobs.')
+        if failed:
+            self.stdout.write(f'Failed: {failed}')
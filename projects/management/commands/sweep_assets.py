@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from projects.assets import unreferenced_assets
+from projects.lod import schedule_lods
+from projects.models import Created3DModelM, StoredAsset, Uploaded3DModel
+from projects.texture_jobs import schedule_textures
+
+
+class Command(BaseCommand):
+    help = ('Restart texture and LOD jobs stuck in processing and delete stored assets no row references, '
+            'a batch per transaction. Run it periodically.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=100)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        self.retry_stale(now - settings.STALE_JOB_TIMEOUT)
+        stored_before = now - settings.ASSET_GC_GRACE
+        digests = unreferenced_assets(stored_before)
+        deleted = 0
+        for start in range(0, len(digests), options['batch']):
+            with transaction.atomic():
+                # ``stored_at`` again: content stored since the scan may be referenced any moment.
+                batch = StoredAsset.objects.filter(pk__in=digests[start:start + options['batch']],
+                                                   stored_at__lt=stored_before)
+                deleted += batch.only('pk').delete()[1].get(StoredAsset._meta.label, 0)
+            if settings.DELETION_PAUSE:
+                time.sleep(settings.DELETION_PAUSE)
+        self.stdout.write(f'Deleted {deleted} unreferenced assets.')
+
+    def retry_stale(self, started_before):
+        """Start again the jobs whose worker died: ``processing`` is set when a job is queued, with ``updated_at``."""
+        elements = Created3DModelM.objects.filter(texture_status='processing', updated_at__lt=started_before)
+        element_ids = list(elements.values_list('pk', flat=True))
+        # ``schedule_textures`` leaves a texture that is already processing alone.
+        Created3DModelM.objects.filter(pk__in=element_ids).update(texture_status='pending')
+        for pk in element_ids:
+            # One row at a time: each row carries an inline data URL.
+            schedule_textures(Created3DModelM.objects.only('pk', 'texture_data_url').get(pk=pk), inline=True)
+        models = Uploaded3DModel.objects.filter(lod_status='processing', updated_at__lt=started_before)
+        model_ids = list(models.values_list('pk', flat=True))
+        for pk in model_ids:
+            schedule_lods(Uploaded3DModel.objects.only('pk', 'model_data_url', 'model_file_name').get(pk=pk),
+                          inline=True)
+        self.stdout.write(f'Restarted {len(element_ids)} texture and {len(model_ids)} LOD jobs.')
@@ -0,0 +1,32 @@
+import zstandard
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.fields import dumps, use_dictionary
+from projects.models import JSONDictionary, Project, ProjectStep
+
+
+class Command(BaseCommand):
+    help = 'Train a zstd dictionary on stored project JSON; new writes are compressed against it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=112640, help='Dictionary size in bytes.')
+        parser.add_argument('--projects', type=int, default=5000, help='Most recently edited projects to sample.')
+
+    def handle(self, *args, **options):
+        samples = []
+        recent = Project.objects.order_by('-updated_at')[:options['projects']]
+        for documents in recent.values_list('steps', 'connections', 'guide'):
+            samples += [dumps(document) for document in documents if document]
+        # Row-stored projects keep their steps in ``ProjectStep``: sample their steps one by one.
+        step_rows = ProjectStep.objects.filter(project__in=recent.values('pk')).values_list('data', flat=True)
+        samples += [dumps(step) for step in step_rows.iterator(chunk_size=1000)]
+        try:
+            dictionary = zstandard.train_dictionary(options['size'], samples)
+        except zstandard.ZstdError as exc:
+            raise CommandError(f'Could not train a dictionary on {len(samples)} samples: {exc}')
+        JSONDictionary.objects.create(dict_id=dictionary.dict_id(), data=dictionary.as_bytes(), samples=len(samples))
+        use_dictionary(dictionary)
+        self.stdout.write(
+            f'Trained dictionary {dictionary.dict_id()} ({len(dictionary.as_bytes())} bytes) on {len(samples)} '
+            'samples. Restart the workers and run recompress_project_json to apply it to stored projects.'
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from projects.catalogue import get_catalogue
+
+
+class Command(BaseCommand):
+    help = 'Materialize the public system-model catalogue into the cache (run on deploy).'
+
+    def handle(self, *args, **options):
+        catalogue = get_catalogue()
+        self.stdout.write(
+            f'Public model catalogue v{catalogue["version"]} warmed with {len(catalogue["entries"])} models.'
+        )
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_public_catalogue_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploaded3dmodel',
+            name='bounding_box',
+            field=models.JSONField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploaded3dmodel',
+            name='file_bytes',
+            field=models.PositiveBigIntegerField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploaded3dmodel',
+            name='geometry_bytes',
+            field=models.PositiveBigIntegerField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploaded3dmodel',
+            name='material_count',
+            field=models.PositiveIntegerField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploaded3dmodel',
+            name='texture_bytes',
+            field=models.PositiveBigIntegerField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploaded3dmodel',
+            name='texture_count',
+            field=models.PositiveIntegerField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploaded3dmodel',
+            name='triangle_count',
+            field=models.PositiveIntegerField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploaded3dmodel',
+            name='vertex_count',
+            field=models.PositiveIntegerField(blank=True, default=None, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_uploaded3dmodel_geometry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploaded3dmodel',
+            name='lod_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed'), ('unsupported', 'Unsupported')], default='pending', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='uploaded3dmodel',
+            name='lods',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='Uploaded3DModelLOD',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField()),
+                ('model_data_url', models.TextField()),
+                ('triangle_count', models.PositiveIntegerField()),
+                ('file_bytes', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lod_variants', to='projects.uploaded3dmodel')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('model', 'level'), name='unique_model_lod_level')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_uploaded3dmodel_lod'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredAsset',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('content_type', models.CharField(max_length=100)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='created3dmodelm',
+            name='texture_hash',
+            field=models.CharField(blank=True, db_index=True, default=None, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='created3dmodelm',
+            name='texture_status',
+            field=models.CharField(choices=[('none', 'No texture'), ('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='created3dmodelm',
+            name='textures',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
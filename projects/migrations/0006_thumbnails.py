@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_created3dmodel_textures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='thumbnail_key',
+            field=models.CharField(blank=True, default=None, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='thumbnail_updated_at',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='thumbnail_url',
+            field=models.CharField(blank=True, default=None, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploaded3dmodel',
+            name='thumbnail_key',
+            field=models.CharField(blank=True, default=None, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploaded3dmodel',
+            name='thumbnail_url',
+            field=models.CharField(blank=True, default=None, max_length=200, null=True),
+        ),
+    ]
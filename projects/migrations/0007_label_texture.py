@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabelTexture',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='labels', to='projects.storedasset')),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_label_texture'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='is_template',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='template',
+            field=models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='copies', to='projects.project'),
+        ),
+    ]
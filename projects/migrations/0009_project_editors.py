@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_project_templates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='editors',
+            field=models.ManyToManyField(blank=True, related_name='edited_projects', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
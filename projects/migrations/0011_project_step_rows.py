@@ -0,0 +1,124 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+GAP = 1024
+BATCH_SIZE = 500
+REFERENCES = {'custom3dElementId': ('element_id', 'Created3DModelM'), 'uploadedModelId': ('model_id', 'Uploaded3DModel')}
+
+
+def _step_id(step):
+    value = step.get('id') if isinstance(step, dict) else None
+    return None if isinstance(value, bool) or not isinstance(value, (str, int)) else str(value)
+
+
+def _node_id(value):
+    return '' if value is None else str(value)
+
+
+def _storable(steps, connections):
+    ids = [_step_id(step) for step in steps]
+    return (
+        all(value is not None and len(value) <= 100 for value in ids) and len(set(ids)) == len(ids)
+        and all(isinstance(edge, dict) and all(len(_node_id(edge.get(end))) <= 100 for end in ('source', 'target'))
+                for edge in connections)
+    )
+
+
+def _foreign_keys(data, existing):
+    columns = {}
+    for key, (column, _) in REFERENCES.items():
+        try:
+            pk = int(data.get(key)) if isinstance(data, dict) else None
+        except (TypeError, ValueError):
+            pk = None
+        columns[column] = pk if pk in existing[key] else None
+    return columns
+
+
+def steps_to_rows(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    ProjectStep = apps.get_model('projects', 'ProjectStep')
+    ProjectConnection = apps.get_model('projects', 'ProjectConnection')
+    existing = {
+        key: set(apps.get_model('projects', model).objects.values_list('pk', flat=True))
+        for key, (_, model) in REFERENCES.items()
+    }
+    # Projects whose steps lack unique ids stay documents.
+    for project in Project.objects.only('pk', 'steps', 'connections').iterator(chunk_size=100):
+        if not _storable(project.steps, project.connections):
+            continue
+        ProjectStep.objects.bulk_create([
+            ProjectStep(project_id=project.pk, step_id=_step_id(step), position=index * GAP, data=step,
+                        **_foreign_keys(step, existing))
+            for index, step in enumerate(project.steps, 1)
+        ], batch_size=BATCH_SIZE)
+        ProjectConnection.objects.bulk_create([
+            ProjectConnection(project_id=project.pk, position=index * GAP, source=_node_id(edge.get('source')),
+                              target=_node_id(edge.get('target')), data=edge,
+                              **_foreign_keys(edge.get('data'), existing))
+            for index, edge in enumerate(project.connections, 1)
+        ], batch_size=BATCH_SIZE)
+        Project.objects.filter(pk=project.pk).update(storage='rows', steps=[], connections=[])
+
+
+def rows_to_steps(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    ProjectStep = apps.get_model('projects', 'ProjectStep')
+    ProjectConnection = apps.get_model('projects', 'ProjectConnection')
+    for pk in Project.objects.filter(storage='rows').values_list('pk', flat=True).iterator(chunk_size=100):
+        Project.objects.filter(pk=pk).update(
+            storage='document',
+            steps=list(ProjectStep.objects.filter(project_id=pk).order_by('position').values_list('data', flat=True)),
+            connections=list(ProjectConnection.objects.filter(project_id=pk).order_by('position')
+                             .values_list('data', flat=True)),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='storage',
+            field=models.CharField(choices=[('document', 'JSON document'), ('rows', 'Step and connection rows')], default='document', max_length=8),
+        ),
+        migrations.CreateModel(
+            name='ProjectConnection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.BigIntegerField()),
+                ('source', models.CharField(blank=True, default='', max_length=100)),
+                ('target', models.CharField(blank=True, default='', max_length=100)),
+                ('data', models.JSONField()),
+                ('element', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='projects.created3dmodelm')),
+                ('model', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='projects.uploaded3dmodel')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='connection_rows', to='projects.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'position'], name='projects_pr_project_31d365_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectStep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('step_id', models.CharField(max_length=100)),
+                ('position', models.BigIntegerField()),
+                ('data', models.JSONField()),
+                ('element', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='projects.created3dmodelm')),
+                ('model', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='projects.uploaded3dmodel')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='step_rows', to='projects.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'position'], name='projects_pr_project_ac03bd_idx')],
+                'constraints': [models.UniqueConstraint(fields=('project', 'step_id'), name='unique_project_step')],
+            },
+        ),
+        migrations.RunPython(steps_to_rows, rows_to_steps),
+    ]
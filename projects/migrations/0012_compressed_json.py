@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:27
+
+import projects.fields
+from django.db import migrations, models
+
+FIELDS = ('steps', 'connections', 'guide')
+BATCH_SIZE = 200
+
+
+def _copy(apps, source, target):
+    Project = apps.get_model('projects', 'Project')
+    batch = []
+    for project in Project.objects.only('pk', *(source % field for field in FIELDS)).iterator(chunk_size=BATCH_SIZE):
+        for field in FIELDS:
+            setattr(project, target % field, getattr(project, source % field))
+        batch.append(project)
+        if len(batch) == BATCH_SIZE:
+            Project.objects.bulk_update(batch, [target % field for field in FIELDS])
+            batch = []
+    Project.objects.bulk_update(batch, [target % field for field in FIELDS])
+
+
+def pack(apps, schema_editor):
+    _copy(apps, '%s', '%s_packed')
+
+
+def unpack(apps, schema_editor):
+    _copy(apps, '%s_packed', '%s')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_project_step_rows'),
+    ]
+
+    # JSON columns cannot be cast to bytes in place: the documents are copied
+    # into new columns, which take the old names in the next migration.
+    operations = [
+        migrations.CreateModel(
+            name='JSONDictionary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dict_id', models.PositiveBigIntegerField(unique=True)),
+                ('data', models.BinaryField()),
+                ('samples', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        *(migrations.AddField(
+            model_name='project',
+            name=f'{field}_packed',
+            field=projects.fields.CompressedJSONField(default=list),
+        ) for field in FIELDS),
+        migrations.RunPython(pack, unpack),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+FIELDS = ('steps', 'connections', 'guide')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_compressed_json'),
+    ]
+
+    operations = [
+        *(migrations.RemoveField(model_name='project', name=field) for field in FIELDS),
+        *(migrations.RenameField(model_name='project', old_name=f'{field}_packed', new_name=field) for field in FIELDS),
+    ]
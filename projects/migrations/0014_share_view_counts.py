@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0013_compressed_json_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShareViewCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveBigIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='share_views', to='projects.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'day'), name='unique_share_view_day')],
+            },
+        ),
+    ]
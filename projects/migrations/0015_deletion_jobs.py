@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_share_view_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('projects', 'Projects'), ('account', 'Account')], max_length=8)),
+                ('user_id', models.BigIntegerField(db_index=True)),
+                ('project_ids', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=7)),
+                ('deleted_rows', models.PositiveBigIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, default=None, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, default=None, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, default=None, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0015_deletion_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectshare',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='projectshare',
+            index=models.Index(condition=models.Q(('expires_at__isnull', False)), fields=['expires_at'], name='share_expiry'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0016_token_expiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedasset',
+            name='stored_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
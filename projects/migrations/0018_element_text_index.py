@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0017_stored_asset_stored_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='created3dmodelm',
+            name='text',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
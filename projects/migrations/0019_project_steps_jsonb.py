@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+BATCH_SIZE = 200
+
+
+def _copy(apps, source, target):
+    Project = apps.get_model('projects', 'Project')
+    batch = []
+    for project in Project.objects.only('pk', source).iterator(chunk_size=BATCH_SIZE):
+        setattr(project, target, getattr(project, source))
+        batch.append(project)
+        if len(batch) == BATCH_SIZE:
+            Project.objects.bulk_update(batch, [target])
+            batch = []
+    Project.objects.bulk_update(batch, [target])
+
+
+def unpack(apps, schema_editor):
+    _copy(apps, 'steps', 'steps_jsonb')
+
+
+def pack(apps, schema_editor):
+    _copy(apps, 'steps_jsonb', 'steps')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0018_element_text_index'),
+    ]
+
+    # Steps go back to a JSON column so step windows can be sliced in the
+    # database; as in 0012, the documents are copied into a new column that
+    # takes the old name in the next migration.
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='steps_jsonb',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RunPython(unpack, pack),
+    ]
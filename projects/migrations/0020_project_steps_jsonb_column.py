@@ -0,0 +1,13 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0019_project_steps_jsonb'),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name='project', name='steps'),
+        migrations.RenameField(model_name='project', old_name='steps_jsonb', new_name='steps'),
+    ]
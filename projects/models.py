@@ -2,8 +2,71 @@ import uuid
 
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.utils import timezone
 from threeddocs import settings
 from authentication.models import UserM
+from .fields import CompressedJSONField
+
+
+class ChangeLoggedQuerySet(models.QuerySet):
+    """
+    Queryset that logs bulk writes in ``ChangeLog``, so delta sync also sees
+    rows changed by ``update()`` and ``bulk_create()``, which skip the model
+    signals. ``update()`` also sets ``updated_at`` unless ``touch`` is off.
+    """
+
+    touch = True
+
+    def update(self, **kwargs):
+        pks = list(self.values_list('pk', flat=True))
+        if self.touch and 'updated_at' not in kwargs:
+            kwargs['updated_at'] = timezone.now()
+        rows = super().update(**kwargs)
+        if pks:
+            ChangeLog.record(self.model, pks)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        ChangeLog.record(self.model, [obj.pk for obj in objs if obj.pk is not None])
+        return objs
+
+    def bulk_delete(self):
+        """
+        Delete the rows without loading them and return their pks. Unlike
+        ``delete()`` no delete signals are sent: the rows are logged in one
+        write, and each relation is cascaded or nulled with one query.
+        """
+        pks = list(self.values_list('pk', flat=True))
+        if not pks:
+            return pks
+        ChangeLog.record(self.model, pks)
+        for relation in get_candidate_relations_to_delete(self.model._meta):
+            related = relation.related_model._base_manager.filter(**{f'{relation.field.name}__in': pks})
+            if relation.on_delete is models.SET_NULL:
+                related.update(**{relation.field.name: None})
+            elif relation.on_delete is models.CASCADE:
+                related.delete()
+            else:
+                raise NotImplementedError(f'bulk_delete() does not handle {relation}')
+        # What ``delete()`` runs when no signals or relations need the rows.
+        self.model._base_manager.filter(pk__in=pks)._raw_delete(self.db)
+        return pks
+
+
+class ProjectQuerySet(ChangeLoggedQuerySet):
+    # ``updated_at`` tracks content edits: thumbnails are rendered for it and
+    # bookkeeping ``update()`` calls must not move it.
+    touch = False
+
+
+class ProjectManager(models.Manager.from_queryset(ProjectQuerySet)):
+    """Hides projects marked for deletion (see ``projects.deletion``); ``Project._base_manager`` still sees them."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 
 class Project(models.Model):
     PROJECT_TYPE_CHOICES = [
@@ -19,12 +82,36 @@ class Project(models.Model):
         default='builder',
     )
     project_model_url = models.TextField(blank=True, null=True, default=None)
+    # ``jsonb`` so that ``storage.step_window`` can slice it in the database.
     steps = models.JSONField(default=list)
-    connections = models.JSONField(default=list)
-    guide = models.JSONField(default=list)
+    connections = CompressedJSONField(default=list)
+    guide = CompressedJSONField(default=list)
     node_positions = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Preview image maintained by projects.thumbnails; ``thumbnail_updated_at`` is
+    # the ``updated_at`` it was rendered for.
+    thumbnail_key = models.CharField(max_length=64, blank=True, null=True, default=None)
+    thumbnail_url = models.CharField(max_length=200, blank=True, null=True, default=None)
+    thumbnail_updated_at = models.DateTimeField(blank=True, null=True, default=None)
+    # Templates are listed in the gallery; copies made from one keep a link to it
+    # so they can keep using the elements and models of its author.
+    is_template = models.BooleanField(default=False, db_index=True)
+    template = models.ForeignKey('self', on_delete=models.SET_NULL, blank=True, null=True, default=None,
+                                 related_name='copies')
+    # Users besides the owner who may open and edit the project (see projects.collab).
+    editors = models.ManyToManyField(UserM, blank=True, related_name='edited_projects')
+    # Where steps and connections live (see projects.storage): in the JSON
+    # columns above, or one ``ProjectStep``/``ProjectConnection`` row each.
+    STORAGE_CHOICES = [
+        ('document', 'JSON document'),
+        ('rows', 'Step and connection rows'),
+    ]
+    storage = models.CharField(max_length=8, choices=STORAGE_CHOICES, default='document')
+    # Set when the project is deleted; a ``DeletionJob`` removes the rows later.
+    deleted_at = models.DateTimeField(blank=True, null=True, default=None, db_index=True)
+
+    objects = ProjectManager()
 
     class Meta:
         ordering = ['-updated_at']
@@ -36,10 +123,25 @@ class Project(models.Model):
 class Created3DModelM(models.Model):
     owner = models.ForeignKey(UserM, on_delete=models.CASCADE, related_name='created3d_models')
     name = models.CharField(max_length=255)
-    text = models.CharField(max_length=255)
+    # Indexed for projects.labels, which persists only the labels of existing elements.
+    text = models.CharField(max_length=255, db_index=True)
     color = models.CharField(max_length=12)
     description = models.CharField(max_length=1000, blank=True, null=True, default=None)
     texture_data_url = models.TextField(blank=True, null=True, default=None)
+    # Resized/WebP variants of ``texture_data_url`` built by projects.texture_jobs.
+    TEXTURE_STATUS_CHOICES = [
+        ('none', 'No texture'),
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    texture_hash = models.CharField(max_length=64, blank=True, null=True, default=None, db_index=True)
+    texture_status = models.CharField(max_length=12, choices=TEXTURE_STATUS_CHOICES, default='pending')
+    textures = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ChangeLoggedQuerySet.as_manager()
 
 
 class Uploaded3DModel(models.Model):
@@ -50,6 +152,75 @@ class Uploaded3DModel(models.Model):
     name = models.CharField(max_length=255)
     description = models.CharField(max_length=1000, blank=True, null=True, default=None)
     system_model = models.BooleanField(default=False) 
+    # Geometry metadata filled in by projects.geometry on upload (null when unparseable).
+    vertex_count = models.PositiveIntegerField(null=True, blank=True, default=None)
+    triangle_count = models.PositiveIntegerField(null=True, blank=True, default=None)
+    material_count = models.PositiveIntegerField(null=True, blank=True, default=None)
+    texture_count = models.PositiveIntegerField(null=True, blank=True, default=None)
+    file_bytes = models.PositiveBigIntegerField(null=True, blank=True, default=None)
+    geometry_bytes = models.PositiveBigIntegerField(null=True, blank=True, default=None)
+    texture_bytes = models.PositiveBigIntegerField(null=True, blank=True, default=None)
+    bounding_box = models.JSONField(null=True, blank=True, default=None)
+    # Simplified variants built in the background by projects.lod.
+    LOD_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+        ('unsupported', 'Unsupported'),
+    ]
+    lod_status = models.CharField(max_length=12, choices=LOD_STATUS_CHOICES, default='pending')
+    lods = models.JSONField(default=list, blank=True)
+    # Preview image maintained by projects.thumbnails.
+    thumbnail_key = models.CharField(max_length=64, blank=True, null=True, default=None)
+    thumbnail_url = models.CharField(max_length=200, blank=True, null=True, default=None)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ChangeLoggedQuerySet.as_manager()
+
+
+class Uploaded3DModelLOD(models.Model):
+    """A simplified GLB of an uploaded model; ``level`` is the percentage of triangles kept."""
+
+    model = models.ForeignKey(Uploaded3DModel, on_delete=models.CASCADE, related_name='lod_variants')
+    level = models.PositiveSmallIntegerField()
+    model_data_url = models.TextField()
+    triangle_count = models.PositiveIntegerField()
+    file_bytes = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['model', 'level'], name='unique_model_lod_level')]
+
+
+class ProjectStep(models.Model):
+    """One step of a project stored as rows; ``data`` is the step exactly as sent by the client."""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='step_rows')
+    step_id = models.CharField(max_length=100)
+    # Gapped ordering key, so a step can be inserted without renumbering its neighbours.
+    position = models.BigIntegerField()
+    # Indexed references parsed from ``data`` (null when unset or pointing at a missing row).
+    element = models.ForeignKey(Created3DModelM, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    model = models.ForeignKey(Uploaded3DModel, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    data = models.JSONField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['project', 'step_id'], name='unique_project_step')]
+        indexes = [models.Index(fields=['project', 'position'])]
+
+
+class ProjectConnection(models.Model):
+    """One edge of a project stored as rows; ``data`` is the edge exactly as sent by the client."""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='connection_rows')
+    position = models.BigIntegerField()
+    source = models.CharField(max_length=100, blank=True, default='')
+    target = models.CharField(max_length=100, blank=True, default='')
+    element = models.ForeignKey(Created3DModelM, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    model = models.ForeignKey(Uploaded3DModel, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    data = models.JSONField()
+
+    class Meta:
+        indexes = [models.Index(fields=['project', 'position'])]
 
 
 class ProjectShare(models.Model):
@@ -57,12 +228,141 @@ class ProjectShare(models.Model):
 
     project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='share')
     token = models.UUIDField(default=uuid.uuid4, unique=True)
+    # ``None``: the link works until the project is deleted.
+    expires_at = models.DateTimeField(blank=True, null=True, default=None)
+
+    class Meta:
+        # Only expiring links are indexed: the purge scans them, lookups go by token.
+        indexes = [models.Index(fields=['expires_at'], condition=models.Q(expires_at__isnull=False),
+                                name='share_expiry')]
 
     def __str__(self):
         return f'Share({self.project_id}): {self.token}'
 
 
+class ShareViewCount(models.Model):
+    """Opens of a project's share link per day, flushed in batches by ``projects.analytics``."""
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='share_views')
+    day = models.DateField()
+    views = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['project', 'day'], name='unique_share_view_day')]
+
+
+class DeletionJob(models.Model):
+    """Progress of deleting projects or a whole account in the background (``projects.deletion``)."""
+
+    KIND_CHOICES = [
+        ('projects', 'Projects'),
+        ('account', 'Account'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    # No foreign key: the job outlives the account it deletes.
+    user_id = models.BigIntegerField(db_index=True)
+    project_ids = models.JSONField(default=list)
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default='pending')
+    deleted_rows = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True, default=None)
+    finished_at = models.DateTimeField(blank=True, null=True, default=None)
+
+
 class Suggestion(models.Model):
     user = models.ForeignKey(UserM, on_delete=models.SET_NULL, null=True, blank=True)
     content = models.CharField(max_length=10000)
     added_at = models.DateTimeField(auto_now_add=True)
+
+
+class PublicCatalogueState(models.Model):
+    """Single row holding the version of the public system-model catalogue."""
+
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class StoredAsset(models.Model):
+    """Immutable binary addressed by the SHA-256 of its content, served from ``/api/assets/``."""
+
+    digest = models.CharField(max_length=64, primary_key=True)
+    content_type = models.CharField(max_length=100)
+    data = models.BinaryField()
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last time the content was stored (again); ``sweep_assets`` keeps recent rows, which may not be referenced yet.
+    stored_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+
+class JSONDictionary(models.Model):
+    """A zstd dictionary trained on project JSON (see projects.fields); the newest one compresses writes."""
+
+    dict_id = models.PositiveBigIntegerField(unique=True)
+    data = models.BinaryField()
+    samples = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class LabelTexture(models.Model):
+    """Maps a hash of label render parameters to the stored PNG (see projects.labels)."""
+
+    key = models.CharField(max_length=64, primary_key=True)
+    asset = models.ForeignKey(StoredAsset, on_delete=models.CASCADE, related_name='labels')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class ChangeLog(models.Model):
+    """
+    One row per change to a project, element or model, per user who can see it
+    (``user`` is null for system models, which everyone sees). Ids increase
+    monotonically, so the last id a client has seen is its sync cursor.
+    Entries for deleted rows act as tombstones: ``projects.sync`` reports any
+    logged row the user can no longer see as deleted.
+    """
+
+    KIND_CHOICES = [
+        ('project', 'Project'),
+        ('element', 'Created element'),
+        ('model', 'Uploaded model'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # No database constraint: entries may outlive the user, e.g. when the
+    # user's projects are logged while the user is being deleted.
+    user = models.ForeignKey(UserM, on_delete=models.DO_NOTHING, db_constraint=False, null=True,
+                             related_name='+')
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'id'])]
+
+    @classmethod
+    def log(cls, kind, entries):
+        """Write ``(object_id, user_id)`` entries of one kind."""
+        cls.objects.bulk_create([cls(kind=kind, object_id=pk, user_id=user_id) for pk, user_id in entries])
+
+    @classmethod
+    def record(cls, model, pks):
+        """Log a change to existing rows ``pks`` of ``model`` for everyone who can see them."""
+        rows = model._base_manager.filter(pk__in=pks)
+        if model is Project:
+            entries = list(rows.values_list('pk', 'owner_id'))
+            entries += Project.editors.through.objects.filter(project_id__in=pks).values_list('project_id', 'userm_id')
+            cls.log('project', entries)
+        elif model is Created3DModelM:
+            cls.log('element', rows.values_list('pk', 'owner_id'))
+        elif model is Uploaded3DModel:
+            entries = []
+            for pk, owner_id, system_model in rows.values_list('pk', 'owner_id', 'system_model'):
+                entries += [(pk, owner_id), (pk, None)] if system_model else [(pk, owner_id)]
+            cls.log('model', entries)
@@ -0,0 +1,116 @@
+"""
+Texture atlas packing.
+
+Rectangles are packed with first-fit decreasing height shelves: sorted by
+height, each goes on the first shelf with room left, else opens a new shelf,
+else a new atlas. Atlases are power-of-two sized and every rectangle gets a
+padding border filled by edge extrusion, so mipmapped sampling does not bleed
+between neighbours.
+
+This module has no Django imports.
+"""
+import io
+import math
+
+from PIL import Image
+
+WEBP_QUALITY = 90
+
+
+def next_power_of_two(value):
+    return 1 << max(int(value) - 1, 0).bit_length()
+
+
+def pack(sizes, max_size=2048, padding=2):
+    """
+    Place ``sizes`` (list of ``(width, height)``) into atlases of at most ``max_size``.
+
+    Returns ``(placements, atlas_sizes)`` where ``placements[i]`` is
+    ``(atlas_index, x, y)`` of the unpadded rectangle ``i``.
+    """
+    padded = [(w + 2 * padding, h + 2 * padding) for w, h in sizes]
+    area = sum(w * h for w, h in padded)
+    widest = max((w for w, _ in padded), default=1)
+    width = min(max_size, next_power_of_two(max(widest, math.ceil(math.sqrt(area)))))
+
+    order = sorted(range(len(sizes)), key=lambda i: (-padded[i][1], -padded[i][0]))
+    placements = [None] * len(sizes)
+    atlases = []  # per atlas: list of shelves [y, height, used_width]
+    for i in order:
+        w, h = padded[i]
+        for atlas_index, shelves in enumerate(atlases):
+            shelf = next((s for s in shelves if s[1] >= h and width - s[2] >= w), None)
+            if shelf is None:
+                top = shelves[-1][0] + shelves[-1][1]
+                if top + h > max_size:
+                    continue
+                shelf = [top, h, 0]
+                shelves.append(shelf)
+            break
+        else:
+            atlas_index, shelf = len(atlases), [0, h, 0]
+            atlases.append([shelf])
+        placements[i] = (atlas_index, shelf[2] + padding, shelf[0] + padding)
+        shelf[2] += w
+    atlas_sizes = [
+        (width, min(max_size, next_power_of_two(shelves[-1][0] + shelves[-1][1])))
+        for shelves in atlases
+    ]
+    return placements, atlas_sizes
+
+
+def _paste_padded(atlas, image, x, y, padding):
+    atlas.paste(image, (x, y))
+    if not padding:
+        return
+    w, h = image.size
+    # Extrude the outermost rows/columns into the padding border.
+    atlas.paste(image.crop((0, 0, w, 1)).resize((w, padding)), (x, y - padding))
+    atlas.paste(image.crop((0, h - 1, w, h)).resize((w, padding)), (x, y + h))
+    atlas.paste(atlas.crop((x, y - padding, x + 1, y + h + padding)).resize((padding, h + 2 * padding)),
+                (x - padding, y - padding))
+    atlas.paste(atlas.crop((x + w - 1, y - padding, x + w, y + h + padding)).resize((padding, h + 2 * padding)),
+                (x + w, y - padding))
+
+
+def build_atlases(textures, max_size=2048, padding=2):
+    """
+    Pack ``textures`` (``{key: image bytes}``) into WebP atlases.
+
+    Returns ``(atlas_images, entries)``: ``atlas_images`` is a list of
+    ``{'width', 'height', 'data'}`` and ``entries`` maps each key to
+    ``{'atlas', 'x', 'y', 'width', 'height', 'uv': [u0, v0, u1, v1]}``. Keys
+    whose image cannot be decoded are left out. UVs have v = 0 at the top.
+    """
+    images = {}
+    limit = max_size - 2 * padding
+    for key, data in textures.items():
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+            continue
+        image = image.convert('RGBA')
+        if image.width > limit or image.height > limit:
+            image.thumbnail((limit, limit), Image.Resampling.LANCZOS)
+        images[key] = image
+
+    keys = list(images)
+    placements, atlas_sizes = pack([images[k].size for k in keys], max_size, padding)
+    canvases = [Image.new('RGBA', size, (0, 0, 0, 0)) for size in atlas_sizes]
+    entries = {}
+    for key, (atlas_index, x, y) in zip(keys, placements):
+        image = images[key]
+        width, height = atlas_sizes[atlas_index]
+        _paste_padded(canvases[atlas_index], image, x, y, padding)
+        entries[key] = {
+            'atlas': atlas_index, 'x': x, 'y': y, 'width': image.width, 'height': image.height,
+            'uv': [x / width, y / height, (x + image.width) / width, (y + image.height) / height],
+        }
+
+    atlas_images = []
+    for canvas in canvases:
+        buffer = io.BytesIO()
+        canvas.save(buffer, 'WEBP', quality=WEBP_QUALITY)
+        atlas_images.append({'width': canvas.width, 'height': canvas.height, 'data': buffer.getvalue()})
+    return atlas_images, entries
@@ -0,0 +1,168 @@
+"""
+Hash partitioning of the project tables (PostgreSQL only, optional).
+
+``python manage.py partition_projects`` turns ``Project`` into a table
+partitioned by ``HASH (owner_id)``, and ``ProjectStep``/``ProjectConnection``
+into tables partitioned by ``HASH (project_id)``. Vacuum and index
+maintenance then work one partition at a time, and a query with
+``owner_id = ...`` (or ``owner_id IN (...)``) only reads the partitions of
+those owners.
+
+Postgres needs the partition key in every unique constraint, so the primary
+keys become ``(id, owner_id)`` and ``(id, project_id)``; ids still come from
+one sequence and Django keeps using ``id`` alone. For the same reason no
+foreign key can reference a partitioned table: the constraints pointing at
+these tables are dropped. ``on_delete`` is unaffected, Django applies it
+itself. Unique constraints added to these models later must include the
+partition key.
+
+From then on ``ProjectShare``, ``Project.editors``, ``ShareViewCount``,
+``ProjectStep``, ``ProjectConnection`` and ``Project.template`` keep only
+ORM-level integrity: Django's ``on_delete`` handles deletes made through the
+ORM, but raw SQL (a ``DELETE`` in psql, a ``_raw_delete()``) can leave rows
+pointing at projects that no longer exist.
+
+There is no reverse command. To undo it, stop writes, rename the tables back
+from ``<table>_unpartitioned`` (rows written since are lost) and re-create
+the dropped foreign keys (``sqlmigrate projects`` prints their definitions).
+
+The rows are copied while the tables are locked against writes (reads go
+on), then the tables are swapped in the same transaction. The originals are
+kept as ``<table>_unpartitioned`` until ``drop_unpartitioned()``, without
+their foreign keys: rows in them must not block deleting a user, element or
+model the live tables no longer reference.
+"""
+from django.db import connection, transaction
+
+from .models import Project, ProjectConnection, ProjectStep
+
+# Model, partition key column.
+TABLES = (
+    (Project, 'owner_id'),
+    (ProjectStep, 'project_id'),
+    (ProjectConnection, 'project_id'),
+)
+OLD_SUFFIX = '_unpartitioned'
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def _qn(name):
+    return connection.ops.quote_name(name)
+
+
+def is_partitioned(table):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [table])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def partition(partitions):
+    """Partition the tables that are not partitioned yet; returns the rows copied per table."""
+    if connection.vendor != 'postgresql':
+        raise PartitioningError('Partitioning needs PostgreSQL.')
+    tables = [(model._meta.db_table, key) for model, key in TABLES]
+    pending = [(table, key) for table, key in tables if not is_partitioned(table)]
+    if not pending:
+        return {}
+    copied = {}
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Django's foreign keys are deferred; checks still pending from this transaction would block ALTER TABLE.
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'LOCK TABLE {", ".join(_qn(table) for table, _ in pending)} IN SHARE MODE')
+        for table, key in pending:
+            copied[table] = _convert(cursor, table, key, partitions, {name for name, _ in tables})
+    return copied
+
+
+def _convert(cursor, table, key, partitions, partitioned):
+    new, old = f'{table}_partitioned', f'{table}{OLD_SUFFIX}'
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid), contype, confrelid::regclass::text FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('u', 'f')", [table],
+    )
+    constraints = cursor.fetchall()
+    # Indexes of their own; those backing the primary key or a constraint come back with it.
+    cursor.execute(
+        'SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid '
+        'WHERE x.indrelid = %s::regclass AND NOT x.indisprimary AND NOT EXISTS ('
+        '  SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid AND c.conrelid = x.indrelid)', [table],
+    )
+    indexes = cursor.fetchall()
+    for name, definition, contype, _ in constraints:
+        if contype == 'u' and key not in definition:
+            raise PartitioningError(f'{table}: unique constraint {name} does not include {key}.')
+    for name, definition in indexes:
+        if definition.startswith('CREATE UNIQUE') and key not in definition:
+            raise PartitioningError(f'{table}: unique index {name} does not include {key}.')
+
+    cursor.execute(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        "WHERE contype = 'f' AND confrelid = %s::regclass AND conrelid <> confrelid", [table],
+    )
+    for referencing, name in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE {_qn(referencing)} DROP CONSTRAINT {_qn(name)}')
+
+    cursor.execute(
+        f'CREATE TABLE {_qn(new)} (LIKE {_qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS '
+        f'INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY HASH ({_qn(key)})'
+    )
+    for remainder in range(partitions):
+        cursor.execute(
+            f'CREATE TABLE {_qn(f"{table}_p{remainder}")} PARTITION OF {_qn(new)} '
+            f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+        )
+    cursor.execute(f'INSERT INTO {_qn(new)} SELECT * FROM {_qn(table)}')
+    copied = cursor.rowcount
+    _carry_sequence(cursor, table, new)
+
+    # Free the index names for the new table, then swap the tables.
+    cursor.execute('SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass', [table])
+    for (index,) in cursor.fetchall():
+        cursor.execute(f'ALTER INDEX {_qn(index)} RENAME TO {_qn(f"{index[:63 - len(OLD_SUFFIX)]}{OLD_SUFFIX}")}')
+    cursor.execute(f'ALTER TABLE {_qn(table)} RENAME TO {_qn(old)}')
+    for name, _, contype, _ in constraints:
+        if contype == 'f':
+            cursor.execute(f'ALTER TABLE {_qn(old)} DROP CONSTRAINT {_qn(name)}')
+    cursor.execute(f'ALTER TABLE {_qn(new)} RENAME TO {_qn(table)}')
+
+    cursor.execute(f'ALTER TABLE {_qn(table)} ADD CONSTRAINT {_qn(f"{table}_pkey")} PRIMARY KEY (id, {_qn(key)})')
+    for name, definition, contype, referenced in constraints:
+        if contype == 'u' or referenced not in partitioned:
+            cursor.execute(f'ALTER TABLE {_qn(table)} ADD CONSTRAINT {_qn(name)} {definition}')
+    # The definitions name the table, which now is the partitioned one.
+    for _, definition in indexes:
+        cursor.execute(definition)
+    cursor.execute(f'ANALYZE {_qn(table)}')
+    return copied
+
+
+def _carry_sequence(cursor, table, new):
+    """
+    Give ``new`` an id sequence continuing where ``table``'s left off, so ids
+    of deleted rows are not reused. A plain sequence rather than an identity
+    column, which partitioned tables only support from PostgreSQL 17.
+    """
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+    cursor.execute(f'SELECT last_value, is_called FROM {cursor.fetchone()[0]}')
+    last_value, is_called = cursor.fetchone()
+    sequence = f'{new}_id_seq'
+    cursor.execute(f'CREATE SEQUENCE {_qn(sequence)} OWNED BY {_qn(new)}.id')
+    cursor.execute('SELECT setval(%s, %s, %s)', [sequence, last_value, is_called])
+    cursor.execute(f"ALTER TABLE {_qn(new)} ALTER COLUMN id SET DEFAULT nextval('{sequence}'::regclass)")
+
+
+def drop_unpartitioned():
+    """Drop the tables kept by ``partition()``; returns their names."""
+    dropped = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model, _ in TABLES:
+            old = f'{model._meta.db_table}{OLD_SUFFIX}'
+            cursor.execute('SELECT to_regclass(%s)', [old])
+            if cursor.fetchone()[0] is not None:
+                cursor.execute(f'DROP TABLE {_qn(old)}')
+                dropped.append(old)
+    return dropped
@@ -0,0 +1,191 @@
+"""
+CPU software rasterizer for model and project thumbnails.
+
+Triangles are projected orthographically from a fixed three-quarter view,
+flat shaded and resolved with a z-buffer built from NumPy array operations:
+every triangle expands to the pixels of its bounding box, coverage is tested
+with barycentric coordinates and the nearest fragment per pixel wins. The image
+is rendered at twice the output size and box-filtered down for anti-aliasing.
+
+This module has no Django imports; it runs inside worker processes.
+"""
+import io
+
+import numpy as np
+from PIL import Image
+
+from .decimation import decimate, world_primitives
+from .geometry import GeometryError, GltfDocument
+
+THUMBNAIL_SIZE = 256
+SUPERSAMPLE = 2
+# Larger meshes are decimated first; the detail is invisible at thumbnail size.
+MAX_TRIANGLES = 40_000
+# Bounding-box pixels expanded per batch, which bounds peak memory.
+BATCH_PIXELS = 2_000_000
+AMBIENT = 0.35
+LIGHT = np.array([-0.4, 0.7, 0.6]) / np.linalg.norm([-0.4, 0.7, 0.6])
+DEFAULT_COLOR = (0.62, 0.68, 0.78)
+WEBP_QUALITY = 80
+
+# Built-in ``modelPath`` / ``shapeType`` names of the editor and the mesh drawn for each.
+SHAPE_ALIASES = {'box': 'cube', 'cube': 'cube', 'sphere': 'sphere', 'cylinder': 'cylinder', 'cone': 'cone'}
+
+
+def _view_rotation(azimuth=np.radians(35), elevation=np.radians(25)):
+    """World-to-view rotation: x right, y up, z towards the camera."""
+    ca, sa, ce, se = np.cos(azimuth), np.sin(azimuth), np.cos(elevation), np.sin(elevation)
+    yaw = np.array([[ca, 0, -sa], [0, 1, 0], [sa, 0, ca]])
+    pitch = np.array([[1, 0, 0], [0, ce, -se], [0, se, ce]])
+    return pitch @ yaw
+
+
+def _fragments(px, py, depth, width):
+    """Return ``(pixel, depth, triangle)`` for every covered pixel centre."""
+    xmin = np.clip(np.floor(px.min(axis=1)), 0, width - 1).astype(np.int64)
+    xmax = np.clip(np.ceil(px.max(axis=1)), 0, width - 1).astype(np.int64)
+    ymin = np.clip(np.floor(py.min(axis=1)), 0, width - 1).astype(np.int64)
+    ymax = np.clip(np.ceil(py.max(axis=1)), 0, width - 1).astype(np.int64)
+    spans_x, spans_y = xmax - xmin + 1, ymax - ymin + 1
+    areas = spans_x * spans_y
+
+    pixels, depths, owners = [], [], []
+    start = 0
+    while start < len(px):
+        # Grow the batch until it would exceed BATCH_PIXELS (always at least one triangle).
+        cumulative = np.cumsum(areas[start:])
+        stop = start + max(1, int(np.searchsorted(cumulative, BATCH_PIXELS, side='right')))
+        batch = np.arange(start, stop)
+        counts = areas[batch]
+        triangle = np.repeat(batch, counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        x = xmin[triangle] + local % spans_x[triangle] + 0.5
+        y = ymin[triangle] + local // spans_x[triangle] + 0.5
+
+        x0, x1, x2 = (px[triangle, k] for k in range(3))
+        y0, y1, y2 = (py[triangle, k] for k in range(3))
+        denominator = (y1 - y2) * (x0 - x2) + (x2 - x1) * (y0 - y2)
+        nonzero = denominator != 0
+        denominator = np.where(nonzero, denominator, 1)
+        a = ((y1 - y2) * (x - x2) + (x2 - x1) * (y - y2)) / denominator
+        b = ((y2 - y0) * (x - x2) + (x0 - x2) * (y - y2)) / denominator
+        c = 1 - a - b
+        inside = nonzero & (a >= 0) & (b >= 0) & (c >= 0)
+        z = a * depth[triangle, 0] + b * depth[triangle, 1] + c * depth[triangle, 2]
+
+        pixels.append((y[inside] - 0.5).astype(np.int64) * width + (x[inside] - 0.5).astype(np.int64))
+        depths.append(z[inside])
+        owners.append(triangle[inside])
+        start = stop
+    return np.concatenate(pixels), np.concatenate(depths), np.concatenate(owners)
+
+
+def render_triangles(triangles, colors, size=THUMBNAIL_SIZE):
+    """
+    Render ``triangles`` (n, 3, 3) with per-triangle RGB ``colors`` (n, 3) in 0..1.
+
+    Returns an RGBA ``PIL.Image`` with a transparent background.
+    """
+    width = size * SUPERSAMPLE
+    canvas = np.zeros((width * width, 4), dtype=np.uint8)
+    if len(triangles):
+        points = triangles.reshape(-1, 3)
+        center = (points.min(axis=0) + points.max(axis=0)) / 2
+        radius = max(np.linalg.norm(points - center, axis=1).max(), 1e-9)
+        view = (triangles - center) @ _view_rotation().T
+        scale = width / 2 * 0.92 / radius
+        px = view[..., 0] * scale + width / 2
+        py = -view[..., 1] * scale + width / 2
+
+        normals = np.cross(view[:, 1] - view[:, 0], view[:, 2] - view[:, 0])
+        lengths = np.linalg.norm(normals, axis=1)
+        lengths[lengths == 0] = 1
+        # Two-sided lighting: uploaded meshes are often open or inconsistently wound.
+        shade = AMBIENT + (1 - AMBIENT) * np.abs(normals @ LIGHT) / lengths
+        shaded = np.clip(colors * shade[:, None] * 255, 0, 255).astype(np.uint8)
+
+        pixel, depth, owner = _fragments(px, py, view[..., 2], width)
+        if len(pixel):
+            # Nearest fragment first within each pixel (larger z is closer).
+            order = np.lexsort((-depth, pixel))
+            pixel, owner = pixel[order], owner[order]
+            first = np.concatenate([[True], pixel[1:] != pixel[:-1]])
+            canvas[pixel[first], :3] = shaded[owner[first]]
+            canvas[pixel[first], 3] = 255
+    image = Image.fromarray(canvas.reshape(width, width, 4), 'RGBA')
+    return image.resize((size, size), Image.Resampling.BOX)
+
+
+def model_triangles(data):
+    """Return ``(triangles (n, 3, 3), colors (n, 3))`` for a GLB/glTF document."""
+    document = GltfDocument.from_bytes(data)
+    materials = document.gltf.get('materials', [])
+    primitives = list(world_primitives(document))
+    total = sum(len(t) for _, t, _ in primitives)
+    if not total:
+        raise GeometryError('Model has no triangle geometry.')
+    triangles, colors = [], []
+    for positions, indices, material in primitives:
+        if total > MAX_TRIANGLES:
+            positions, indices = decimate(positions, indices, max(1, len(indices) * MAX_TRIANGLES // total))
+        color = DEFAULT_COLOR
+        if material is not None and material < len(materials):
+            color = materials[material].get('pbrMetallicRoughness', {}).get('baseColorFactor', color)[:3]
+        triangles.append(np.asarray(positions, dtype=np.float64)[np.asarray(indices, dtype=np.int64)])
+        colors.append(np.tile(np.asarray(color, dtype=np.float64), (len(indices), 1)))
+    return np.concatenate(triangles), np.concatenate(colors)
+
+
+def _revolve(profile, segments=32):
+    """Triangles of a surface of revolution around y for a ``profile`` of (radius, y) points."""
+    angles = np.linspace(0, 2 * np.pi, segments + 1)
+    rings = np.array([[(r * np.cos(a), y, r * np.sin(a)) for a in angles] for r, y in profile])
+    quads = []
+    for i in range(len(profile) - 1):
+        for j in range(segments):
+            p00, p01, p10, p11 = rings[i, j], rings[i, j + 1], rings[i + 1, j], rings[i + 1, j + 1]
+            quads += [(p00, p10, p11), (p00, p11, p01)]
+    return np.array(quads)
+
+
+def shape_triangles(shape):
+    """Triangles for a built-in editor shape; unknown names render as a cube."""
+    shape = SHAPE_ALIASES.get((shape or '').lower(), 'cube')
+    if shape == 'sphere':
+        theta = np.linspace(0, np.pi, 17)
+        return _revolve([(np.sin(t), np.cos(t)) for t in theta])
+    if shape == 'cylinder':
+        return _revolve([(0, 1), (1, 1), (1, -1), (0, -1)])
+    if shape == 'cone':
+        return _revolve([(0, 1), (1, -1), (0, -1)])
+    corners = np.array([[x, y, z] for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)], dtype=np.float64)
+    faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+    return np.array([corners[list(t)] for a, b, c, d in faces for t in ((a, b, c), (a, c, d))])
+
+
+def parse_color(value, default=DEFAULT_COLOR):
+    """Parse ``#rgb`` / ``#rrggbb`` into 0..1 floats."""
+    value = (value or '').lstrip('#')
+    if len(value) == 3:
+        value = ''.join(ch * 2 for ch in value)
+    try:
+        return tuple(int(value[i:i + 2], 16) / 255 for i in (0, 2, 4)) if len(value) == 6 else default
+    except ValueError:
+        return default
+
+
+def render_thumbnail(source, size=THUMBNAIL_SIZE):
+    """
+    Render a thumbnail and return WebP bytes.
+
+    ``source`` is ``{'model': bytes}`` for a GLB/glTF file or ``{'shape': name, 'color': '#rrggbb'}``
+    for a built-in shape. Raises ``GeometryError`` for unreadable models.
+    """
+    if 'model' in source:
+        triangles, colors = model_triangles(source['model'])
+    else:
+        triangles = shape_triangles(source.get('shape'))
+        colors = np.tile(parse_color(source.get('color')), (len(triangles), 1))
+    buffer = io.BytesIO()
+    render_triangles(triangles, colors, size).save(buffer, 'WEBP', quality=WEBP_QUALITY)
+    return buffer.getvalue()
@@ -1,7 +1,54 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
 from rest_framework import serializers
+from .geometry import GeometryError, extract_metadata
+from .labels import label_url
 from .models import Project, Created3DModelM, Uploaded3DModel, Suggestion
+from . import storage
 import base64
 
+logger = logging.getLogger(__name__)
+
+# Per-user quotas.
+PROJECT_LIMIT = 30
+CREATED_MODEL_LIMIT = 20
+UPLOADED_MODEL_LIMIT = 10
+UPLOADED_MODEL_MAX_BYTES = 10 * 1024 * 1024
+QUOTAS = {
+    Created3DModelM: (CREATED_MODEL_LIMIT, 'created 3D models'),
+    Uploaded3DModel: (UPLOADED_MODEL_LIMIT, 'uploaded 3D models'),
+}
+
+# Read-only columns filled in from the uploaded file by ``projects.geometry``.
+GEOMETRY_FIELDS = (
+    'vertex_count', 'triangle_count', 'material_count', 'texture_count',
+    'file_bytes', 'geometry_bytes', 'texture_bytes', 'bounding_box',
+)
+# Read-only columns maintained by background jobs (``projects.lod``, ``projects.thumbnails``).
+DERIVED_FIELDS = ('lod_status', 'lods', 'thumbnail_url')
+# Formats datetimes in the fast read paths exactly as the model serializers do.
+DATETIME = serializers.DateTimeField()
+
+
+def check_quota(model, user, adding=1):
+    """Reject adding ``adding`` elements or models when that would exceed ``user``'s quota."""
+    limit, label = QUOTAS[model]
+    if model.objects.filter(owner=user).count() + adding > limit:
+        raise serializers.ValidationError(f'You have reached the limit of {limit} {label}.')
+
+
+def geometry_metadata(content, file_name):
+    """Extract geometry columns from decoded model bytes; unparseable files get nulls."""
+    if content is None:
+        return {}
+    try:
+        return extract_metadata(content, file_name)
+    except GeometryError as exc:
+        logger.warning('Could not extract geometry from %s: %s', file_name, exc)
+        return {'file_bytes': len(content)}
+
 
 class ProjectSerializer(serializers.ModelSerializer):
     projectType = serializers.ChoiceField(
@@ -18,6 +65,7 @@ class ProjectSerializer(serializers.ModelSerializer):
     )
     nodePositions = serializers.JSONField(source='node_positions', default=dict)
     lastModified = serializers.SerializerMethodField()
+    thumbnailUrl = serializers.CharField(source='thumbnail_url', read_only=True)
 
     class Meta:
         model = Project
@@ -31,43 +79,160 @@ class ProjectSerializer(serializers.ModelSerializer):
             'guide',
             'nodePositions',
             'lastModified',
+            'thumbnailUrl',
         ]
-        read_only_fields = ['id', 'lastModified']
+        read_only_fields = ['id', 'lastModified', 'thumbnailUrl']
 
     def validate(self, attrs):
         user = self.context['request'].user
         projects_count = Project.objects.filter(owner=user).count()
-        if self.instance is None and projects_count >= 30:
-            raise serializers.ValidationError('You have reached the limit of 30 projects.')
+        if self.instance is None and projects_count >= PROJECT_LIMIT:
+            raise serializers.ValidationError(f'You have reached the limit of {PROJECT_LIMIT} projects.')
         return super().validate(attrs)
 
     def get_lastModified(self, obj):
         return int(obj.updated_at.timestamp() * 1000)
 
+    def create(self, validated_data):
+        steps = validated_data.pop('steps', [])
+        connections = validated_data.pop('connections', [])
+        return storage.create(steps, connections, **validated_data)
+
+    def update(self, instance, validated_data):
+        steps = validated_data.pop('steps', None)
+        connections = validated_data.pop('connections', None)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        with transaction.atomic():
+            return storage.store(instance, steps, connections)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.storage == storage.ROWS:
+            data['steps'], data['connections'] = storage.documents(instance)
+        return data
+
+
+class ProjectReadListSerializer(serializers.ListSerializer):
+    """Reads the steps and connections of all rows-stored projects in a page at once."""
+
+    def to_representation(self, data):
+        return super().to_representation(storage.load_documents(list(data)))
+
+
+class ProjectReadSerializer(serializers.BaseSerializer):
+    """
+    Read-only fast path for ``ProjectSerializer``.
+
+    Works on ``Project.objects.values(*ProjectReadSerializer.values_fields)`` rows and
+    builds the same dict as ``ProjectSerializer`` without going through the
+    per-field machinery.
+    """
+
+    values_fields = (
+        'id', 'name', 'project_type', 'project_model_url', 'steps',
+        'connections', 'guide', 'node_positions', 'updated_at', 'thumbnail_url', 'storage',
+    )
+
+    class Meta:
+        list_serializer_class = ProjectReadListSerializer
+
+    def to_representation(self, row):
+        storage.load_documents([row])
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'projectType': row['project_type'],
+            'projectModelUrl': row['project_model_url'],
+            'steps': row['steps'],
+            'connections': row['connections'],
+            'guide': row['guide'],
+            'nodePositions': row['node_positions'],
+            'lastModified': int(row['updated_at'].timestamp() * 1000),
+            'thumbnailUrl': row['thumbnail_url'],
+        }
+
+
+class ProjectSummarySerializer(serializers.BaseSerializer):
+    """Project fields without step, connection and guide JSON, for galleries and copy results."""
+
+    values_fields = ('id', 'name', 'project_type', 'updated_at', 'thumbnail_url')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'projectType': row['project_type'],
+            'lastModified': int(row['updated_at'].timestamp() * 1000),
+            'thumbnailUrl': row['thumbnail_url'],
+        }
+
 
 class Created3dModelSerializer(serializers.ModelSerializer):
+    label_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Created3DModelM
-        fields = ['id', 'name', 'text', 'color', 'texture_data_url', 'description']
+        fields = ['id', 'name', 'text', 'color', 'texture_data_url', 'description', 'texture_status', 'textures',
+                  'label_url', 'updated_at']
+        read_only_fields = ['texture_status', 'textures', 'updated_at']
+
+    def get_label_url(self, obj):
+        return label_url(obj.text, obj.color) if obj.text else None
 
     def validate(self, attrs):
-        user = self.context['request'].user
-        created_models = Created3DModelM.objects.filter(owner=user).count()
-        if created_models >= 20:
-            raise serializers.ValidationError('You have reached the limit of 20 created 3D models.')
+        # Bulk creates check the quota once for the whole batch.
+        if not self.context.get('quota_checked'):
+            check_quota(Created3DModelM, self.context['request'].user)
         return super().validate(attrs)
-    
+
+    def build(self, validated_data):
+        """The unsaved element, for ``create`` or a ``bulk_create`` of many."""
+        return Created3DModelM(owner=self.context['request'].user, **validated_data)
+
     def create(self, validated_data):
-        user = self.context['request'].user
-        return Created3DModelM.objects.create(owner=user, **validated_data)
+        element = self.build(validated_data)
+        element.save(force_insert=True)
+        return element
+
+
+class Created3dModelReadSerializer(serializers.BaseSerializer):
+    """
+    Read-only fast path for ``Created3dModelSerializer`` over ``values()`` rows.
+
+    ``texture_inline`` replaces ``texture_data_url``: the list view leaves it
+    empty once variants are ready, so clients fetch one size from ``textures``.
+    """
+
+    values_fields = ('id', 'name', 'text', 'color', 'description', 'texture_status', 'textures', 'updated_at')
+
+    @staticmethod
+    def inline():
+        """The ``texture_inline`` annotation: processed textures are listed by URL only."""
+        return Case(When(texture_status='ready', then=Value(None)), default=F('texture_data_url'))
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'text': row['text'],
+            'color': row['color'],
+            'texture_data_url': row['texture_inline'],
+            'description': row['description'],
+            'texture_status': row['texture_status'],
+            'textures': row['textures'],
+            'label_url': label_url(row['text'], row['color']) if row['text'] else None,
+            'updated_at': DATETIME.to_representation(row['updated_at']),
+        }
 
 
 class Uploaded3dModelSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Uploaded3DModel
-        fields = ['id', 'name', 'model_file_name', 'model_scale', 'model_data_url', 'description', 'system_model']
+        fields = ['id', 'name', 'model_file_name', 'model_scale', 'model_data_url', 'description', 'system_model',
+                  *GEOMETRY_FIELDS, *DERIVED_FIELDS, 'updated_at']
+        read_only_fields = (*GEOMETRY_FIELDS, *DERIVED_FIELDS, 'updated_at')
         extra_kwargs = {
             'system_model': {'read_only': True},}
         
@@ -76,22 +241,59 @@ class Uploaded3dModelSerializer(serializers.ModelSerializer):
         if value and ';base64,' in value:
             base64_data = value.split(';base64,')[1]
             decoded = base64.b64decode(base64_data)
-            if len(decoded) > 10 * 1024 * 1024:  # 10 MB
+            if len(decoded) > UPLOADED_MODEL_MAX_BYTES:
                 raise serializers.ValidationError("Plik nie może być większy niż 10MB.")
+            self._model_content = decoded
         return value
     
     def validate(self, attrs):
-        user = self.context['request'].user
-        uploaded_models = Uploaded3DModel.objects.filter(owner=user).count()
-        if uploaded_models >= 10:
-            raise serializers.ValidationError('You have reached the limit of 10 uploaded 3D models.')
+        if not self.context.get('quota_checked'):
+            check_quota(Uploaded3DModel, self.context['request'].user)
         return super().validate(attrs)
 
+    def build(self, validated_data):
+        """The unsaved model with its geometry metadata, for ``create`` or a ``bulk_create`` of many."""
+        metadata = geometry_metadata(getattr(self, '_model_content', None), validated_data.get('model_file_name'))
+        return Uploaded3DModel(owner=self.context['request'].user, **validated_data, **metadata)
+
     def create(self, validated_data):
-        user = self.context['request'].user
-        return Uploaded3DModel.objects.create(owner=user, **validated_data)
+        model = self.build(validated_data)
+        model.save(force_insert=True)
+        return model
     
 
+class Uploaded3dModelReadSerializer(serializers.BaseSerializer):
+    """Read-only fast path for ``Uploaded3dModelSerializer`` over ``values()`` rows."""
+
+    values_fields = (
+        'id', 'name', 'model_file_name', 'model_scale', 'model_data_url', 'description', 'system_model',
+        *GEOMETRY_FIELDS, *DERIVED_FIELDS, 'updated_at',
+    )
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'model_file_name': row['model_file_name'],
+            'model_scale': float(row['model_scale']),
+            'model_data_url': row['model_data_url'],
+            'description': row['description'],
+            'system_model': row['system_model'],
+            'vertex_count': row['vertex_count'],
+            'triangle_count': row['triangle_count'],
+            'material_count': row['material_count'],
+            'texture_count': row['texture_count'],
+            'file_bytes': row['file_bytes'],
+            'geometry_bytes': row['geometry_bytes'],
+            'texture_bytes': row['texture_bytes'],
+            'bounding_box': row['bounding_box'],
+            'lod_status': row['lod_status'],
+            'lods': row['lods'],
+            'thumbnail_url': row['thumbnail_url'],
+            'updated_at': DATETIME.to_representation(row['updated_at']),
+        }
+
+
 class SuggestionSerializer(serializers.ModelSerializer):
     
     class Meta:
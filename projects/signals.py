@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from .catalogue import bump_version
+from .models import ChangeLog, Created3DModelM, Project, Uploaded3DModel
+from .texture_jobs import schedule_textures
+from .thumbnails import queue_model, queue_project
+
+
+@receiver(post_init, sender=Uploaded3DModel)
+def remember_system_flag(sender, instance, **kwargs):
+    instance._was_system_model = instance.system_model
+
+
+# Registered before ``bump_public_catalogue``, which resets ``_was_system_model``.
+@receiver(post_save, sender=Uploaded3DModel)
+@receiver(post_delete, sender=Uploaded3DModel)
+def log_model_change(sender, instance, **kwargs):
+    entries = [(instance.pk, instance.owner_id)]
+    if instance.system_model or instance._was_system_model:
+        entries.append((instance.pk, None))
+    ChangeLog.log('model', entries)
+
+
+@receiver(post_save, sender=Created3DModelM)
+@receiver(post_delete, sender=Created3DModelM)
+def log_element_change(sender, instance, **kwargs):
+    ChangeLog.log('element', [(instance.pk, instance.owner_id)])
+
+
+@receiver(post_save, sender=Project)
+def log_project_change(sender, instance, **kwargs):
+    ChangeLog.record(Project, [instance.pk])
+
+
+@receiver(pre_delete, sender=Project)
+def remember_editors(sender, instance, **kwargs):
+    instance._editor_ids = list(instance.editors.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Project)
+def log_project_delete(sender, instance, **kwargs):
+    ChangeLog.log('project', [(instance.pk, user_id) for user_id in [instance.owner_id, *instance._editor_ids]])
+
+
+@receiver(m2m_changed, sender=Project.editors.through)
+def log_editor_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # Added editors now see the project; removed ones get a tombstone.
+    if action == 'pre_clear':
+        related = instance.edited_projects if reverse else instance.editors
+        pk_set = set(related.values_list('pk', flat=True))
+    elif action not in ('post_add', 'post_remove'):
+        return
+    if reverse:
+        ChangeLog.log('project', [(project_id, instance.pk) for project_id in pk_set])
+    else:
+        ChangeLog.log('project', [(instance.pk, user_id) for user_id in pk_set])
+
+
+@receiver(post_save, sender=Uploaded3DModel)
+@receiver(post_delete, sender=Uploaded3DModel)
+def bump_public_catalogue(sender, instance, **kwargs):
+    # Also bump when a model stops being a system model so it leaves the catalogue.
+    if instance.system_model or instance._was_system_model:
+        bump_version()
+    instance._was_system_model = instance.system_model
+
+
+@receiver(post_save, sender=Uploaded3DModel)
+def refresh_model_thumbnail(sender, instance, **kwargs):
+    transaction.on_commit(lambda: queue_model(instance.pk))
+
+
+@receiver(post_save, sender=Project)
+def refresh_project_thumbnail(sender, instance, **kwargs):
+    transaction.on_commit(lambda: queue_project(instance.pk))
+
+
+@receiver(post_init, sender=Created3DModelM)
+def remember_texture(sender, instance, **kwargs):
+    # Read ``__dict__`` so deferred loads (``only()``) do not fetch the data URL.
+    instance._saved_texture = instance.__dict__.get('texture_data_url')
+
+
+@receiver(post_save, sender=Created3DModelM)
+def process_texture(sender, instance, created, **kwargs):
+    texture = instance.__dict__.get('texture_data_url')
+    if created or texture != instance._saved_texture:
+        transaction.on_commit(lambda: schedule_textures(instance))
+    instance._saved_texture = texture
@@ -0,0 +1,412 @@
+"""
+Storage engines for project steps and connections.
+
+``document`` projects keep both arrays in the ``Project.steps`` and
+``Project.connections`` JSON columns, so any edit rewrites the whole document.
+``rows`` projects keep one ``ProjectStep`` per step and one
+``ProjectConnection`` per edge, each holding the item unchanged in ``data``,
+ordered by a gapped ``position`` and with the referenced element and model as
+indexed foreign keys; their JSON columns stay empty. A save only writes the
+rows that changed, the step endpoints touch a single row, and "which projects
+use this element" is an index lookup.
+
+Either way the API sends and receives the same arrays. New projects use
+``settings.PROJECT_STORAGE``; steps without unique ids can only be stored as a
+document, and a rows project that receives such steps moves back to it.
+``python manage.py convert_project_storage`` moves existing projects.
+"""
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Created3DModelM, Project, ProjectConnection, ProjectStep, Uploaded3DModel
+from .utils import referenced_ids
+
+DOCUMENT = 'document'
+ROWS = 'rows'
+# Distance between consecutive positions; a step inserted between two others takes the midpoint.
+GAP = 1024
+BATCH_SIZE = 500
+# Keys holding references, with the foreign key column they are indexed in.
+REFERENCES = {'custom3dElementId': ('element', Created3DModelM), 'uploadedModelId': ('model', Uploaded3DModel)}
+STEP_ID_LENGTH = ProjectStep._meta.get_field('step_id').max_length
+NODE_ID_LENGTH = ProjectConnection._meta.get_field('source').max_length
+
+
+class StepError(ValueError):
+    pass
+
+
+def step_id(step):
+    value = step.get('id') if isinstance(step, dict) else None
+    if isinstance(value, bool) or not isinstance(value, (str, int)):
+        return None
+    return str(value)
+
+
+def _node_id(value):
+    return '' if value is None else str(value)
+
+
+def storable_as_rows(steps, connections):
+    """Whether the arrays fit the row tables: steps need unique ids, edges must be objects."""
+    ids = [step_id(step) for step in steps]
+    if any(value is None or len(value) > STEP_ID_LENGTH for value in ids) or len(set(ids)) != len(ids):
+        return False
+    return all(
+        isinstance(edge, dict) and all(len(_node_id(edge.get(end))) <= NODE_ID_LENGTH for end in ('source', 'target'))
+        for edge in connections
+    )
+
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _reference_data(item, is_edge):
+    data = item.get('data') if is_edge else item
+    return data if isinstance(data, dict) else {}
+
+
+def _existing_references(items):
+    """``{key: set of referenced ids that exist}`` for ``(item, is_edge)`` pairs."""
+    wanted = defaultdict(set)
+    for item, is_edge in items:
+        data = _reference_data(item, is_edge)
+        for key in REFERENCES:
+            pk = _parse_id(data.get(key))
+            if pk is not None:
+                wanted[key].add(pk)
+    return {
+        key: set(model.objects.filter(pk__in=wanted[key]).values_list('pk', flat=True)) if wanted[key] else set()
+        for key, (_, model) in REFERENCES.items()
+    }
+
+
+def _foreign_keys(item, is_edge, existing):
+    data = _reference_data(item, is_edge)
+    columns = {}
+    for key, (field, _) in REFERENCES.items():
+        pk = _parse_id(data.get(key))
+        columns[f'{field}_id'] = pk if pk in existing[key] else None
+    return columns
+
+
+def _step_row(project, step, position, existing):
+    return ProjectStep(project=project, step_id=step_id(step), position=position, data=step,
+                       **_foreign_keys(step, False, existing))
+
+
+def _write_steps(project, steps):
+    current = {
+        row_step_id: (pk, position, data)
+        for row_step_id, pk, position, data in ProjectStep.objects.filter(project=project)
+        .values_list('step_id', 'pk', 'position', 'data')
+    }
+    existing = _existing_references((step, False) for step in steps)
+    created, changed = [], []
+    for index, step in enumerate(steps, 1):
+        row = _step_row(project, step, index * GAP, existing)
+        pk, position, data = current.pop(row.step_id, (None, None, None))
+        if pk is None:
+            created.append(row)
+        elif (position, data) != (row.position, step):
+            row.pk = pk
+            changed.append(row)
+    if current:
+        ProjectStep.objects.filter(pk__in=[pk for pk, _, _ in current.values()]).delete()
+    ProjectStep.objects.bulk_update(changed, ['position', 'data', 'element', 'model'], batch_size=BATCH_SIZE)
+    ProjectStep.objects.bulk_create(created, batch_size=BATCH_SIZE)
+
+
+def _write_connections(project, connections):
+    rows = ProjectConnection.objects.filter(project=project)
+    if list(rows.order_by('position').values_list('data', flat=True)) == connections:
+        return
+    rows.delete()
+    existing = _existing_references((edge, True) for edge in connections)
+    ProjectConnection.objects.bulk_create([
+        ProjectConnection(project=project, position=index * GAP, source=_node_id(edge.get('source')),
+                          target=_node_id(edge.get('target')), data=edge, **_foreign_keys(edge, True, existing))
+        for index, edge in enumerate(connections, 1)
+    ], batch_size=BATCH_SIZE)
+
+
+def documents(project):
+    """``(steps, connections)`` of a ``Project`` instance, whatever its storage."""
+    if project.storage != ROWS:
+        return project.steps, project.connections
+    return (
+        list(project.step_rows.order_by('position').values_list('data', flat=True)),
+        list(project.connection_rows.order_by('position').values_list('data', flat=True)),
+    )
+
+
+def load_documents(rows):
+    """
+    Fill ``steps`` and ``connections`` (those the rows were read with) of
+    ``Project`` ``values()`` rows with ``id`` and ``storage`` kept as rows, one
+    query per key for any number of projects. Filled rows are marked
+    ``document`` so they are not read twice.
+    """
+    pending = [row for row in rows if row.get('storage') == ROWS]
+    if not pending:
+        return rows
+    ids = [row['id'] for row in pending]
+    for model, key in ((ProjectStep, 'steps'), (ProjectConnection, 'connections')):
+        if not any(key in row for row in pending):
+            continue
+        items = defaultdict(list)
+        for project_id, data in (model.objects.filter(project_id__in=ids).order_by('project_id', 'position')
+                                 .values_list('project_id', 'data')):
+            items[project_id].append(data)
+        for row in pending:
+            if key in row:
+                row[key] = items[row['id']]
+    for row in pending:
+        row['storage'] = DOCUMENT
+    return rows
+
+
+def step_window(project, offset, limit):
+    """
+    ``(steps[offset:offset + limit], total)`` for a ``Project`` row with ``id``
+    and ``storage``, without reading or sending the other steps: rows projects
+    page over the position index, documents are sliced by Postgres.
+    """
+    if project['storage'] == ROWS:
+        rows = ProjectStep.objects.filter(project_id=project['id'])
+        window = list(rows.order_by('position').values_list('data', flat=True)[offset:offset + limit])
+        return window, rows.count()
+    if connection.vendor != 'postgresql':
+        steps = Project.objects.values_list('steps', flat=True).get(pk=project['id'])
+        return steps[offset:offset + limit], len(steps)
+    opts, qn = Project._meta, connection.ops.quote_name
+    steps = qn(opts.get_field('steps').column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT jsonb_array_length({steps}), ('
+            f'SELECT COALESCE(jsonb_agg(item.value ORDER BY item.n), \'[]\') '
+            f'FROM jsonb_array_elements({steps}) WITH ORDINALITY AS item(value, n) WHERE item.n > %s AND item.n <= %s'
+            f') FROM {qn(opts.db_table)} WHERE {qn(opts.pk.column)} = %s',
+            [offset, offset + limit, project['id']],
+        )
+        total, window = cursor.fetchone()
+    # Django reads jsonb as text and leaves decoding to ``JSONField``.
+    return (json.loads(window) if isinstance(window, str) else window), total
+
+
+def asset_ids(project, key):
+    """
+    Ids referenced under ``key`` (see ``REFERENCES``) by a ``Project`` row
+    with ``id``, ``storage``, ``steps`` and ``connections``; rows projects
+    answer from the foreign key columns without reading any step data.
+    """
+    if project['storage'] != ROWS:
+        return referenced_ids(project['steps'], project['connections'], key)
+    column = f'{REFERENCES[key][0]}_id'
+    ids = []
+    for model in (ProjectStep, ProjectConnection):
+        ids += model.objects.filter(project_id=project['id'], **{f'{column}__isnull': False}) \
+            .values_list(column, flat=True)
+    return ids
+
+
+def store(project, steps=None, connections=None):
+    """
+    Save ``project`` with new ``steps`` and/or ``connections`` (``None`` keeps
+    the current ones). Run it inside a transaction so readers never see a
+    half-written rows project.
+    """
+    if project.storage == ROWS and (steps is not None or connections is not None):
+        if not storable_as_rows(steps or [], connections or []):
+            current_steps, current_connections = documents(project)
+            project.storage = DOCUMENT
+            project.steps = current_steps if steps is None else steps
+            project.connections = current_connections if connections is None else connections
+            project.step_rows.all().delete()
+            project.connection_rows.all().delete()
+            project.save()
+            return project
+    if project.storage != ROWS:
+        if steps is not None:
+            project.steps = steps
+        if connections is not None:
+            project.connections = connections
+        project.save()
+        return project
+    project.steps, project.connections = [], []
+    project.save()
+    if steps is not None:
+        _write_steps(project, steps)
+    if connections is not None:
+        _write_connections(project, connections)
+    return project
+
+
+def create(steps, connections, **fields):
+    """Create a project in the configured engine (``document`` when the steps do not fit rows)."""
+    engine = settings.PROJECT_STORAGE
+    if engine == ROWS and not storable_as_rows(steps, connections):
+        engine = DOCUMENT
+    with transaction.atomic():
+        return store(Project(storage=engine, **fields), steps, connections)
+
+
+def convert(project, engine):
+    """
+    Move an existing project to ``engine`` without touching ``updated_at``;
+    returns ``False`` when its steps cannot be stored that way.
+    """
+    with transaction.atomic():
+        project = Project.objects.select_for_update().get(pk=project.pk)
+        if project.storage == engine:
+            return True
+        steps, connections = documents(project)
+        if engine == ROWS:
+            if not storable_as_rows(steps, connections):
+                return False
+            _write_steps(project, steps)
+            _write_connections(project, connections)
+            Project.objects.filter(pk=project.pk).update(storage=ROWS, steps=[], connections=[])
+        else:
+            project.step_rows.all().delete()
+            project.connection_rows.all().delete()
+            Project.objects.filter(pk=project.pk).update(storage=DOCUMENT, steps=steps, connections=connections)
+    return True
+
+
+def _touch(project):
+    """Mark a step edit: bump ``updated_at`` (logged for delta sync) and refresh the thumbnail."""
+    from .thumbnails import queue_project  # projects.thumbnails imports this module
+    Project.objects.filter(pk=project.pk).update(updated_at=timezone.now())
+    transaction.on_commit(lambda: queue_project(project.pk))
+
+
+def get_step(project, key):
+    """The step with id ``key``, or ``None``."""
+    if project.storage == ROWS:
+        return project.step_rows.filter(step_id=key).values_list('data', flat=True).first()
+    return next((step for step in project.steps if step_id(step) == key), None)
+
+
+def _position_after(project, after, moving=None):
+    """Position for a step inserted right after step ``after`` (``''`` for the start)."""
+    rows = project.step_rows.exclude(pk=moving).order_by('position')
+    if after == '':
+        first = rows.values_list('position', flat=True).first()
+        previous, following = 0, first
+    else:
+        previous = rows.filter(step_id=after).values_list('position', flat=True).first()
+        if previous is None:
+            raise StepError(f'There is no step {after!r}.')
+        following = rows.filter(position__gt=previous).values_list('position', flat=True).first()
+    if following is None:
+        return previous + GAP
+    if following - previous > 1:
+        return (previous + following) // 2
+    # No room left between the two: respace the whole project once.
+    renumbered = list(rows.only('pk', 'step_id'))
+    for index, row in enumerate(renumbered, 1):
+        row.position = index * GAP
+    ProjectStep.objects.bulk_update(renumbered, ['position'], batch_size=BATCH_SIZE)
+    return _position_after(project, after, moving)
+
+
+def _check_step_count(count):
+    """Refuse a new step when a project already has the ``JSON_MAX_ITEMS['steps']`` a full save may send."""
+    limit = settings.JSON_MAX_ITEMS.get('steps')
+    if limit is not None and count >= limit:
+        raise StepError(f'A project is limited to {limit} steps.')
+
+
+def put_step(project, key, step, after=None):
+    """
+    Create or replace step ``key``. A new step goes after step ``after``
+    (``''``: first), or last when ``after`` is ``None``; an existing one only
+    moves when ``after`` is given. Returns ``(stored step, created)``.
+    """
+    step = {**step, 'id': step.get('id', key)}
+    if step_id(step) != key:
+        raise StepError('The step id cannot be changed.')
+    if after == key:
+        raise StepError('A step cannot be placed after itself.')
+    with transaction.atomic():
+        project = Project.objects.select_for_update().get(pk=project.pk)
+        if project.storage == ROWS:
+            created = _put_step_row(project, key, step, after)
+        else:
+            steps = [item for item in project.steps if step_id(item) != key]
+            created = len(steps) == len(project.steps)
+            if created:
+                _check_step_count(len(steps))
+            if after is None and not created:
+                steps = [step if step_id(item) == key else item for item in project.steps]
+            elif after is None:
+                steps.append(step)
+            else:
+                index = 0 if after == '' else next(
+                    (i + 1 for i, item in enumerate(steps) if step_id(item) == after), None)
+                if index is None:
+                    raise StepError(f'There is no step {after!r}.')
+                steps.insert(index, step)
+            Project.objects.filter(pk=project.pk).update(steps=steps)
+        _touch(project)
+    return step, created
+
+
+def _put_step_row(project, key, step, after):
+    existing = _existing_references([(step, False)])
+    row = project.step_rows.filter(step_id=key).first()
+    if row is None:
+        _check_step_count(project.step_rows.count())
+        if after is None:
+            last = project.step_rows.order_by('-position').values_list('position', flat=True).first()
+            position = (last or 0) + GAP
+        else:
+            position = _position_after(project, after)
+        _step_row(project, step, position, existing).save()
+        return True
+    fields = ['data', 'element', 'model']
+    if after is not None:
+        row.position = _position_after(project, after, moving=row.pk)
+        fields.append('position')
+    row.data = step
+    for column, value in _foreign_keys(step, False, existing).items():
+        setattr(row, column, value)
+    row.save(update_fields=fields)
+    return False
+
+
+def delete_step(project, key):
+    """Delete step ``key``; returns ``False`` when there is none."""
+    with transaction.atomic():
+        project = Project.objects.select_for_update().get(pk=project.pk)
+        if project.storage == ROWS:
+            deleted = project.step_rows.filter(step_id=key).delete()[0] > 0
+        else:
+            steps = [step for step in project.steps if step_id(step) != key]
+            deleted = len(steps) < len(project.steps)
+            if deleted:
+                Project.objects.filter(pk=project.pk).update(steps=steps)
+        if deleted:
+            _touch(project)
+    return deleted
+
+
+def update_steps(project, changes):
+    """Merge ``{step id: fields}`` into the stored steps of a locked rows project (see ``projects.collab``)."""
+    rows = list(project.step_rows.filter(step_id__in=changes))
+    for row in rows:
+        row.data = {**row.data, **changes[row.step_id]}
+    existing = _existing_references((row.data, False) for row in rows)
+    for row in rows:
+        for column, value in _foreign_keys(row.data, False, existing).items():
+            setattr(row, column, value)
+    ProjectStep.objects.bulk_update(rows, ['data', 'element', 'model'], batch_size=BATCH_SIZE)
@@ -0,0 +1,117 @@
+"""
+Delta sync for client-side caches of projects, elements and uploaded models.
+
+Without a cursor the client gets a snapshot of everything it can see plus a
+cursor, paged like the deltas: while ``more`` is set the cursor names the
+snapshot position (``<log id>:<kind>:<last id>``) and the next call continues
+it. After that it sends the cursor back and gets only the rows logged in
+``ChangeLog`` since then. A logged row it can still see is ``updated``; one it
+cannot see any more (deleted, unshared, no longer a system model) is
+``deleted``.
+
+Log ids are assigned at insert but become visible at commit, so a slow
+transaction can commit an id below one already returned. The cursor therefore
+only advances over entries older than ``SETTLE``; newer ones are returned
+again on the next call, which is harmless because applying a change twice is a
+no-op for the client.
+"""
+import re
+from datetime import timedelta
+
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import ChangeLog, Created3DModelM, Project, Uploaded3DModel
+from .serializers import Created3dModelReadSerializer, ProjectReadSerializer, Uploaded3dModelReadSerializer
+
+SETTLE = timedelta(seconds=10)
+PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+# Response key for each ``ChangeLog.kind``.
+KEYS = {'project': 'projects', 'element': 'elements', 'model': 'models'}
+SNAPSHOT_CURSOR = re.compile(r'^(\d+):(project|element|model):(\d+)$')
+
+
+def visible_rows(user):
+    """``{kind: (values queryset of rows the user can see, read serializer)}``."""
+    return {
+        'project': (
+            Project.objects.filter(Q(owner=user) | Q(pk__in=user.edited_projects.values('pk')))
+            .values(*ProjectReadSerializer.values_fields),
+            ProjectReadSerializer,
+        ),
+        'element': (
+            Created3DModelM.objects.filter(owner=user)
+            .values(*Created3dModelReadSerializer.values_fields, texture_inline=Created3dModelReadSerializer.inline()),
+            Created3dModelReadSerializer,
+        ),
+        'model': (
+            Uploaded3DModel.objects.filter(Q(owner=user) | Q(system_model=True))
+            .values(*Uploaded3dModelReadSerializer.values_fields),
+            Uploaded3dModelReadSerializer,
+        ),
+    }
+
+
+def snapshot(user, limit=PAGE_SIZE, position=None):
+    """
+    Everything the user can see, at most ``limit`` rows per page in ``KEYS``
+    order. ``position`` is the ``(log id, kind, last id)`` a previous page
+    stopped at; only the first page resets the client's cache.
+    """
+    if position is None:
+        # Read the cursor first, settled as in ``changes``: anything logged later is sent again next time.
+        settled = timezone.now() - SETTLE
+        cursor = ChangeLog.objects.filter(created_at__lte=settled).aggregate(last=Max('id'))['last'] or 0
+        start, after = 0, 0
+    else:
+        cursor, kind, after = position
+        start = list(KEYS).index(kind)
+    result = {'cursor': str(cursor), 'reset': position is None, 'more': False}
+    remaining = limit
+    for index, (kind, (rows, serializer_class)) in enumerate(visible_rows(user).items()):
+        found = []
+        if index >= start and not result['more']:
+            rows = rows.order_by('pk')
+            if index == start:
+                rows = rows.filter(pk__gt=after)
+            found = list(rows[:remaining + 1])
+            if len(found) > remaining:
+                found = found[:remaining]
+                last = found[-1]['id'] if found else (after if index == start else 0)
+                result.update(cursor=f'{cursor}:{kind}:{last}', more=True)
+            remaining -= len(found)
+        result[KEYS[kind]] = {'updated': serializer_class(found, many=True).data, 'deleted': []}
+    return result
+
+
+def changes(user, cursor, limit=PAGE_SIZE):
+    """Changes after ``cursor``; a snapshot when the cursor predates the retained log."""
+    first = ChangeLog.objects.order_by('id').values_list('id', flat=True).first()
+    if first is not None and cursor < first - 1:
+        return snapshot(user, limit)
+    entries = list(
+        ChangeLog.objects.filter(Q(user=user) | Q(user__isnull=True), id__gt=cursor)
+        .order_by('id').values_list('id', 'kind', 'object_id', 'created_at')[:limit + 1]
+    )
+    more = len(entries) > limit
+    entries = entries[:limit]
+
+    settled = timezone.now() - SETTLE
+    for entry_id, _, _, created_at in entries:
+        if created_at > settled:
+            break
+        cursor = entry_id
+
+    # Unsettled entries hold the cursor back; the client should not poll them in a loop.
+    more = more and cursor == entries[-1][0]
+    result = {'cursor': str(cursor), 'reset': False, 'more': more}
+    for kind, (rows, serializer_class) in visible_rows(user).items():
+        ids = sorted({object_id for _, entry_kind, object_id, _ in entries if entry_kind == kind})
+        found = list(rows.filter(pk__in=ids).order_by('pk')) if ids else []
+        seen = {row['id'] for row in found}
+        result[KEYS[kind]] = {
+            'updated': serializer_class(found, many=True).data,
+            'deleted': [pk for pk in ids if pk not in seen],
+        }
+    return result
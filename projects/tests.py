@@ -1,9 +1,73 @@
+import base64
+import gzip
+import io
+import json
+import os
+import random
+import tracemalloc
+import uuid
+import zipfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import chain
+from unittest import mock
+
+import cbor2
+import msgpack
+import numpy as np
+import orjson
+import zstandard
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import FieldError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import ResetPasswordM, UserM
+from benchmarks.seed import make_glb, make_grid_mesh, make_png
+from threeddocs import compression
+from threeddocs.compression import negotiate_encoding
+from threeddocs.parsers import ORJSONParser, RequestTooLarge
+from threeddocs.renderers import ORJSONRenderer
 
-from .models import Project, ProjectShare
+from . import (
+    analytics, atlas, bundles, catalogue, cloning, collab, deletion, fields, jobs, labels, serializers, storage, sync,
+    texture_jobs, thumbnails, views,
+)
+from .assets import save_asset, store_asset
+from .catalogue import get_state
+from .collab import application, rooms
+from .decimation import build_lods, decimate
+from .geometry import GeometryError, GltfDocument, extract_metadata
+from .labels import get_label
+from .models import (
+    ChangeLog, Created3DModelM, DeletionJob, JSONDictionary, LabelTexture, Project, ProjectConnection, ProjectShare,
+    ProjectStep, ShareViewCount, StoredAsset, Suggestion, Uploaded3DModel, Uploaded3DModelLOD,
+)
+from .packing import pack
+from .partitioning import is_partitioned
+from .rasterizer import _view_rotation, render_triangles, shape_triangles
+from .serializers import (
+    CREATED_MODEL_LIMIT, ProjectReadSerializer, ProjectSerializer, Uploaded3dModelReadSerializer,
+    Uploaded3dModelSerializer,
+)
+from .texture_jobs import schedule_textures
+from .textures import build_texture_variants
+from .thumbnails import project_source
+from .views import ATLAS_PROJECT_FIELDS
 
 
 SAMPLE_STEP = {
@@ -29,6 +93,25 @@ def _project_payload(name='My Model', **overrides):
     }
 
 
+def _create_user(username):
+    return UserM.objects.create_user(username=username, email=f'{username}@example.com', password='pass')
+
+
+def _client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+class SignedInTestCase(TestCase):
+    """``self.client`` is signed in as ``self.user``, a new account named ``username``."""
+    username = 'user'
+
+    def setUp(self):
+        self.user = _create_user(self.username)
+        self.client = _client(self.user)
+
+
 class ProjectTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -228,7 +311,6 @@ class ProjectTests(TestCase):
         self.assertIn('lastModified', response.data)
 
     def test_shared_invalid_token_returns_404(self):
-        import uuid
         public_client = APIClient()
         response = public_client.get(f'/api/projects/shared/{uuid.uuid4()}')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -240,3 +322,1703 @@ class ProjectTests(TestCase):
         response = anon.get(f'/api/projects/shared/{share.token}')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+
+
+class CompressionTests(TestCase):
+    def setUp(self):
+        self.user = _create_user('comp')
+        self.project = Project.objects.create(
+            owner=self.user, name='Big', steps=[dict(SAMPLE_STEP, id=f'step-{i}') for i in range(200)],
+        )
+        self.share = ProjectShare.objects.create(project=self.project)
+        self.client = APIClient()
+
+    def test_negotiation_prefers_highest_q_then_server_order(self):
+        codecs = {'gzip': None, 'br': None, 'zstd': None}
+        self.assertEqual(negotiate_encoding('gzip, br', codecs), 'br')
+        self.assertEqual(negotiate_encoding('gzip;q=1.0, br;q=0.5', codecs), 'gzip')
+        self.assertEqual(negotiate_encoding('*', codecs), 'zstd')
+        self.assertEqual(negotiate_encoding('br;q=0, gzip;q=0', codecs), None)
+        self.assertEqual(negotiate_encoding('', codecs), None)
+        self.assertEqual(negotiate_encoding('br', {'gzip': None}), None)
+
+    def test_shared_project_is_gzipped(self):
+        response = self.client.get(f'/api/shared/{self.share.token}', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(body['steps']), 200)
+
+    def test_identity_when_client_does_not_accept_encoding(self):
+        response = self.client.get(f'/api/shared/{self.share.token}')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(len(response.json()['steps']), 200)
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get('/api/public-models/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_settings_apply_without_reimport(self):
+        url = f'/api/shared/{self.share.token}'
+        with override_settings(COMPRESSION_MIN_SIZE=10 ** 9):
+            self.assertFalse(self.client.get(url, HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding'))
+        with override_settings(COMPRESSION_ENCODINGS=['gzip', 'br', 'zstd']):
+            self.assertEqual(negotiate_encoding('*', {'gzip': None, 'br': None, 'zstd': None}), 'gzip')
+
+    def test_precompressed_body_is_reused_until_project_changes(self):
+        url = f'/api/shared/{self.share.token}'
+        with mock.patch.object(compression, 'compress_bytes', wraps=compression.compress_bytes) as spy:
+            first = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            second = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(spy.call_count, 1)
+            self.assertEqual(first.content, second.content)
+            self.project.name = 'Renamed'
+            self.project.save()
+            self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(spy.call_count, 2)
+
+
+class CodecTests(SignedInTestCase):
+    username = 'codec'
+
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(owner=self.user, name='Codec', steps=[SAMPLE_STEP])
+
+    def test_orjson_renderer_matches_drf_json(self):
+        data = {'name': 'Zażółć  ', 'steps': [SAMPLE_STEP], 'n': 1.5, 'none': None}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        for value in (datetime(2024, 5, 1, 12, 30, 1, 5, tzinfo=dt_timezone.utc), 1e16, -2.5e-7, 1e-05, 0.0001,
+                      [1e300, {'x': 1e15}]):
+            self.assertEqual(ORJSONRenderer().render({'v': value}), JSONRenderer().render({'v': value}), value)
+
+    def test_retrieve_as_msgpack(self):
+        url = f'/api/projects/{self.project.id}/'
+        response = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), self.client.get(url).json())
+
+    def test_update_with_msgpack_body(self):
+        body = msgpack.packb(_project_payload('Packed', steps=[SAMPLE_STEP]))
+        response = self.client.put(
+            f'/api/projects/{self.project.id}/', body, content_type='application/msgpack',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.name, 'Packed')
+        self.assertEqual(self.project.steps, [SAMPLE_STEP])
+
+    def test_create_with_cbor_body(self):
+        response = self.client.post(
+            '/api/projects/', cbor2.dumps(_project_payload('Cbor')), content_type='application/cbor',
+            HTTP_ACCEPT='application/cbor',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(cbor2.loads(response.content)['name'], 'Cbor')
+
+    def test_malformed_body_returns_400(self):
+        for content_type in ('application/json', 'application/msgpack', 'application/cbor'):
+            response = self.client.post('/api/projects/', b'\xc1{', content_type=content_type)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, content_type)
+        # A map keyed by an array: unhashable in Python.
+        response = self.client.post('/api/projects/', b'\x81\x90\x00', content_type='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class _ChunkedStream:
+    """A request body produced chunk by chunk, never held in memory at once."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+
+    def read(self, size=-1):
+        return next(self.chunks, b'')
+
+
+class RequestLimitTests(SignedInTestCase):
+    username = 'limits'
+
+    def _parse(self, chunks):
+        return ORJSONParser().parse(_ChunkedStream(chunks))
+
+    def test_normal_payload_parses(self):
+        payload = _project_payload('Limits', steps=[SAMPLE_STEP, {**SAMPLE_STEP, 'id': 'a\\"[,', 'n': [1, {}]}])
+        body = orjson.dumps(payload)
+        # Split inside strings and escapes too.
+        self.assertEqual(self._parse(body[i:i + 7] for i in range(0, len(body), 7)), payload)
+
+    def test_limits_return_413(self):
+        with self.settings(JSON_MAX_ITEMS={'steps': 2}, JSON_MAX_STRING_BYTES=100, JSON_MAX_DEPTH=4):
+            cases = [
+                _project_payload(steps=[SAMPLE_STEP] * 3),
+                _project_payload(description='x' * 101),
+                _project_payload(guide=[[[[1]]]]),
+            ]
+            for payload in cases:
+                response = self.client.post('/api/projects/', payload, format='json')
+                self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            for payload in cases:
+                for body, content_type in ((msgpack.packb(payload), 'application/msgpack'),
+                                           (cbor2.dumps(payload), 'application/cbor')):
+                    response = self.client.post('/api/projects/', body, content_type=content_type)
+                    self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, content_type)
+            # Nested arrays are not counted against their top-level key's limit.
+            response = self.client.post('/api/projects/', _project_payload(steps=[{'a': [1, 2, 3]}]), format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            # Nor can single-step writes grow a project past it.
+            for engine in ('rows', 'document'):
+                with self.settings(PROJECT_STORAGE=engine):
+                    response = self.client.post('/api/projects/', _project_payload(
+                        steps=[{'id': 'a'}, {'id': 'b'}]), format='json')
+                url = f'/api/projects/{response.data["id"]}/steps/'
+                self.assertEqual(self.client.put(f'{url}c/', {'title': 'C'}, format='json').status_code, 400)
+                self.assertEqual(self.client.put(f'{url}b/', {'title': 'B'}, format='json').status_code, 200)
+        with self.settings(REQUEST_MAX_BODY_BYTES=50):
+            for body, content_type in ((b'{}', 'application/json'), (msgpack.packb(_project_payload()), 'application/msgpack')):
+                response = self.client.post('/api/projects/', body + b' ' * 60, content_type=content_type)
+                self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, content_type)
+
+    def test_oversized_streams_rejected_with_bounded_memory(self):
+        step = b'{"id":"s","title":"t"},'
+        streams = [
+            # ~200 MB of steps and a ~200 MB data URL: both rejected within the first MB.
+            lambda: chain([b'{"steps":['], (step * 3000 for _ in range(3000))),
+            lambda: chain([b'{"thumbnail":"data:image/png;base64,'], (b'A' * 65536 for _ in range(3200))),
+        ]
+        with self.settings(JSON_MAX_ITEMS={'steps': 5000}, JSON_MAX_STRING_BYTES=1024 * 1024,
+                           REQUEST_MAX_BODY_BYTES=1024 * 1024 * 1024):
+            for chunks in streams:
+                tracemalloc.start()
+                try:
+                    with self.assertRaises(RequestTooLarge):
+                        self._parse(chunks())
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                self.assertLess(peak, 4 * 1024 * 1024)
+
+
+class FastSerializerTests(SignedInTestCase):
+    """The read fast paths must produce byte-identical output to the DRF serializers."""
+
+    username = 'fast'
+
+    def _assert_same(self, serializer_class, read_serializer_class, queryset):
+        request = Request(APIRequestFactory().get('/'))
+        request.user = self.user
+        expected = serializer_class(queryset, many=True, context={'request': request}).data
+        rows = queryset.values(*read_serializer_class.values_fields)
+        self.assertEqual(read_serializer_class(rows, many=True).data, expected)
+
+    def test_project_read_serializer_matches_project_serializer(self):
+        Project.objects.create(owner=self.user, name='Empty')
+        Project.objects.create(
+            owner=self.user, name='Full', project_type='upload', project_model_url='https://example.com/m.glb',
+            steps=[SAMPLE_STEP], connections=[{'id': 'e1', 'source': 'a', 'target': 'b'}],
+            guide=[{'stepId': 'step-1', 'label': '1'}], node_positions={'step-1': {'x': 1.5, 'y': 2}},
+        )
+        self._assert_same(ProjectSerializer, ProjectReadSerializer, Project.objects.all())
+
+    def test_uploaded_model_read_serializer_matches_model_serializer(self):
+        Uploaded3DModel.objects.create(owner=self.user, name='A', model_file_name='a.glb', model_data_url='data:x')
+        Uploaded3DModel.objects.create(
+            owner=self.user, name='B', model_file_name='b.glb', model_data_url='data:y',
+            model_scale=2, description='desc', system_model=True,
+        )
+        self._assert_same(Uploaded3dModelSerializer, Uploaded3dModelReadSerializer, Uploaded3DModel.objects.order_by('pk'))
+
+    def test_endpoints_use_fast_path(self):
+        project = Project.objects.create(owner=self.user, name='P', steps=[SAMPLE_STEP])
+        share = ProjectShare.objects.create(project=project)
+        expected = dict(ProjectSerializer(project).data)
+        self.assertEqual(self.client.get(f'/api/projects/{project.id}/').json(), expected)
+        self.assertEqual(self.client.get('/api/projects/').json()['results'], [expected])
+        self.assertEqual(APIClient().get(f'/api/shared/{share.token}').json(), expected)
+
+
+class PublicCatalogueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = _create_user('admin')
+        self.model = Uploaded3DModel.objects.create(
+            owner=self.admin, name='Gear', model_file_name='gear.glb', system_model=True,
+            model_data_url='data:model/gltf-binary;base64,Z2xURg==',
+        )
+        Uploaded3DModel.objects.create(
+            owner=self.admin, name='Private', model_file_name='p.glb', model_data_url='data:x;base64,AA==',
+        )
+        self.client = APIClient()
+
+    def test_list_returns_metadata_with_asset_urls(self):
+        response = self.client.get('/api/public-models/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [entry] = response.json()
+        self.assertEqual(entry['name'], 'Gear')
+        self.assertNotIn('model_data_url', entry)
+        asset = self.client.get(entry['model_url'])
+        self.assertEqual(asset.status_code, status.HTTP_200_OK)
+        self.assertEqual(asset.content, b'glTF')
+        self.assertEqual(asset['Content-Type'], 'model/gltf-binary')
+        self.assertIn('immutable', asset['Cache-Control'])
+
+    def test_repeat_visitor_gets_304(self):
+        first = self.client.get('/api/public-models/')
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+        second = self.client.get('/api/public-models/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second.content, b'')
+
+    def test_catalogue_is_built_once_per_version(self):
+        with mock.patch.object(catalogue, 'build_catalogue', wraps=catalogue.build_catalogue) as spy:
+            etag = self.client.get('/api/public-models/')['ETag']
+            self.client.get('/api/public-models/')
+            self.assertEqual(spy.call_count, 1)
+            self.model.name = 'Gear v2'
+            self.model.save()
+            response = self.client.get('/api/public-models/', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(spy.call_count, 2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]['name'], 'Gear v2')
+
+    def test_state_row_comes_from_the_migration(self):
+        # One read, no insert: concurrent first requests cannot race to create it.
+        with self.assertNumQueries(1):
+            self.assertEqual(get_state().pk, 1)
+
+    def test_unflagging_and_deleting_bump_version(self):
+        version = get_state().version
+        self.model.system_model = False
+        self.model.save()
+        self.assertEqual(get_state().version, version + 1)
+        self.assertEqual(self.client.get('/api/public-models/').json(), [])
+        self.model.delete()
+        self.assertEqual(get_state().version, version + 1)
+
+    def test_search_filters_cached_catalogue(self):
+        self.assertEqual(len(self.client.get('/api/public-models/?search=gea').json()), 1)
+        self.assertEqual(self.client.get('/api/public-models/?search=nope').json(), [])
+
+
+class GeometryMetadataTests(SignedInTestCase):
+    username = 'geo'
+
+    def _cube_glb(self, **kwargs):
+        positions = np.array([[x, y, z] for x in (0, 2) for y in (0, 1) for z in (0, 3)], dtype=np.float32)
+        indices = np.arange(36) % 8
+        return make_glb(positions, indices, **kwargs)
+
+    def test_glb_metadata(self):
+        glb = self._cube_glb(materials=2, image_bytes=b'png-bytes!')
+        metadata = extract_metadata(glb, 'cube.glb')
+        self.assertEqual(metadata['vertex_count'], 8)
+        self.assertEqual(metadata['triangle_count'], 12)
+        self.assertEqual(metadata['material_count'], 2)
+        self.assertEqual(metadata['texture_count'], 1)
+        self.assertEqual(metadata['texture_bytes'], 10)
+        self.assertEqual(metadata['file_bytes'], len(glb))
+        self.assertEqual(metadata['bounding_box'], {'min': [0, 0, 0], 'max': [2, 1, 3]})
+
+    def test_node_transform_applies_to_bounds(self):
+        positions = b''.join(
+            __import__('struct').pack('<3f', *p) for p in [(0, 0, 0), (1, 0, 0), (0, 1, 0)]
+        )
+        gltf = {
+            'asset': {'version': '2.0'},
+            'scenes': [{'nodes': [0]}],
+            'nodes': [{'translation': [10, 0, 0], 'scale': [2, 2, 2], 'children': [1]}, {'mesh': 0}],
+            'meshes': [{'primitives': [{'attributes': {'POSITION': 0}}]}],
+            'accessors': [{'bufferView': 0, 'componentType': 5126, 'count': 3, 'type': 'VEC3'}],
+            'bufferViews': [{'buffer': 0, 'byteLength': len(positions)}],
+            'buffers': [{'byteLength': len(positions),
+                         'uri': 'data:application/octet-stream;base64,' + base64.b64encode(positions).decode()}],
+        }
+        metadata = extract_metadata(json.dumps(gltf).encode(), 'tri.gltf')
+        self.assertEqual(metadata['triangle_count'], 1)
+        self.assertEqual(metadata['bounding_box'], {'min': [10, 0, 0], 'max': [12, 2, 0]})
+
+    def test_obj_metadata(self):
+        obj = b'# cube\nv 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 2 1.0\nusemtl a\nf 1 2 3 4\nusemtl b\nf 1 2 3\n'
+        metadata = extract_metadata(obj, 'quad.obj')
+        self.assertEqual(metadata['vertex_count'], 4)
+        self.assertEqual(metadata['triangle_count'], 3)
+        self.assertEqual(metadata['material_count'], 2)
+        self.assertEqual(metadata['bounding_box'], {'min': [0, 0, 0], 'max': [1, 1, 2]})
+
+    def test_truncated_glb_raises(self):
+        with self.assertRaises(GeometryError):
+            extract_metadata(self._cube_glb()[:200], 'cube.glb')
+
+    def test_malformed_files_raise_geometry_error(self):
+        accessor = {'bufferView': 0, 'componentType': 5126, 'count': -1, 'type': 'VEC3'}
+        negative = {'meshes': [{'primitives': [{'attributes': {'POSITION': 0}}]}], 'accessors': [accessor],
+                    'bufferViews': [{'buffer': 0, 'byteLength': 12}],
+                    'buffers': [{'byteLength': 12, 'uri': 'data:application/octet-stream;base64,' + 'A' * 16}]}
+        for data, name in ((b'v 1 2\nv 3 4\n', 'short.obj'), (b'v a b c\n', 'words.obj'),
+                           (b'[1, 2]', 'list.gltf'), (json.dumps(negative).encode(), 'negative.gltf')):
+            with self.assertRaises(GeometryError, msg=name):
+                extract_metadata(data, name)
+
+    def test_node_cycle_is_walked_once(self):
+        gltf = {'scenes': [{'nodes': [0]}], 'nodes': [{'children': [1]}, {'children': [0], 'mesh': 0}],
+                'meshes': [{'primitives': []}]}
+        document = GltfDocument.from_bytes(json.dumps(gltf).encode())
+        self.assertEqual([mesh for mesh, _ in document.mesh_instances()], [0])
+
+    def test_upload_stores_and_returns_metadata(self):
+        glb = self._cube_glb()
+        response = self.client.post('/api/models/', {
+            'name': 'Cube', 'model_file_name': 'cube.glb', 'model_scale': 1,
+            'model_data_url': 'data:model/gltf-binary;base64,' + base64.b64encode(glb).decode(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['triangle_count'], 12)
+        [listed] = self.client.get('/api/models/').json()
+        self.assertEqual(listed['vertex_count'], 8)
+        self.assertEqual(listed['bounding_box']['max'], [2, 1, 3])
+
+    def test_unparseable_upload_is_kept_without_metadata(self):
+        response = self.client.post('/api/models/', {
+            'name': 'Junk', 'model_file_name': 'junk.glb', 'model_scale': 1,
+            'model_data_url': 'data:model/gltf-binary;base64,Z2xURgIAAAA=',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(response.data['vertex_count'])
+        self.assertEqual(response.data['file_bytes'], 8)
+
+
+class LodTests(SignedInTestCase):
+    username = 'lod'
+
+    def _grid_data_url(self, size=40):
+        glb = make_glb(*make_grid_mesh(size))
+        return 'data:model/gltf-binary;base64,' + base64.b64encode(glb).decode()
+
+    def _upload(self, data_url, file_name='grid.glb'):
+        with override_settings(BACKGROUND_WORKERS=0), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/models/', {
+                'name': 'Grid', 'model_file_name': file_name, 'model_scale': 1, 'model_data_url': data_url,
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def test_decimate_respects_budget_and_bounds(self):
+        positions, indices = make_grid_mesh(60)
+        target = len(indices) // 3 // 10
+        lod_positions, lod_triangles = decimate(positions, indices, target)
+        self.assertLessEqual(len(lod_triangles), target)
+        self.assertGreater(len(lod_triangles), target // 4)
+        self.assertLess(lod_triangles.max(), len(lod_positions))
+        self.assertTrue(np.all(lod_positions.min(axis=0) >= positions.min(axis=0) - 1e-6))
+        self.assertTrue(np.all(lod_positions.max(axis=0) <= positions.max(axis=0) + 1e-6))
+
+    def test_lod_variants_are_valid_glb(self):
+        variants = build_lods(make_glb(*make_grid_mesh(40)), [50, 10])
+        self.assertEqual([v['level'] for v in variants], [50, 10])
+        for variant in variants:
+            metadata = extract_metadata(variant['glb'], 'lod.glb')
+            self.assertEqual(metadata['triangle_count'], variant['triangle_count'])
+            self.assertLessEqual(variant['triangle_count'], 2 * 39 * 39 * variant['level'] // 100)
+
+    def test_upload_builds_lods_and_serves_requested_level(self):
+        model_id = self._upload(self._grid_data_url())
+        self.assertEqual(Uploaded3DModelLOD.objects.filter(model_id=model_id).count(), 2)
+
+        detail = self.client.get(f'/api/models/{model_id}/').json()
+        self.assertEqual(detail['lod_status'], 'ready')
+        self.assertEqual([lod['level'] for lod in detail['lods']], [50, 10])
+        self.assertNotIn('lod', detail)
+
+        coarse = self.client.get(f'/api/models/{model_id}/?lod=10').json()
+        self.assertEqual(coarse['lod'], 10)
+        self.assertLess(len(coarse['model_data_url']), len(detail['model_data_url']))
+        self.assertEqual(self.client.get(f'/api/models/{model_id}/?lod=30').json()['lod'], 50)
+        self.assertEqual(self.client.get(f'/api/models/{model_id}/?lod=100').json()['lod'], 100)
+        self.assertEqual(self.client.get(f'/api/models/{model_id}/?lod=abc').status_code, 400)
+
+    def test_public_model_honours_lod(self):
+        model_id = self._upload(self._grid_data_url())
+        project = Project.objects.create(owner=self.user, name='P', steps=[{'id': 's', 'uploadedModelId': model_id}])
+        share = ProjectShare.objects.create(project=project)
+        response = APIClient().get(f'/api/models/{model_id}/public_model/?project_uuid={share.token}&lod=10')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['lod'], 10)
+
+    def test_obj_upload_is_unsupported(self):
+        obj = base64.b64encode(b'v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n').decode()
+        model_id = self._upload('data:text/plain;base64,' + obj, 'tri.obj')
+        detail = self.client.get(f'/api/models/{model_id}/?lod=10').json()
+        self.assertEqual(detail['lod_status'], 'unsupported')
+        self.assertEqual(detail['lod'], 100)
+
+
+class TextureTests(SignedInTestCase):
+    username = 'tex'
+
+    def _png_data_url(self, size=(300, 100), mode='RGBA'):
+        buffer = io.BytesIO()
+        Image.new(mode, size, (255, 0, 0, 128) if mode == 'RGBA' else (0, 0, 255)).save(buffer, 'PNG')
+        return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+    def _create(self, texture_data_url, name='Label'):
+        with override_settings(BACKGROUND_WORKERS=0), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/elements/', {
+                'name': name, 'text': 'Hi', 'color': '#ff0000', 'texture_data_url': texture_data_url,
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def test_variants_are_power_of_two_mip_chain(self):
+        data = base64.b64decode(self._png_data_url().split(',', 1)[1])
+        variants = build_texture_variants(data, max_size=2048, min_size=32)
+        self.assertEqual([(v['format'], v['width'], v['height']) for v in variants], [
+            ('png', 256, 64), ('webp', 256, 64), ('webp', 128, 32), ('webp', 64, 16), ('webp', 32, 8),
+        ])
+
+    def test_create_builds_variants_served_from_assets(self):
+        element_id = self._create(self._png_data_url())
+        detail = self.client.get(f'/api/elements/{element_id}/').json()
+        self.assertEqual(detail['texture_status'], 'ready')
+        self.assertTrue(detail['texture_data_url'].startswith('data:image/png'))
+        webp = detail['textures'][1]
+        response = APIClient().get(webp['url'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(len(response.content), webp['bytes'])
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(APIClient().get(webp['url'], HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_list_omits_inline_texture_once_processed(self):
+        ready_id = self._create(self._png_data_url())
+        pending = Created3DModelM.objects.create(owner=self.user, name='Old', text='x', color='#000',
+                                                 texture_data_url='data:image/png;base64,AAAA')
+        Created3DModelM.objects.filter(pk=pending.pk).update(texture_status='pending')
+        listed = {e['id']: e for e in self.client.get('/api/elements/').json()}
+        self.assertIsNone(listed[ready_id]['texture_data_url'])
+        self.assertTrue(listed[ready_id]['textures'])
+        self.assertEqual(listed[pending.pk]['texture_data_url'], 'data:image/png;base64,AAAA')
+
+    def test_same_image_is_processed_once(self):
+        texture = self._png_data_url(mode='RGB')
+        first = self._create(texture, 'A')
+        assets = StoredAsset.objects.count()
+        with mock.patch.object(texture_jobs, 'build_texture_variants') as build:
+            second = self._create(texture, 'B')
+        build.assert_not_called()
+        self.assertEqual(StoredAsset.objects.count(), assets)
+        first_textures = self.client.get(f'/api/elements/{first}/').json()['textures']
+        self.assertEqual(self.client.get(f'/api/elements/{second}/').json()['textures'], first_textures)
+        self.assertEqual(first_textures[0]['format'], 'jpeg')
+
+    def test_undecodable_texture_is_marked_failed(self):
+        element_id = self._create('data:image/png;base64,AAAA')
+        self.assertEqual(self.client.get(f'/api/elements/{element_id}/').json()['texture_status'], 'failed')
+
+    def test_sweep_deletes_unreferenced_assets_and_restarts_stale_jobs(self):
+        element_id = self._create(self._png_data_url())
+        thumbnail = store_asset(b'thumbnail', 'image/webp')
+        Project.objects.create(owner=self.user, name='Thumb', thumbnail_url=thumbnail)
+        orphan, recent = save_asset(b'orphan', 'image/webp'), save_asset(b'recent', 'image/webp')
+        StoredAsset.objects.exclude(pk=recent).update(stored_at=timezone.now() - timedelta(days=30))
+        stuck = timezone.now() - timedelta(days=1)
+        Created3DModelM.objects.filter(pk=element_id).update(texture_status='processing', updated_at=stuck)
+        model = Uploaded3DModel.objects.create(owner=self.user, name='M', model_file_name='m.glb',
+                                               model_data_url='data:model/gltf-binary;base64,AAAA')
+        Uploaded3DModel.objects.filter(pk=model.pk).update(lod_status='processing', updated_at=stuck)
+
+        output = io.StringIO()
+        with override_settings(BACKGROUND_WORKERS=0):
+            call_command('sweep_assets', stdout=output)
+        self.assertIn('Restarted 1 texture and 1 LOD jobs.', output.getvalue())
+        self.assertIn('Deleted 1 unreferenced assets.', output.getvalue())
+        self.assertFalse(StoredAsset.objects.filter(pk=orphan).exists())
+        self.assertTrue(StoredAsset.objects.filter(pk=recent).exists())
+        self.assertTrue(StoredAsset.objects.filter(pk=thumbnail.split('/')[-1].split('.')[0]).exists())
+        self.assertEqual(Created3DModelM.objects.get(pk=element_id).texture_status, 'ready')
+        self.assertEqual(Uploaded3DModel.objects.get(pk=model.pk).lod_status, 'failed')
+        for variant in self.client.get(f'/api/elements/{element_id}/').json()['textures']:
+            self.assertEqual(APIClient().get(variant['url']).status_code, status.HTTP_200_OK)
+
+
+class ThumbnailTests(SignedInTestCase):
+    username = 'thumb'
+
+    def _run_jobs(self):
+        return override_settings(BACKGROUND_WORKERS=0)
+
+    def test_rasterizer_draws_shape_on_transparent_background(self):
+        triangles = shape_triangles('box')
+        image = np.asarray(render_triangles(triangles, np.tile((1.0, 0, 0), (len(triangles), 1)), size=64))
+        self.assertEqual(image.shape, (64, 64, 4))
+        self.assertEqual(image[0, 0, 3], 0)
+        self.assertEqual(image[32, 32, 3], 255)
+        self.assertGreater(image[32, 32, 0], image[32, 32, 1])
+
+    def test_nearest_triangle_wins(self):
+        square = np.array([[[-1, -1, 0], [1, -1, 0], [1, 1, 0]], [[-1, -1, 0], [1, 1, 0], [-1, 1, 0]]], dtype=float)
+        # Same square offset along the view direction: the nearer copy is blue.
+        towards_camera = _view_rotation()[2]
+        triangles = np.concatenate([square, square + towards_camera * 0.5])
+        colors = np.array([(1, 0, 0), (1, 0, 0), (0, 0, 1), (0, 0, 1)], dtype=float)
+        image = np.asarray(render_triangles(triangles, colors, size=64))
+        self.assertGreater(image[32, 32, 2], image[32, 32, 0])
+
+    def test_project_thumbnail_is_rendered_after_save_and_reused(self):
+        with self._run_jobs(), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/projects/', {
+                'name': 'P', 'steps': [{'id': 's1', 'modelPath': 'sphere', 'highlightColor': '#00ff00'}],
+            }, format='json')
+        project_id = response.data['id']
+        thumbnail_url = self.client.get(f'/api/projects/{project_id}/').json()['thumbnailUrl']
+        self.assertTrue(thumbnail_url.endswith('.webp'))
+        image = APIClient().get(thumbnail_url)
+        self.assertEqual(image['Content-Type'], 'image/webp')
+        self.assertIn('immutable', image['Cache-Control'])
+
+        # Renaming does not change the picture: no render, same URL.
+        with self._run_jobs(), self.captureOnCommitCallbacks(execute=True), \
+                mock.patch.object(thumbnails, 'render_thumbnail') as render:
+            self.client.put(f'/api/projects/{project_id}/', {
+                'name': 'Renamed', 'steps': [{'id': 's1', 'modelPath': 'sphere', 'highlightColor': '#00ff00'}],
+            }, format='json')
+        render.assert_not_called()
+        self.assertEqual(self.client.get(f'/api/projects/{project_id}/').json()['thumbnailUrl'], thumbnail_url)
+
+        with self._run_jobs(), self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f'/api/projects/{project_id}/', {
+                'name': 'Renamed', 'steps': [{'id': 's1', 'modelPath': 'cone', 'highlightColor': '#00ff00'}],
+            }, format='json')
+        self.assertNotEqual(self.client.get(f'/api/projects/{project_id}/').json()['thumbnailUrl'], thumbnail_url)
+
+    def test_project_uses_referenced_uploaded_model(self):
+        glb = make_glb(*make_grid_mesh(8))
+        model = Uploaded3DModel.objects.create(owner=self.user, name='M', model_file_name='m.glb',
+                                               model_data_url='data:model/gltf-binary;base64,' + base64.b64encode(glb).decode())
+        project = Project.objects.create(owner=self.user, name='P', steps=[{'id': 's', 'uploadedModelId': model.pk}])
+        row = Project.objects.values('owner_id', 'project_model_url', 'steps').get(pk=project.pk)
+        self.assertEqual(project_source(row), {'model': glb})
+
+        stranger = _create_user('other')
+        row['owner_id'] = stranger.pk
+        self.assertIn('shape', project_source(row))
+
+    def test_model_thumbnail_and_command(self):
+        glb = make_glb(*make_grid_mesh(20))
+        model = Uploaded3DModel.objects.create(owner=self.user, name='M', model_file_name='m.glb',
+                                               model_data_url='data:model/gltf-binary;base64,' + base64.b64encode(glb).decode())
+        with self._run_jobs():
+            call_command('render_thumbnails', stdout=io.StringIO())
+        model.refresh_from_db()
+        self.assertTrue(model.thumbnail_url.endswith('.webp'))
+        listed = self.client.get('/api/models/').json()
+        self.assertEqual(listed[0]['thumbnail_url'], model.thumbnail_url)
+
+
+class AtlasTests(SignedInTestCase):
+    username = 'atlas'
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def _element(self, width, height, owner=None):
+        png = make_png(width, height, random.Random(width * height))
+        return Created3DModelM.objects.create(
+            owner=owner or self.user, name='E', text='E', color='#fff',
+            texture_data_url='data:image/png;base64,' + base64.b64encode(png).decode(),
+        )
+
+    def test_pack_has_no_overlaps_and_respects_limits(self):
+        rng = random.Random(1)
+        sizes = [(rng.randint(8, 300), rng.randint(8, 300)) for _ in range(80)]
+        placements, atlas_sizes = pack(sizes, max_size=512, padding=2)
+        self.assertGreater(len(atlas_sizes), 1)
+        boxes = {}
+        for (w, h), (sheet, x, y) in zip(sizes, placements):
+            width, height = atlas_sizes[sheet]
+            self.assertTrue(x >= 2 and y >= 2 and x + w + 2 <= width and y + h + 2 <= height)
+            for ox, oy, ow, oh in boxes.get(sheet, []):
+                self.assertTrue(x + w + 2 <= ox - 2 or ox + ow + 2 <= x - 2 or y + h + 2 <= oy - 2 or oy + oh + 2 <= y - 2)
+            boxes.setdefault(sheet, []).append((x, y, w, h))
+
+    def test_shared_atlas_manifest_and_invalidation(self):
+        first, second = self._element(256, 64), self._element(128, 32)
+        foreign = self._element(64, 64, owner=_create_user('x'))
+        project = Project.objects.create(owner=self.user, name='P', steps=[
+            {'id': 'a', 'custom3dElementId': first.pk}, {'id': 'b', 'custom3dElementId': foreign.pk},
+            {'id': 'c', 'custom3dElementId': 'not-an-id'},
+        ], connections=[{'id': 'e', 'source': 'a', 'target': 'b', 'data': {'custom3dElementId': second.pk}}])
+        share = ProjectShare.objects.create(project=project)
+        self.enterContext(override_settings(BACKGROUND_WORKERS=0))
+
+        response = APIClient().get(f'/api/shared/{share.token}/atlas')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        manifest = response.json()
+        self.assertEqual(set(manifest['elements']), {str(first.pk), str(second.pk)})
+        entry = manifest['elements'][str(first.pk)]
+        self.assertEqual((entry['width'], entry['height']), (256, 64))
+        sheet = manifest['atlases'][entry['atlas']]
+        self.assertAlmostEqual(entry['uv'][2] - entry['uv'][0], 256 / sheet['width'])
+        self.assertEqual(APIClient().get(sheet['url'])['Content-Type'], 'image/webp')
+
+        etag = response['ETag']
+        self.assertEqual(APIClient().get(f'/api/shared/{share.token}/atlas', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(f'/api/projects/{project.pk}/atlas/')['ETag'], etag)
+
+        replacement = self._element(64, 64)
+        Created3DModelM.objects.filter(pk=second.pk).update(
+            texture_data_url=replacement.texture_data_url, texture_hash=None)
+        self.assertNotEqual(APIClient().get(f'/api/shared/{share.token}/atlas')['ETag'], etag)
+
+    def test_atlas_is_built_once_in_the_background(self):
+        element = self._element(64, 32)
+        project = Project.objects.create(owner=self.user, name='P', steps=[{'id': 'a', 'custom3dElementId': element.pk}])
+        url = f'/api/projects/{project.pk}/atlas/'
+        with override_settings(BACKGROUND_WORKERS=2), mock.patch.object(jobs, 'defer') as defer:
+            first, second = self.client.get(url), self.client.get(url)
+        self.assertEqual((first.status_code, second.status_code), (status.HTTP_202_ACCEPTED, status.HTTP_202_ACCEPTED))
+        self.assertEqual(first['Retry-After'], str(2))
+        defer.assert_called_once()
+        with override_settings(BACKGROUND_WORKERS=0):
+            defer.call_args.args[2]()
+        built = self.client.get(url)
+        self.assertEqual(built.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Retry-After', built)
+
+        # An edit that changes the elements serves the previous atlas until the new one is built.
+        project.steps = [*project.steps, {'id': 'b', 'custom3dElementId': self._element(32, 32).pk}]
+        project.save()
+        with override_settings(BACKGROUND_WORKERS=2), mock.patch.object(jobs, 'defer'):
+            stale = self.client.get(url)
+        self.assertEqual(stale.status_code, status.HTTP_200_OK)
+        self.assertEqual(stale['ETag'], built['ETag'])
+        self.assertIn('Retry-After', stale)
+        self.assertIsNone(atlas.cache.get(atlas.CACHE_KEY % atlas.atlas_key(
+            Project.objects.values(*ATLAS_PROJECT_FIELDS).get(pk=project.pk))[0]))
+
+    def test_project_atlas_is_owner_only(self):
+        project = Project.objects.create(owner=self.user, name='P')
+        other = _client(_create_user('o'))
+        self.assertEqual(other.get(f'/api/projects/{project.pk}/atlas/').status_code, 404)
+
+
+class LabelTests(SignedInTestCase):
+    username = 'label'
+
+    def setUp(self):
+        super().setUp()
+        get_label.cache_clear()
+
+    def test_element_exposes_label_url_that_renders_png(self):
+        element = Created3DModelM.objects.create(owner=self.user, name='E', text='Hello', color='#ff0000')
+        [listed] = self.client.get('/api/elements/').json()
+        self.assertEqual(self.client.get(f'/api/elements/{element.pk}/').json()['label_url'], listed['label_url'])
+
+        response = APIClient().get(listed['label_url'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        image = Image.open(io.BytesIO(response.content)).convert('RGBA')
+        colors = {pixel[:3] for pixel in image.getdata() if pixel[3] == 255}
+        self.assertIn((255, 0, 0), colors)
+        self.assertEqual(APIClient().get(listed['label_url'], HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_identical_labels_render_once(self):
+        Created3DModelM.objects.create(owner=self.user, name='E', text='Same', color='#00ff00')
+        with mock.patch.object(labels, 'render_label', wraps=labels.render_label) as render:
+            first = labels.get_label('Same', '#00ff00', 'default', 32)
+            labels.get_label.cache_clear()  # A fresh process still finds the stored copy.
+            second = labels.get_label('Same', '#00ff00', 'default', 32)
+            labels.get_label('Same', '#00ff00', 'default', 32)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(LabelTexture.objects.count(), 1)
+
+    def test_labels_no_element_uses_are_not_persisted(self):
+        cache.clear()
+        with mock.patch.object(labels, 'render_label', wraps=labels.render_label) as render:
+            first = APIClient().get('/api/labels/?text=Anything&color=%23123456')
+            labels.get_label.cache_clear()
+            second = APIClient().get('/api/labels/?text=Anything&color=%23123456')
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertFalse(LabelTexture.objects.exists())
+        self.assertFalse(StoredAsset.objects.exists())
+
+    def test_invalid_parameters_are_rejected(self):
+        for query in ('text=&color=%23fff', 'text=x&color=nope', 'text=x&font=comic', 'text=x&size=1000'):
+            self.assertEqual(APIClient().get(f'/api/labels/?{query}').status_code, 400, query)
+
+
+class BundleTests(SignedInTestCase):
+    username = 'bundle'
+
+    def setUp(self):
+        super().setUp()
+        self.png = make_png(64, 32, random.Random(3))
+        self.glb = make_glb(*make_grid_mesh(20))
+        self.element = Created3DModelM.objects.create(
+            owner=self.user, name='E', text='Hi', color='#f00',
+            texture_data_url='data:image/png;base64,' + base64.b64encode(self.png).decode(),
+        )
+        self.model = Uploaded3DModel.objects.create(
+            owner=self.user, name='Grid', model_file_name='grid.glb',
+            model_data_url='data:model/gltf-binary;base64,' + base64.b64encode(self.glb).decode(),
+        )
+        self.project = Project.objects.create(owner=self.user, name='Bundle Me', steps=[
+            {'id': '1', 'custom3dElementId': self.element.pk},
+            {'id': '2', 'uploadedModelId': str(self.model.pk)},
+        ], connections=[{'id': 'e', 'data': {'custom3dElementId': self.element.pk}}])
+
+    def _export(self, archive):
+        response = self.client.get(f'/api/projects/{self.project.pk}/export/?archive={archive}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(f'bundle-me.{archive}', response['Content-Disposition'])
+        return b''.join(response.streaming_content)
+
+    def _import(self, client, data, content_type):
+        with override_settings(BACKGROUND_WORKERS=0), self.captureOnCommitCallbacks(execute=True):
+            return client.generic('POST', '/api/projects/import/', data, content_type=content_type)
+
+    def _other_client(self):
+        other = _create_user('other')
+        return other, _client(other)
+
+    def test_zip_export_contains_manifest_and_raw_assets(self):
+        with zipfile.ZipFile(io.BytesIO(self._export('zip'))) as bundle:
+            names = bundle.namelist()
+            self.assertEqual(names[0], 'project.json')
+            manifest = json.loads(bundle.read('project.json'))
+            self.assertEqual(bundle.read(f'elements/{self.element.pk}.png'), self.png)
+            self.assertEqual(bundle.read(f'models/{self.model.pk}.glb'), self.glb)
+        self.assertEqual(manifest['project']['name'], 'Bundle Me')
+        self.assertEqual([e['id'] for e in manifest['elements']], [self.element.pk])
+
+    def test_round_trip_into_another_account(self):
+        for archive, content_type in (('zip', 'application/zip'), ('tar', 'application/x-tar')):
+            other, client = self._other_client()
+            response = self._import(client, self._export(archive), content_type)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+            self.assertEqual(response.data['elements'], {'created': 1, 'reused': 0})
+            element = Created3DModelM.objects.get(owner=other)
+            model = Uploaded3DModel.objects.get(owner=other)
+            self.assertEqual(element.texture_data_url, self.element.texture_data_url)
+            self.assertEqual(element.texture_status, 'ready')
+            self.assertEqual(model.model_data_url, self.model.model_data_url)
+            self.assertEqual(model.triangle_count, 2 * 19 * 19)
+            project = response.data['project']
+            self.assertEqual(project['steps'][0]['custom3dElementId'], element.pk)
+            self.assertEqual(project['steps'][1]['uploadedModelId'], model.pk)
+            self.assertEqual(project['connections'][0]['data']['custom3dElementId'], element.pk)
+            other.delete()
+
+    def test_reimport_reuses_identical_assets(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_textures(self.element, inline=True)
+        response = self._import(self.client, self._export('tar'), 'application/x-tar')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertEqual(response.data['elements'], {'created': 0, 'reused': 1})
+        self.assertEqual(response.data['models'], {'created': 0, 'reused': 1})
+        self.assertEqual(Created3DModelM.objects.count(), 1)
+        self.assertEqual(Uploaded3DModel.objects.count(), 1)
+        self.assertEqual(response.data['project']['steps'][1]['uploadedModelId'], self.model.pk)
+
+    def test_large_assets_stream_in_bounded_chunks(self):
+        payload = os.urandom(3 * 1024 * 1024)
+        Project.objects.filter(pk=self.project.pk).update(
+            project_model_url='data:model/gltf-binary;base64,' + base64.b64encode(payload).decode())
+        response = self.client.get(f'/api/projects/{self.project.pk}/export/?archive=tar')
+        sizes = [len(chunk) for chunk in response.streaming_content]
+        self.assertGreater(sum(sizes), len(payload))
+        self.assertLessEqual(max(sizes), bundles.B64_SLICE)
+
+    def test_invalid_bundles_and_quota_are_rejected(self):
+        self.assertEqual(self.client.get(f'/api/projects/{self.project.pk}/export/?archive=rar').status_code, 400)
+        self.assertEqual(self._import(self.client, b'not a zip', 'application/zip').status_code, 400)
+        data = self._export('zip')
+        other, client = self._other_client()
+        with mock.patch.object(bundles, 'CREATED_MODEL_LIMIT', 0):
+            response = self._import(client, data, 'application/zip')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('limit', str(response.data))
+        # The import is atomic: nothing from the rejected bundle remains.
+        self.assertFalse(Project.objects.filter(owner=other).exists())
+        self.assertFalse(Created3DModelM.objects.filter(owner=other).exists())
+
+    def test_malformed_manifests_and_oversized_assets_are_rejected(self):
+
+        def bundle(manifest, files=()):
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w') as archive:
+                archive.writestr('project.json', json.dumps(manifest))
+                for name, content in files:
+                    archive.writestr(name, content)
+            return buffer.getvalue()
+
+        with zipfile.ZipFile(io.BytesIO(self._export('zip'))) as exported:
+            manifest = json.loads(exported.read('project.json'))
+        element = manifest['elements'][0]
+        cases = [
+            {**manifest, 'project': None},
+            {**manifest, 'project': {**manifest['project'], 'name': 'x' * 256}},
+            {**manifest, 'project': {**manifest['project'], 'project_type': 'cad'}},
+            {**manifest, 'project': {**manifest['project'], 'steps': {'a': 1}}},
+            {**manifest, 'elements': [{**element, 'color': '#' + 'f' * 12}]},
+            {**manifest, 'elements': [{'id': 1}]},
+            {**manifest, 'elements': [{**element, 'text': ['Hi']}]},
+            {**manifest, 'elements': [{**element, 'texture_mime': 'image/png;x'}]},
+            {**manifest, 'models': [{**manifest['models'][0], 'model_scale': 'big'}]},
+        ]
+        other, client = self._other_client()
+        for case in cases:
+            response = self._import(client, bundle(case), 'application/zip')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, case)
+        with self.settings(JSON_MAX_STRING_BYTES=1024):
+            response = self._import(client, bundle({**manifest, 'models': []}, [
+                (element['texture_file'], b'\0' * 1024)]), 'application/zip')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('larger than 768 bytes', str(response.data))
+        self.assertFalse(Project.objects.filter(owner=other).exists())
+
+    def test_oversized_bundles_and_missing_files_are_rejected(self):
+        data = self._export('zip')
+        other, client = self._other_client()
+        with mock.patch.object(bundles, 'bundle_max_bytes', return_value=len(data) - 1):
+            for archive, content_type in (('zip', 'application/zip'), ('tar', 'application/x-tar')):
+                response = self._import(client, self._export(archive), content_type)
+                self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, archive)
+            upload = SimpleUploadedFile('bundle.zip', data, content_type='application/zip')
+            response = client.post('/api/projects/import/', {'archive': upload}, format='multipart')
+            self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        with zipfile.ZipFile(io.BytesIO(data)) as exported:
+            manifest = json.loads(exported.read('project.json'))
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('project.json', json.dumps({**manifest, 'models': []}))
+        response = self._import(client, buffer.getvalue(), 'application/zip')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(f'missing {manifest["elements"][0]["texture_file"]}', str(response.data))
+        self.assertFalse(Project.objects.filter(owner=other).exists())
+
+
+class DuplicateTests(SignedInTestCase):
+    username = 'dup'
+
+    def setUp(self):
+        super().setUp()
+        self.steps = [{'id': str(i), 'title': f'Step {i}', 'description': 'x' * 1000} for i in range(50)]
+
+    def _project(self, owner=None, **fields):
+        return Project.objects.create(owner=owner or self.user, name='Original', steps=self.steps,
+                                      connections=[{'id': 'e1', 'source': '1', 'target': '2'}],
+                                      thumbnail_key='k', thumbnail_url='/api/assets/abc.webp', **fields)
+
+    def test_duplicate_copies_rows_in_database(self):
+        source = self._project()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/projects/{source.pk}/duplicate/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['name'], 'Original (copy)')
+        self.assertEqual(response.data['thumbnailUrl'], '/api/assets/abc.webp')
+        self.assertNotIn('steps', response.data)
+        [insert] = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "projects_project"')]
+        self.assertIn('SELECT', insert)
+        copy = Project.objects.get(pk=response.data['id'])
+        self.assertEqual((copy.owner_id, copy.steps, copy.connections), (self.user.pk, source.steps, source.connections))
+        self.assertGreaterEqual(copy.updated_at, source.updated_at)
+
+        named = self.client.post(f'/api/projects/{source.pk}/duplicate/', {'name': 'Mine'}, format='json')
+        self.assertEqual(named.data['name'], 'Mine')
+
+    def test_duplicate_respects_quota_and_ownership(self):
+        other = _create_user('o')
+        self.assertEqual(self.client.post(f'/api/projects/{self._project(owner=other).pk}/duplicate/').status_code,
+                         status.HTTP_404_NOT_FOUND)
+        source = self._project()
+        with mock.patch.object(cloning, 'PROJECT_LIMIT', 1):
+            response = self.client.post(f'/api/projects/{source.pk}/duplicate/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Project.objects.filter(owner=self.user).count(), 1)
+
+    def test_projects_marked_for_deletion_are_not_copied_or_counted(self):
+        deleted = self._project(deleted_at=timezone.now())
+        self.assertIsNone(cloning.copy_project(deleted.pk, self.user.pk, 'Copy'))
+        source = self._project()
+        with mock.patch.object(cloning, 'PROJECT_LIMIT', 2):
+            self.assertIsNotNone(cloning.copy_project(source.pk, self.user.pk, 'Copy'))
+
+    def test_template_gallery_copy_shares_author_assets(self):
+        author = _create_user('author')
+        png = make_png(32, 32, random.Random(5))
+        element = Created3DModelM.objects.create(
+            owner=author, name='E', text='E', color='#fff',
+            texture_data_url='data:image/png;base64,' + base64.b64encode(png).decode())
+        self.steps[0]['custom3dElementId'] = element.pk
+        template = self._project(owner=author, is_template=True)
+        self._project(owner=author)
+
+        listed = APIClient().get('/api/templates/').json()
+        self.assertEqual([t['id'] for t in listed], [template.pk])
+        self.assertNotIn('steps', listed[0])
+        self.assertEqual(APIClient().get(f'/api/templates/{template.pk}/').json()['steps'], self.steps)
+        self.assertEqual(APIClient().post(f'/api/templates/{template.pk}/use/').status_code, 401)
+
+        response = self.client.post(f'/api/templates/{template.pk}/use/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        copy = Project.objects.get(pk=response.data['id'])
+        self.assertEqual((copy.owner_id, copy.template_id, copy.is_template), (self.user.pk, template.pk, False))
+        self.assertEqual(Created3DModelM.objects.count(), 1)
+        self.assertEqual(self.client.get(f'/api/elements/{element.pk}/').status_code, status.HTTP_200_OK)
+        # The rest of the author's library stays private.
+        private = Created3DModelM.objects.create(owner=author, name='P', text='P', color='#000')
+        self.assertEqual(self.client.get(f'/api/elements/{private.pk}/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.post(f'/api/templates/{template.pk}/use/', [1], format='json').status_code,
+                         status.HTTP_201_CREATED)
+        with override_settings(BACKGROUND_WORKERS=0):
+            manifest = self.client.get(f'/api/projects/{copy.pk}/atlas/').json()
+        self.assertEqual(list(manifest['elements']), [str(element.pk)])
+
+
+class CollabTests(TestCase):
+    def setUp(self):
+        self.owner = _create_user('collab')
+        self.editor = _create_user('ed')
+        self.project = Project.objects.create(owner=self.owner, name='Live', steps=[
+            {'id': 's1', 'title': 'One'}, {'id': 's2', 'title': 'Two'},
+        ], node_positions={'s1': {'x': 0, 'y': 0}})
+
+    def _scope(self, user=None, origin=None):
+        headers = []
+        if user is not None:
+            headers.append((b'cookie', f'{settings.ACCESS_TOKEN_COOKIE}={AccessToken.for_user(user)}'.encode()))
+        if origin is not None:
+            headers.append((b'origin', origin.encode()))
+        return {'type': 'websocket', 'path': f'/ws/projects/{self.project.pk}/', 'headers': headers}
+
+    async def _connect(self, scope):
+        client = ApplicationCommunicator(application, scope)
+        await client.send_input({'type': 'websocket.connect'})
+        return client, await client.receive_output(timeout=5)
+
+    async def _message(self, client):
+        return json.loads((await client.receive_output(timeout=5))['text'])
+
+    def test_orm_calls_close_old_connections(self):
+        with mock.patch.object(collab, 'close_old_connections') as close:
+            self.assertEqual(async_to_sync(collab.database_sync_to_async(collab.editor_ids))(self.project.pk),
+                             {self.owner.pk})
+        self.assertEqual(close.call_count, 2)
+
+    def test_rejects_anonymous_strangers_and_foreign_origins(self):
+        stranger = _create_user('s')
+        for scope in (self._scope(), self._scope(stranger), self._scope(self.owner, origin='https://evil.example')):
+            _, event = async_to_sync(self._connect)(scope)
+            self.assertEqual(event, {'type': 'websocket.close', 'code': 4403})
+
+    @override_settings(CORS_ALLOWED_ORIGINS=['http://localhost'])
+    def test_broadcasts_coalesces_and_persists(self):
+        self.project.editors.add(self.editor)
+
+        async def session():
+            owner, accepted = await self._connect(self._scope(self.owner))
+            self.assertEqual(accepted['type'], 'websocket.accept')
+            self.assertEqual((await self._message(owner))['type'], 'hello')
+            editor, _ = await self._connect(self._scope(self.editor, origin='http://localhost'))
+            await self._message(editor)
+
+            for x in range(20):
+                await owner.send_input({'type': 'websocket.receive', 'text': json.dumps(
+                    {'type': 'node.move', 'node': 's1', 'position': {'x': x, 'y': 1}})})
+            moved = await self._message(editor)
+            self.assertEqual(moved, {'type': 'nodes.moved', 'positions': {'s1': {'x': 19, 'y': 1}}})
+
+            await editor.send_input({'type': 'websocket.receive', 'text': json.dumps(
+                {'type': 'step.update', 'step': 's2', 'fields': {'title': 'Second'}})})
+            # Coalesced moves go to every editor, the mover included.
+            self.assertEqual(await self._message(owner), moved)
+            updated = await self._message(owner)
+            self.assertEqual((updated['type'], updated['step'], updated['fields']), ('step.updated', 's2', {'title': 'Second'}))
+
+            await editor.send_input({'type': 'websocket.receive', 'text': '{"type": "step.update", "step": "s1"}'})
+            self.assertEqual((await self._message(editor))['type'], 'error')
+
+            for client in (owner, editor):
+                await client.send_input({'type': 'websocket.disconnect', 'code': 1000})
+                await client.wait(timeout=5)
+
+        with override_settings(COLLAB_TICK=0.01, COLLAB_PERSIST_INTERVAL=60):
+            async_to_sync(session)()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.steps[1], {'id': 's2', 'title': 'Second'})
+        self.assertEqual(self.project.node_positions, {'s1': {'x': 19, 'y': 1}})
+
+    def test_owner_manages_editors_who_can_then_edit_over_rest(self):
+        client = _client(self.owner)
+        url = f'/api/projects/{self.project.pk}/editors/'
+        unknown = client.post(url, {'email': 'nobody@example.com'}, format='json')
+        known = client.post(url, {'email': 'ED@example.com'}, format='json')
+        self.assertEqual((unknown.status_code, unknown.json()), (known.status_code, known.json()))
+        self.assertEqual(known.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(client.get(url).json(), [{'id': self.editor.pk, 'email': 'ed@example.com', 'username': 'ed'}])
+        self.assertEqual(client.post(url, ['ed@example.com'], format='json').status_code, 400)
+        with mock.patch.object(views, 'MAX_EDITORS', 1):
+            self.assertEqual(client.post(url, {'email': 'other@example.com'}, format='json').status_code, 400)
+
+        editor = _client(self.editor)
+        self.assertEqual([p['id'] for p in editor.get('/api/projects/').json()['results']], [self.project.pk])
+        self.assertEqual(editor.get(url).status_code, 404)
+        self.assertEqual(editor.delete(f'/api/projects/{self.project.pk}/').status_code, 404)
+
+        self.assertEqual(client.delete(f'{url}?id={self.editor.pk}').json(), [])
+        self.assertEqual(editor.get(f'/api/projects/{self.project.pk}/').status_code, 404)
+
+    def test_removed_editor_is_disconnected_and_unknown_nodes_are_dropped(self):
+        self.project.editors.add(self.editor)
+
+        async def session():
+            owner, _ = await self._connect(self._scope(self.owner))
+            await self._message(owner)
+            editor, _ = await self._connect(self._scope(self.editor))
+            await self._message(editor)
+            await owner.send_input({'type': 'websocket.receive', 'text': json.dumps(
+                {'type': 'node.move', 'node': 'nowhere', 'position': {'x': 1, 'y': 1}})})
+            await self._message(editor)
+            await sync_to_async(self.project.editors.remove)(self.editor)
+            await editor.send_input({'type': 'websocket.receive', 'text': json.dumps(
+                {'type': 'step.update', 'step': 's2', 'fields': {'title': 'Hijacked'}})})
+            await self._message(owner)
+            await rooms[self.project.pk].persist()
+            self.assertEqual(await editor.receive_output(timeout=5), {'type': 'websocket.close', 'code': 4403})
+            for client in (owner, editor):
+                await client.send_input({'type': 'websocket.disconnect', 'code': 1000})
+                await client.wait(timeout=5)
+
+        with override_settings(COLLAB_TICK=0.01, COLLAB_PERSIST_INTERVAL=60):
+            async_to_sync(session)()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.steps[1], {'id': 's2', 'title': 'Two'})
+        self.assertEqual(self.project.node_positions, {'s1': {'x': 0, 'y': 0}})
+
+
+class SyncTests(SignedInTestCase):
+    username = 'sync'
+
+    def _sync(self, cursor=None, **params):
+        if cursor is not None:
+            params['cursor'] = cursor
+        # Everything written by the test counts as settled.
+        with mock.patch.object(sync, 'SETTLE', timedelta(seconds=-60)):
+            response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        return response.json()
+
+    def test_snapshot_then_deltas_with_tombstones(self):
+        project = Project.objects.create(owner=self.user, name='P')
+        element = Created3DModelM.objects.create(owner=self.user, name='E', text='E', color='#fff')
+        other = _create_user('o')
+        Project.objects.create(owner=other, name='Hidden')
+
+        first = self._sync()
+        self.assertTrue(first['reset'])
+        self.assertEqual([p['id'] for p in first['projects']['updated']], [project.pk])
+        self.assertEqual([e['id'] for e in first['elements']['updated']], [element.pk])
+        self.assertEqual(self._sync(first['cursor'])['projects'], {'updated': [], 'deleted': []})
+
+        # ``update()`` from a background job is picked up as well as ``save()`` and ``delete()``.
+        Created3DModelM.objects.filter(pk=element.pk).update(texture_status='ready')
+        system = Uploaded3DModel.objects.create(owner=other, name='S', model_file_name='s.glb',
+                                                model_data_url='data:x', system_model=True)
+        project_id = project.pk
+        project.delete()
+        delta = self._sync(first['cursor'])
+        self.assertFalse(delta['reset'])
+        self.assertEqual(delta['projects'], {'updated': [], 'deleted': [project_id]})
+        [updated] = delta['elements']['updated']
+        self.assertEqual((updated['id'], updated['texture_status']), (element.pk, 'ready'))
+        self.assertEqual([m['id'] for m in delta['models']['updated']], [system.pk])
+
+        system.system_model = False
+        system.save()
+        self.assertEqual(self._sync(delta['cursor'])['models'], {'updated': [], 'deleted': [system.pk]})
+
+    def test_editor_access_pagination_and_bad_cursors(self):
+        other = _create_user('o')
+        shared = Project.objects.create(owner=other, name='Shared')
+        cursor = self._sync()['cursor']
+        shared.editors.add(self.user)
+        for i in range(3):
+            Project.objects.create(owner=self.user, name=f'P{i}')
+
+        page = self._sync(cursor, limit=2)
+        self.assertTrue(page['more'])
+        self.assertEqual([p['id'] for p in page['projects']['updated']], [shared.pk, shared.pk + 1])
+        rest = self._sync(page['cursor'], limit=2)
+        self.assertFalse(rest['more'])
+        self.assertEqual(len(rest['projects']['updated']), 2)
+
+        shared.editors.remove(self.user)
+        self.assertEqual(self._sync(rest['cursor'])['projects']['deleted'], [shared.pk])
+
+        self.assertEqual(self.client.get('/api/sync/?cursor=abc').status_code, 400)
+        self.assertEqual(self.client.get('/api/sync/?limit=0').status_code, 400)
+
+    def test_snapshot_is_paged_and_its_cursor_settled(self):
+        projects = [Project.objects.create(owner=self.user, name=f'P{i}').pk for i in range(3)]
+        element = Created3DModelM.objects.create(owner=self.user, name='E', text='E', color='#fff')
+        # Unsettled changes are not covered by the snapshot cursor.
+        self.assertEqual(self.client.get('/api/sync/').json()['cursor'], '0')
+
+        pages = [self._sync(limit=2)]
+        while pages[-1]['more']:
+            pages.append(self._sync(pages[-1]['cursor'], limit=2))
+        self.assertEqual([page['reset'] for page in pages], [True, False])
+        self.assertEqual([[p['id'] for p in page['projects']['updated']] for page in pages],
+                         [projects[:2], projects[2:]])
+        self.assertEqual([[e['id'] for e in page['elements']['updated']] for page in pages], [[], [element.pk]])
+        self.assertTrue(pages[-1]['cursor'].isdigit())
+        self.assertEqual(self._sync(pages[-1]['cursor'])['projects'], {'updated': [], 'deleted': []})
+
+    def test_pruned_cursor_gets_snapshot(self):
+        Project.objects.create(owner=self.user, name='Old')
+        cursor = self._sync()['cursor']
+        Project.objects.create(owner=self.user, name='New')
+        ChangeLog.objects.update(created_at=timezone.now() - timedelta(days=60))
+        Project.objects.create(owner=self.user, name='Newest')
+        call_command('prune_changelog', stdout=io.StringIO())
+        self.assertTrue(self._sync(int(cursor) - 1)['reset'])
+
+
+class StorageTests(SignedInTestCase):
+    username = 'rows'
+
+    def setUp(self):
+        super().setUp()
+        self.element = Created3DModelM.objects.create(owner=self.user, name='E', text='E', color='#fff')
+        self.steps = [
+            {'id': 'a', 'title': 'A', 'custom3dElementId': self.element.pk},
+            {'id': 'b', 'title': 'B'},
+            {'id': 'c', 'title': 'C', 'cameraPosition': {'x': 1, 'y': 2, 'z': 3}},
+        ]
+        self.connections = [{'id': 'e1', 'source': 'a', 'target': 'b', 'data': {'custom3dElementId': self.element.pk}}]
+
+    def _create(self, steps=None):
+        payload = _project_payload(steps=self.steps if steps is None else steps, connections=self.connections)
+        response = self.client.post('/api/projects/', payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        return Project.objects.get(pk=response.data['id'])
+
+    def test_rows_round_trip_and_partial_writes(self):
+        project = self._create()
+        self.assertEqual((project.storage, project.steps, project.connections), ('rows', [], []))
+        rows = list(ProjectStep.objects.filter(project=project).order_by('position'))
+        self.assertEqual([(r.step_id, r.element_id) for r in rows], [('a', self.element.pk), ('b', None), ('c', None)])
+        self.assertEqual(ProjectConnection.objects.get(project=project).element_id, self.element.pk)
+        listed = self.client.get('/api/projects/').data['results']
+        for data in (self.client.get(f'/api/projects/{project.pk}/').data, listed[0]):
+            self.assertEqual((data['steps'], data['connections']), (self.steps, self.connections))
+
+        steps = [self.steps[0], {**self.steps[1], 'title': 'B2'}, self.steps[2]]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(f'/api/projects/{project.pk}/', _project_payload(
+                steps=steps, connections=self.connections), format='json')
+        self.assertEqual(response.data['steps'], steps)
+        writes = [q['sql'] for q in queries.captured_queries if 'projectstep' in q['sql'] and
+                  q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(rows[0].pk, ProjectStep.objects.get(project=project, step_id='a').pk)
+
+        # Steps without unique ids move the project back to a JSON document.
+        steps = [{'title': 'no id'}, {'title': 'no id'}]
+        self.client.put(f'/api/projects/{project.pk}/', _project_payload(steps=steps), format='json')
+        project.refresh_from_db()
+        self.assertEqual((project.storage, project.steps), ('document', steps))
+        self.assertFalse(ProjectStep.objects.filter(project=project).exists())
+
+    def test_step_endpoints_for_both_engines(self):
+        for engine in ('rows', 'document'):
+            with override_settings(PROJECT_STORAGE=engine):
+                project = self._create()
+            self.assertEqual(project.storage, engine)
+            url = f'/api/projects/{project.pk}/steps/'
+            modified = self.client.get(f'/api/projects/{project.pk}/').data['lastModified']
+
+            response = self.client.put(url + 'd/?after=', {'title': 'D'}, format='json')
+            self.assertEqual((response.status_code, response.data), (201, {'title': 'D', 'id': 'd'}))
+            self.client.put(url + 'e/?after=a', {'title': 'E'}, format='json')
+            self.client.put(url + 'e/', {'title': 'E2'}, format='json')
+            self.client.put(url + 'f/', {'title': 'F'}, format='json')
+            self.assertEqual(self.client.delete(url + 'b/').status_code, status.HTTP_204_NO_CONTENT)
+            self.assertEqual([s['id'] for s in self.client.get(url).data], ['d', 'a', 'e', 'c', 'f'])
+            self.assertEqual(self.client.get(url + 'e/').data['title'], 'E2')
+
+            self.assertEqual(self.client.get(url + 'b/').status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(self.client.delete(url + 'b/').status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(self.client.put(url + 'x/?after=b', {}, format='json').status_code, 400)
+            self.assertEqual(self.client.put(url + 'x/', {'id': 'y'}, format='json').status_code, 400)
+            project_data = self.client.get(f'/api/projects/{project.pk}/').data
+            self.assertEqual([s['id'] for s in project_data['steps']], ['d', 'a', 'e', 'c', 'f'])
+            self.assertGreaterEqual(project_data['lastModified'], modified)
+
+        other = _create_user('o')
+        client = _client(other)
+        self.assertEqual(client.get(f'/api/projects/{project.pk}/steps/').status_code, status.HTTP_404_NOT_FOUND)
+        project.editors.add(other)
+        self.assertEqual(client.put(f'/api/projects/{project.pk}/steps/g/', {}, format='json').status_code, 201)
+
+    def test_insert_between_adjacent_positions_respaces(self):
+        project = self._create()
+        ProjectStep.objects.filter(project=project, step_id='b').update(position=storage.GAP + 1)
+        storage.put_step(project, 'x', {}, after='a')
+        self.assertEqual(list(ProjectStep.objects.filter(project=project).order_by('position')
+                              .values_list('step_id', flat=True)), ['a', 'x', 'b', 'c'])
+
+    def test_copies_sharing_and_conversion(self):
+        project = self._create()
+        response = self.client.post(f'/api/projects/{project.pk}/duplicate/', {}, format='json')
+        copy = Project.objects.get(pk=response.data['id'])
+        self.assertEqual(copy.storage, 'rows')
+        self.assertEqual(self.client.get(f'/api/projects/{copy.pk}/').data['steps'], self.steps)
+
+        token = self.client.post(f'/api/projects/{project.pk}/share/').data['shareToken']
+        anonymous = APIClient()
+        self.assertEqual(anonymous.get(f'/api/shared/{token}').json()['steps'], self.steps)
+        element_url = f'/api/elements/{self.element.pk}/public_element/?project_uuid={token}'
+        self.assertEqual(anonymous.get(element_url).status_code, status.HTTP_200_OK)
+
+        modified = Project.objects.get(pk=project.pk).updated_at
+        call_command('convert_project_storage', 'document', '--project', str(project.pk), stdout=io.StringIO())
+        project.refresh_from_db()
+        self.assertEqual((project.storage, project.steps, project.updated_at), ('document', self.steps, modified))
+        self.assertFalse(ProjectStep.objects.filter(project=project).exists())
+        self.assertEqual(anonymous.get(element_url).status_code, status.HTTP_200_OK)
+        call_command('convert_project_storage', 'rows', stdout=io.StringIO())
+        project.refresh_from_db()
+        self.assertEqual((project.storage, project.connections), ('rows', []))
+        self.assertEqual(self.client.get(f'/api/projects/{project.pk}/').data['connections'], self.connections)
+
+    def test_step_window_for_owner_and_share(self):
+        steps = [{'id': str(i), 'title': f'Step {i}'} for i in range(30)]
+        for engine in ('rows', 'document'):
+            with override_settings(PROJECT_STORAGE=engine):
+                project = self._create(steps)
+            url = f'/api/projects/{project.pk}/'
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(url, {'steps_offset': 10, 'steps_limit': 5}).data
+            self.assertEqual((data['steps'], data['stepsOffset'], data['stepsTotal']), (steps[10:15], 10, 30))
+            self.assertEqual(data['connections'], self.connections)
+            if engine == 'rows':
+                self.assertFalse([q for q in queries.captured_queries if '"projects_project"."steps"' in q['sql']])
+            self.assertEqual(self.client.get(url, {'steps_limit': 2}).data['steps'], steps[:2])
+            self.assertEqual(self.client.get(url, {'steps_offset': 29}).data['steps'], steps[29:])
+            self.assertNotIn('stepsTotal', self.client.get(url).data)
+
+            token = self.client.post(f'{url}share/').data['shareToken']
+            shared = APIClient().get(f'/api/shared/{token}', {'steps_offset': 28}).json()
+            self.assertEqual((shared['steps'], shared['stepsTotal']), (steps[28:], 30))
+            self.assertEqual(len(APIClient().get(f'/api/shared/{token}').json()['steps']), 30)
+            for params in ({'steps_offset': -1}, {'steps_limit': 0}, {'steps_limit': 'x'}, {'steps_limit': 501}):
+                self.assertEqual(self.client.get(url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CompressedJSONTests(TestCase):
+    def setUp(self):
+        self.user = _create_user('zstd')
+        self.addCleanup(fields.use_dictionary, None)
+
+    def _stored(self, project, field):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT {field} FROM projects_project WHERE id = %s', [project.pk])
+            return bytes(cursor.fetchone()[0])
+
+    def _steps(self, count, seed=0):
+        return [{'id': f's{seed}-{i}', 'title': f'Step {i}', 'description': 'Tighten the bolts ' * (i % 5),
+                 'cameraPosition': {'x': i, 'y': 2, 'z': 3}} for i in range(count)]
+
+    def test_documents_are_stored_compressed_in_either_mode(self):
+        guide = self._steps(40)
+        project = Project.objects.create(owner=self.user, name='Z', guide=guide, connections=[{'id': 'e'}])
+        stored = self._stored(project, 'guide')
+        self.assertEqual(stored[:1], b'z')
+        self.assertLess(len(stored), len(fields.dumps(guide)) / 4)
+        self.assertEqual(self._stored(project, 'connections')[:1], b'j')
+
+        with override_settings(PROJECT_JSON_CODEC='json'):
+            plain = Project.objects.create(owner=self.user, name='J', guide=guide)
+        self.assertEqual(self._stored(plain, 'guide'), b'j' + fields.dumps(guide))
+        self.assertEqual(list(Project.objects.filter(name__in=['Z', 'J']).values_list('guide', flat=True)),
+                         [guide, guide])
+        project.refresh_from_db()
+        self.assertEqual((project.guide, project.connections), (guide, [{'id': 'e'}]))
+        # The database cannot look inside the bytes.
+        for lookup in ({'guide__contains': [{}]}, {'guide__0__id': 's0-0'}, {'connections__has_key': 'id'}):
+            with self.assertRaises(FieldError):
+                Project.objects.filter(**lookup).exists()
+        self.assertEqual(Project.objects.filter(guide__isnull=False).count(), 2)
+
+    def test_trained_dictionary_and_recompress(self):
+        with override_settings(PROJECT_JSON_CODEC='json'):
+            projects = [Project.objects.create(owner=self.user, name=f'P{i}', guide=self._steps(5 + i % 20, i))
+                        for i in range(200)]
+        call_command('train_json_dictionary', '--size', '16384', stdout=io.StringIO())
+        dictionary = JSONDictionary.objects.get()
+        logged = ChangeLog.objects.count()
+        call_command('recompress_project_json', stdout=io.StringIO())
+        self.assertEqual(ChangeLog.objects.count(), logged)
+        stored = self._stored(projects[7], 'guide')
+        self.assertEqual(stored[:1], b'z')
+        self.assertEqual(zstandard.get_frame_parameters(stored[1:]).dict_id, dictionary.dict_id)
+        self.assertEqual(Project.objects.get(pk=projects[7].pk).guide, self._steps(12, 7))
+
+
+class ShareViewTests(SignedInTestCase):
+    username = 'views'
+
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(owner=self.user, name='Viewed', steps=[SAMPLE_STEP])
+        self.share = ProjectShare.objects.create(project=self.project)
+        self._clear_pending()
+        # Left over, the counts would be flushed at exit, after the test database is gone.
+        self.addCleanup(self._clear_pending)
+
+    def _clear_pending(self):
+        with analytics._pending_lock:
+            analytics._pending.clear()
+
+    def test_opens_are_buffered_and_flushed_in_one_batch(self):
+        other = Project.objects.create(owner=self.user, name='Other')
+        other_share = ProjectShare.objects.create(project=other)
+        with mock.patch.object(jobs, 'defer') as defer, self.captureOnCommitCallbacks(execute=True):
+            for token in [self.share.token] * 3 + [other_share.token]:
+                with self.assertNumQueries(1):
+                    self.assertEqual(APIClient().get(f'/api/shared/{token}').status_code, status.HTTP_200_OK)
+            APIClient().get('/api/shared/00000000-0000-0000-0000-000000000000')
+        self.assertEqual(defer.call_args.args[:2], (analytics.FLUSH_KEY, 5))
+        self.assertIs(defer.call_args.kwargs['inline'], False)
+        self.assertFalse(ShareViewCount.objects.exists())
+
+        with self.assertNumQueries(1):
+            self.assertEqual(analytics.flush(), 4)
+        with mock.patch.object(jobs, 'defer'):
+            APIClient().get(f'/api/shared/{self.share.token}')
+        other.delete()
+        self.assertEqual(analytics.flush(), 1)
+        self.assertEqual(analytics.flush(), 0)
+        self.assertEqual(list(ShareViewCount.objects.values_list('project_id', 'views')), [(self.project.pk, 4)])
+
+    def test_opens_are_not_written_to_another_database(self):
+        with mock.patch.object(jobs, 'defer'):
+            APIClient().get(f'/api/shared/{self.share.token}')
+        with mock.patch.dict(connection.settings_dict, NAME='elsewhere'), self.assertNumQueries(0):
+            self.assertEqual(analytics.flush(), 0)
+        self.assertEqual(analytics.flush(), 0)
+        self.assertFalse(ShareViewCount.objects.exists())
+
+    def test_owner_reads_share_views(self):
+        today = timezone.localdate()
+        ShareViewCount.objects.create(project=self.project, day=today, views=7)
+        ShareViewCount.objects.create(project=self.project, day=today - timedelta(days=40), views=3)
+        url = f'/api/projects/{self.project.pk}/share-views/'
+        self.assertEqual(self.client.get(url).json(), {
+            'totalViews': 10, 'days': [{'date': today.isoformat(), 'views': 7}],
+        })
+        self.assertEqual(len(self.client.get(url, {'days': 41}).json()['days']), 2)
+        self.assertEqual(self.client.get(url, {'days': 0}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        stranger = _create_user('stranger')
+        client = _client(stranger)
+        self.assertEqual(client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class DeletionTests(SignedInTestCase):
+    username = 'deleter'
+
+    def setUp(self):
+        super().setUp()
+        self.editor = _create_user('helper')
+
+    def _project(self, name, steps=()):
+        project = storage.create(list(steps), [], owner=self.user, name=name)
+        project.editors.add(self.editor)
+        ProjectShare.objects.create(project=project)
+        return project
+
+    def test_bulk_delete_hides_at_once_and_deletes_in_batches(self):
+        steps = [{'id': f's{i}', 'title': str(i)} for i in range(5)]
+        first, second, kept = self._project('A', steps), self._project('B'), self._project('C')
+        stranger = Project.objects.create(owner=self.editor, name='Not yours')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/projects/bulk-delete/', {'ids': [first.pk, second.pk, stranger.pk]},
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['projects'], 2)
+        self.assertEqual(response.data['status'], 'pending')
+        # Hidden everywhere before any row is deleted.
+        self.assertEqual([p['id'] for p in self.client.get('/api/projects/').data['results']], [kept.pk])
+        self.assertEqual(APIClient().get(f'/api/shared/{first.share.token}').status_code, status.HTTP_404_NOT_FOUND)
+        editor = _client(self.editor)
+        self.assertEqual({p['id'] for p in editor.get('/api/projects/').data['results']}, {kept.pk, stranger.pk})
+        self.assertEqual(Project._base_manager.filter(pk__in=[first.pk, second.pk]).count(), 2)
+
+        with override_settings(BACKGROUND_WORKERS=0), mock.patch.object(deletion, 'ROW_BATCH', 2), \
+                mock.patch.object(deletion.time, 'sleep') as sleep:
+            for callback in callbacks:
+                callback()
+        # Five step rows in three batches, then one batch per project.
+        self.assertEqual(sleep.call_count, 5)
+        self.assertFalse(Project._base_manager.filter(pk__in=[first.pk, second.pk]).exists())
+        self.assertFalse(ProjectStep.objects.filter(project_id=first.pk).exists())
+        self.assertFalse(ProjectShare.objects.filter(project_id__in=[first.pk, second.pk]).exists())
+        self.assertEqual(Project.objects.filter(pk__in=[kept.pk, stranger.pk]).count(), 2)
+
+        progress = self.client.get(f'/api/projects/deletions/{response.data["id"]}/').data
+        self.assertEqual((progress['status'], progress['remainingProjects']), ('done', 0))
+        self.assertGreaterEqual(progress['deletedRows'], 7)
+        self.assertEqual(editor.get(f'/api/projects/deletions/{response.data["id"]}/').status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.post('/api/projects/bulk-delete/', {'ids': [stranger.pk]}, format='json')
+                         .status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(DeletionJob.objects.count(), 1)
+
+    def test_account_deletion(self):
+        project = self._project('Mine', [{'id': 'a', 'title': 'A'}])
+        Created3DModelM.objects.create(owner=self.user, name='E', text='E', color='#fff')
+        Uploaded3DModel.objects.create(owner=self.user, name='M', model_file_name='m.glb', model_data_url='data:x')
+        ResetPasswordM.objects.create(user=self.user)
+        suggestion = Suggestion.objects.create(user=self.user, content='More shapes')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(self.client.delete('/api/auth/me').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(UserM.objects.get(pk=self.user.pk).is_active)
+        self.assertFalse(Project.objects.filter(pk=project.pk).exists())
+
+        with override_settings(BACKGROUND_WORKERS=0, DELETION_PAUSE=0):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(DeletionJob.objects.get().status, 'done')
+        self.assertFalse(UserM.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Project._base_manager.filter(pk=project.pk).exists())
+        self.assertFalse(Created3DModelM.objects.filter(owner_id=self.user.pk).exists())
+        self.assertFalse(Uploaded3DModel.objects.filter(owner_id=self.user.pk).exists())
+        suggestion.refresh_from_db()
+        self.assertIsNone(suggestion.user_id)
+
+    def test_account_deletion_hands_system_models_over(self):
+        system = Uploaded3DModel.objects.create(owner=self.user, name='Gear', model_file_name='g.glb',
+                                                model_data_url='data:x', system_model=True)
+        with override_settings(BACKGROUND_WORKERS=0, DELETION_PAUSE=0), self.captureOnCommitCallbacks(execute=True):
+            self.client.delete('/api/auth/me')
+        # Nobody can take the model yet: the deactivated account stays.
+        self.assertEqual(DeletionJob.objects.get().status, 'failed')
+        self.assertTrue(UserM.objects.filter(pk=self.user.pk, is_active=False).exists())
+        self.assertTrue(Uploaded3DModel.objects.filter(pk=system.pk).exists())
+
+        admin = UserM.objects.create_superuser(username='admin', email='admin@example.com', password='pass')
+        with override_settings(BACKGROUND_WORKERS=0, DELETION_PAUSE=0):
+            call_command('run_deletions', stdout=io.StringIO())
+        self.assertEqual(DeletionJob.objects.get().status, 'done')
+        self.assertFalse(UserM.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(Uploaded3DModel.objects.get(pk=system.pk).owner_id, admin.pk)
+
+
+class ShareExpiryTests(SignedInTestCase):
+    username = 'expiry'
+
+    def setUp(self):
+        super().setUp()
+        self.model = Uploaded3DModel.objects.create(owner=self.user, name='M', model_file_name='m.glb',
+                                                    model_data_url='data:x')
+        self.project = Project.objects.create(owner=self.user, name='Shared',
+                                              steps=[{**SAMPLE_STEP, 'uploadedModelId': self.model.pk}])
+
+    def test_expired_links_are_rejected_and_replaced(self):
+        response = self.client.post(f'/api/projects/{self.project.pk}/share/', {'expiresInDays': 7}, format='json')
+        token = response.data['shareToken']
+        self.assertAlmostEqual(response.data['expiresAt'], timezone.now() + timedelta(days=7),
+                               delta=timedelta(minutes=1))
+        urls = [f'/api/shared/{token}', f'/api/shared/{token}/atlas',
+                f'/api/models/{self.model.pk}/public_model/?project_uuid={token}']
+        with override_settings(BACKGROUND_WORKERS=0):
+            for url in urls:
+                self.assertEqual(APIClient().get(url).status_code, status.HTTP_200_OK, url)
+
+        ProjectShare.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        for url in urls + [f'/api/models/{self.model.pk}/public_model/?project_uuid=not-a-uuid']:
+            self.assertEqual(APIClient().get(url).status_code, status.HTTP_404_NOT_FOUND, url)
+
+        response = self.client.post(f'/api/projects/{self.project.pk}/share/')
+        self.assertNotEqual(response.data['shareToken'], token)
+        self.assertIsNone(response.data['expiresAt'])
+        self.assertEqual(APIClient().get(f'/api/shared/{response.data["shareToken"]}').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.post(f'/api/projects/{self.project.pk}/share/', {'expiresInDays': 0},
+                                          format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expiry_is_kept_changed_or_removed(self):
+        url = f'/api/projects/{self.project.pk}/share/'
+        expires_at = self.client.post(url, {'expiresInDays': 7}, format='json').data['expiresAt']
+        self.assertEqual(self.client.post(url, {}, format='json').data['expiresAt'], expires_at)
+        self.assertGreater(self.client.post(url, {'expiresInDays': 30}, format='json').data['expiresAt'], expires_at)
+        response = self.client.post(url, {'expiresInDays': None}, format='json')
+        self.assertIsNone(response.data['expiresAt'])
+        self.assertIsNone(ProjectShare.objects.get(project=self.project).expires_at)
+
+    def test_purge_deletes_only_expired_tokens(self):
+        past = timezone.now() - timedelta(minutes=1)
+        live = ResetPasswordM.objects.create(user=self.user)
+        for _ in range(5):
+            ResetPasswordM.objects.create(user=self.user, expires_at=past)
+        ProjectShare.objects.create(project=self.project, expires_at=past)
+        kept = ProjectShare.objects.create(project=Project.objects.create(owner=self.user, name='Forever'))
+
+        out = io.StringIO()
+        with self.settings(DELETION_PAUSE=0):
+            call_command('purge_expired_tokens', '--batch', '2', stdout=out)
+        self.assertIn('Deleted 5 expired password reset tokens.', out.getvalue())
+        self.assertIn('Deleted 1 expired share links.', out.getvalue())
+        self.assertEqual(list(ResetPasswordM.objects.values_list('pk', flat=True)), [live.pk])
+        self.assertEqual(list(ProjectShare.objects.values_list('pk', flat=True)), [kept.pk])
+
+
+class BulkLibraryTests(SignedInTestCase):
+    username = 'bulk'
+
+    def test_bulk_create_elements_reports_each_item(self):
+        items = [{'name': f'E{i}', 'text': f'T{i}', 'color': '#00ff00'} for i in range(3)]
+        items.insert(1, {'name': 'No text', 'color': '#00ff00'})
+        with override_settings(BACKGROUND_WORKERS=0), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/elements/bulk-create/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        results = response.json()['results']
+        self.assertEqual([r['status'] for r in results], [201, 400, 201, 201])
+        self.assertIn('text', results[1]['errors'])
+        created = Created3DModelM.objects.filter(owner=self.user)
+        self.assertEqual(sorted(created.values_list('pk', flat=True)), sorted(r['id'] for r in results if 'id' in r))
+        self.assertEqual(set(created.values_list('texture_status', flat=True)), {'none'})
+        self.assertEqual(set(ChangeLog.objects.filter(kind='element', user=self.user).values_list('object_id', flat=True)),
+                         set(created.values_list('pk', flat=True)))
+
+        too_many = [{'name': 'E', 'text': 'T', 'color': '#000'}] * (CREATED_MODEL_LIMIT - 2)
+        response = self.client.post('/api/elements/bulk-create/', {'items': too_many}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(created.count(), 3)
+
+    def test_bulk_create_is_capped_before_validation(self):
+        invalid = [{'name': 'E'}] * (CREATED_MODEL_LIMIT + 1)
+        with mock.patch.object(serializers.Created3dModelSerializer, 'is_valid') as is_valid:
+            response = self.client.post('/api/elements/bulk-create/', {'items': invalid}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('limit', str(response.data))
+            with mock.patch.object(views, 'MAX_BULK_ITEMS', 2):
+                response = self.client.post('/api/elements/bulk-create/', {'items': invalid[:3]}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('items', response.data)
+        is_valid.assert_not_called()
+
+    def test_bulk_create_models_extracts_geometry(self):
+        glb = make_glb(np.eye(3, dtype=np.float32), np.arange(3))
+        data_url = 'data:model/gltf-binary;base64,' + base64.b64encode(glb).decode()
+        items = [{'name': 'Tri', 'model_file_name': 'tri.glb', 'model_data_url': data_url},
+                 {'name': 'Raw', 'model_file_name': 'raw.bin', 'model_data_url': 'data:x;base64,AAAA'}]
+        with override_settings(BACKGROUND_WORKERS=0), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/models/bulk-create/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        tri, raw = (Uploaded3DModel.objects.get(pk=r['id']) for r in response.json()['results'])
+        self.assertEqual((tri.triangle_count, tri.lod_status), (1, 'ready'))
+        self.assertEqual((raw.file_bytes, raw.lod_status), (3, 'unsupported'))
+
+    def test_bulk_delete(self):
+        elements = [Created3DModelM.objects.create(owner=self.user, name=f'E{i}', text='T', color='#000')
+                    for i in range(3)]
+        other = _create_user('other-bulk')
+        foreign = Created3DModelM.objects.create(owner=other, name='F', text='T', color='#000')
+        project = Project.objects.create(owner=self.user, name='Uses element')
+        step = ProjectStep.objects.create(project=project, step_id='s', position=1, data={}, element=elements[0])
+        ChangeLog.objects.all().delete()
+
+        ids = [elements[0].pk, foreign.pk, elements[1].pk, 999999]
+        with self.assertNumQueries(8):
+            response = self.client.post('/api/elements/bulk-delete/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.json()['results']], [204, 404, 204, 404])
+        self.assertEqual(set(Created3DModelM.objects.values_list('pk', flat=True)), {elements[2].pk, foreign.pk})
+        step.refresh_from_db()
+        self.assertIsNone(step.element_id)
+        self.assertEqual(set(ChangeLog.objects.values_list('object_id', flat=True)), {elements[0].pk, elements[1].pk})
+
+        model = Uploaded3DModel.objects.create(owner=self.user, name='M', model_file_name='m.glb', model_data_url='x')
+        Uploaded3DModelLOD.objects.create(model=model, level=50, model_data_url='y', triangle_count=1, file_bytes=1)
+        response = self.client.post('/api/models/bulk-delete/', {'ids': [model.pk]}, format='json')
+        self.assertEqual(response.json()['results'], [{'id': model.pk, 'status': 204}])
+        self.assertFalse(Uploaded3DModelLOD.objects.exists())
+        self.assertEqual(self.client.post('/api/models/bulk-delete/', {'ids': 'x'}, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+
+class PartitioningTests(TestCase):
+    def test_editor_queries_name_the_owners(self):
+        owner = _create_user('part-owner')
+        editor = _create_user('part-editor')
+        own = Project.objects.create(owner=editor, name='Own')
+        shared = Project.objects.create(owner=owner, name='Shared')
+        Project.objects.create(owner=owner, name='Private')
+        shared.editors.add(editor)
+        client = _client(editor)
+        with CaptureQueriesContext(connection) as queries:
+            listed = client.get('/api/projects/').json()['results']
+        self.assertEqual(sorted(p['id'] for p in listed), sorted([own.pk, shared.pk]))
+        self.assertTrue(any(f'"owner_id" IN ({owner.pk})' in query['sql'] for query in queries))
+        self.assertEqual(client.get(f'/api/projects/{shared.pk}/').status_code, status.HTTP_200_OK)
+
+    def test_partitioning_needs_postgres(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('runs on PostgreSQL')
+        with self.assertRaisesMessage(CommandError, 'PostgreSQL'):
+            call_command('partition_projects', '--partitions', '4')
+
+    def test_partition_on_postgres(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('needs PostgreSQL')
+        owner = _create_user('part-pg')
+        before = Project.objects.create(owner=owner, name='Before')
+        ProjectStep.objects.create(project=before, step_id='s', position=1, data={'title': 'S'})
+        ProjectConnection.objects.create(project=before, position=1, source='a', target='b', data={})
+        ProjectShare.objects.create(project=before)
+        before.editors.add(_create_user('part-pg-editor'))
+
+        call_command('partition_projects', '--partitions', '4', stdout=io.StringIO())
+        for model in (Project, ProjectStep, ProjectConnection):
+            self.assertTrue(is_partitioned(model._meta.db_table))
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_constraint WHERE contype = 'f' AND confrelid = %s::regclass",
+                           [Project._meta.db_table])
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+        # The rows came along, ids carry on from the old sequence and Django's on_delete still cascades.
+        self.assertEqual(Project.objects.get(pk=before.pk).name, 'Before')
+        after = Project.objects.create(owner=owner, name='After', template=before)
+        self.assertGreater(after.pk, before.pk)
+        self.assertEqual(ProjectStep.objects.get(project=before).data, {'title': 'S'})
+        before.delete()
+        self.assertFalse(ProjectStep.objects.exists())
+        self.assertFalse(ProjectConnection.objects.exists())
+        self.assertFalse(ProjectShare.objects.exists())
+        after.refresh_from_db()
+        self.assertIsNone(after.template_id)
+
+        # The old copies keep their rows but must not block deletes; check constraints now, not at commit.
+        element = Created3DModelM.objects.create(owner=owner, name='E', text='E', color='#fff')
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {ProjectStep._meta.db_table}_unpartitioned')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute(f'UPDATE {ProjectStep._meta.db_table}_unpartitioned SET element_id = %s', [element.pk])
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        element.delete()
+        owner.delete()
+
+        output = io.StringIO()
+        call_command('partition_projects', '--drop-old', stdout=output)
+        self.assertIn(f'{Project._meta.db_table}_unpartitioned', output.getvalue())
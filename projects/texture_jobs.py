@@ -0,0 +1,72 @@
+"""
+Background texture processing for ``Created3DModelM``.
+
+Work is keyed by the SHA-256 of the source image: re-saving an unchanged
+texture is a no-op and a texture already processed for another element is
+reused without decoding it again.
+"""
+import logging
+from functools import partial
+
+from django.conf import settings
+
+from . import jobs
+from .assets import content_digest, store_asset
+from .models import Created3DModelM
+from .textures import TextureError, build_texture_variants
+from .utils import split_data_url
+
+logger = logging.getLogger(__name__)
+
+
+def save_textures(element_id, digest, variants):
+    manifest = [
+        {
+            'width': v['width'],
+            'height': v['height'],
+            'format': v['format'],
+            'bytes': len(v['data']),
+            'url': store_asset(v['data'], v['content_type']),
+        }
+        for v in variants
+    ]
+    # Only land if the element still holds the image this job was started for.
+    Created3DModelM.objects.filter(pk=element_id, texture_hash=digest).update(
+        textures=manifest, texture_status='ready',
+    )
+
+
+def _complete(element_id, digest, result):
+    try:
+        variants = result()
+    except TextureError as exc:
+        logger.warning('Could not process texture of element %s: %s', element_id, exc)
+        Created3DModelM.objects.filter(pk=element_id, texture_hash=digest).update(texture_status='failed')
+    except Exception:
+        logger.exception('Texture job for element %s crashed', element_id)
+        Created3DModelM.objects.filter(pk=element_id, texture_hash=digest).update(texture_status='failed')
+    else:
+        save_textures(element_id, digest, variants)
+
+
+def schedule_textures(element, inline=None):
+    """Queue variant generation for ``element`` if its texture changed since the last run."""
+    elements = Created3DModelM.objects.filter(pk=element.pk)
+    _, content = split_data_url(element.texture_data_url)
+    if content is None:
+        elements.update(texture_hash=None, textures=[], texture_status='none')
+        return
+    digest = content_digest(content)
+    current = elements.values('texture_hash', 'texture_status').first()
+    if current is None or (current['texture_hash'] == digest and current['texture_status'] in ('processing', 'ready')):
+        return
+    done = (Created3DModelM.objects.filter(texture_hash=digest, texture_status='ready')
+            .exclude(pk=element.pk).values_list('textures', flat=True).first())
+    if done is not None:
+        elements.update(texture_hash=digest, textures=done, texture_status='ready')
+        return
+    elements.update(texture_hash=digest, textures=[], texture_status='processing')
+    jobs.submit(
+        build_texture_variants, (content, settings.TEXTURE_MAX_SIZE, settings.TEXTURE_MIN_SIZE),
+        partial(_complete, element.pk, digest), inline,
+    )
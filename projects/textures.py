@@ -0,0 +1,71 @@
+"""
+Texture variants for created elements.
+
+Each source image is resized to a power-of-two mip chain encoded as WebP, plus
+one PNG/JPEG fallback at the top level for clients without WebP support.
+KTX2 is not produced: it needs a Basis Universal encoder, which has no
+maintained Python binding.
+
+This module has no Django imports; it runs inside worker processes.
+"""
+import io
+
+from PIL import Image
+
+WEBP_QUALITY = 85
+JPEG_QUALITY = 90
+
+
+class TextureError(ValueError):
+    pass
+
+
+def floor_power_of_two(value):
+    return 1 << (max(int(value), 1).bit_length() - 1)
+
+
+def _encode(image, image_format):
+    buffer = io.BytesIO()
+    if image_format == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    elif image_format == 'jpeg':
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return {
+        'width': image.width,
+        'height': image.height,
+        'format': image_format,
+        'content_type': f'image/{image_format}',
+        'data': buffer.getvalue(),
+    }
+
+
+def build_texture_variants(data, max_size=2048, min_size=32):
+    """
+    Decode ``data`` and return encoded variants, largest first.
+
+    Every variant is ``{'width', 'height', 'format', 'content_type', 'data'}``.
+    Raises ``TextureError`` when the image cannot be decoded.
+    """
+    try:
+        source = Image.open(io.BytesIO(data))
+        source.load()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as exc:
+        raise TextureError(f'Could not decode texture: {exc}')
+    has_alpha = source.mode in ('RGBA', 'LA', 'PA') or 'transparency' in source.info
+    source = source.convert('RGBA' if has_alpha else 'RGB')
+
+    # Sizes only ever go down: each edge is floored to a power of two.
+    width = min(floor_power_of_two(source.width), max_size)
+    height = min(floor_power_of_two(source.height), max_size)
+    top = source.resize((width, height), Image.Resampling.LANCZOS)
+    variants = [_encode(top, 'png' if has_alpha else 'jpeg')]
+    level = top
+    while True:
+        variants.append(_encode(level, 'webp'))
+        if max(level.width, level.height) <= min_size:
+            break
+        # Halving the previous level with a box filter is exactly a mip reduction.
+        level = level.resize((max(level.width // 2, 1), max(level.height // 2, 1)), Image.Resampling.BOX)
+    return variants
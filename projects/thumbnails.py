@@ -0,0 +1,137 @@
+"""
+Preview thumbnails for projects and uploaded models.
+
+Edits queue a refresh that runs ``THUMBNAIL_DELAY`` seconds later, so a burst
+of autosaves costs one render. Each row keeps ``thumbnail_key``, the hash of
+what was last rendered: edits that do not change the picture (renames, step
+text) cost a query and no render. Rendering (``projects.rasterizer``) runs in
+the ``projects.jobs`` process pool and the WebP output is stored
+content-addressed, so thumbnail URLs are immutable.
+"""
+import hashlib
+import logging
+from functools import partial
+
+from django.conf import settings
+from django.db.models import Q
+
+from . import jobs
+from .assets import store_asset
+from .catalogue import bump_version
+from .cloning import asset_owner_ids
+from .geometry import GeometryError, is_gltf
+from .models import Project, Uploaded3DModel
+from .rasterizer import render_thumbnail
+from .storage import load_documents
+from .utils import split_data_url
+
+logger = logging.getLogger(__name__)
+
+# Bump when the rasterizer output changes so every thumbnail is re-rendered.
+RENDER_VERSION = 1
+DEFAULT_SHAPE_COLOR = '#9eadc7'
+
+
+def source_key(source):
+    digest = hashlib.sha256(f'v{RENDER_VERSION}:'.encode())
+    if 'model' in source:
+        digest.update(b'model:')
+        digest.update(source['model'])
+    else:
+        digest.update(f'shape:{source["shape"]}:{source["color"]}'.encode())
+    return digest.hexdigest()
+
+
+def model_source(data_url, file_name=''):
+    _, content = split_data_url(data_url)
+    if content is None or not is_gltf(content, file_name):
+        return None
+    return {'model': content}
+
+
+def project_source(project):
+    """
+    Pick what a project's thumbnail shows: its own model, else the first step's
+    uploaded or embedded model, else the first step's built-in shape.
+    """
+    source = model_source(project['project_model_url'])
+    if source:
+        return source
+    steps = [step for step in project['steps'] if isinstance(step, dict)]
+    owners = None
+    for step in steps:
+        model_id = step.get('uploadedModelId')
+        if model_id and str(model_id).isdigit():
+            # Only the owner's (or template author's) models or public ones may appear in the picture.
+            owners = owners or asset_owner_ids(project)
+            model = (Uploaded3DModel.objects.filter(Q(owner_id__in=owners) | Q(system_model=True), pk=model_id)
+                     .values('model_data_url', 'model_file_name').first())
+            source = model and model_source(model['model_data_url'], model['model_file_name'])
+        elif step.get('customModelUrl'):
+            source = model_source(step['customModelUrl'])
+        if source:
+            return source
+    first = steps[0] if steps else {}
+    return {
+        'shape': first.get('modelPath') or first.get('shapeType') or 'cube',
+        'color': first.get('highlightColor') or DEFAULT_SHAPE_COLOR,
+    }
+
+
+def _render_result(label, result):
+    try:
+        return store_asset(result(), 'image/webp')
+    except GeometryError as exc:
+        logger.warning('Could not render thumbnail for %s: %s', label, exc)
+        return None
+
+
+def _save_project(project_id, key, updated_at, result):
+    url = _render_result(f'project {project_id}', result)
+    Project.objects.filter(pk=project_id).update(thumbnail_key=key, thumbnail_url=url, thumbnail_updated_at=updated_at)
+
+
+def _save_model(model_id, key, result):
+    url = _render_result(f'model {model_id}', result)
+    if Uploaded3DModel.objects.filter(pk=model_id).update(thumbnail_key=key, thumbnail_url=url):
+        if Uploaded3DModel.objects.filter(pk=model_id, system_model=True).exists():
+            # ``update()`` skips the model signals; the catalogue lists thumbnail URLs.
+            bump_version()
+
+
+def refresh_project(project_id, inline=None):
+    project = (Project.objects.filter(pk=project_id)
+               .values('id', 'owner_id', 'template_id', 'storage', 'project_model_url', 'steps', 'connections',
+                       'updated_at', 'thumbnail_key').first())
+    if project is None:
+        return
+    load_documents([project])
+    source = project_source(project)
+    key = source_key(source)
+    if key == project['thumbnail_key']:
+        Project.objects.filter(pk=project_id).update(thumbnail_updated_at=project['updated_at'])
+        return
+    jobs.submit(render_thumbnail, (source,), partial(_save_project, project_id, key, project['updated_at']), inline)
+
+
+def refresh_model(model_id, inline=None):
+    model = (Uploaded3DModel.objects.filter(pk=model_id)
+             .values('model_data_url', 'model_file_name', 'thumbnail_key').first())
+    if model is None:
+        return
+    source = model_source(model['model_data_url'], model['model_file_name'])
+    if source is None:
+        # OBJ and unreadable uploads have no thumbnail.
+        Uploaded3DModel.objects.filter(pk=model_id).update(thumbnail_key='', thumbnail_url=None)
+        return
+    key = source_key(source)
+    if key != model['thumbnail_key']:
+        jobs.submit(render_thumbnail, (source,), partial(_save_model, model_id, key), inline)
+
+
+def queue_project(project_id):
+    jobs.defer(('project-thumbnail', project_id), settings.THUMBNAIL_DELAY, partial(refresh_project, project_id))
+
+
+def queue_model(model_id):
+    jobs.defer(('model-thumbnail', model_id), settings.THUMBNAIL_DELAY, partial(refresh_model, model_id))
@@ -2,7 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import SimpleRouter
 
 from .views import ProjectSharedView, ProjectViewSet, Created3DModelViewSet, Uploaded3DModelViewSet, \
-    SuggestionViewSet, PublicUploaded3DModelViewSet
+    SuggestionViewSet, PublicUploaded3DModelViewSet, AssetView, ProjectSharedAtlasView, \
+    LabelView, ProjectTemplateViewSet, SyncView
 
 router = SimpleRouter()
 router.register('elements', Created3DModelViewSet, basename='element')
@@ -10,8 +11,13 @@ router.register('models', Uploaded3DModelViewSet, basename='model')
 router.register('suggestion', SuggestionViewSet, basename='suggestion')
 router.register('public-models', PublicUploaded3DModelViewSet, basename='public-model')
 router.register('projects', ProjectViewSet, basename='project')
+router.register('templates', ProjectTemplateViewSet, basename='template')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('shared/<uuid:token>', ProjectSharedView.as_view(), name='project-shared'),
+    path('shared/<uuid:token>/atlas', ProjectSharedAtlasView.as_view(), name='project-shared-atlas'),
+    path('assets/<str:name>', AssetView.as_view(), name='asset'),
+    path('labels/', LabelView.as_view(), name='label'),
+    path('sync/', SyncView.as_view(), name='sync'),
 ]
@@ -0,0 +1,35 @@
+import base64
+import binascii
+
+
+def split_data_url(value):
+    """
+    Split a ``data:<mime>;base64,<payload>`` URL into ``(mime, bytes)``.
+
+    Returns ``(None, None)`` for anything that is not a base64 data URL.
+    """
+    if not value or not value.startswith('data:') or ';base64,' not in value:
+        return None, None
+    header, payload = value.split(';base64,', 1)
+    try:
+        return header[len('data:'):] or 'application/octet-stream', base64.b64decode(payload)
+    except (binascii.Error, ValueError):
+        return None, None
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def referenced_ids(steps, connections, key):
+    """
+    Ids stored under ``key`` (e.g. ``custom3dElementId``) in a project's steps
+    and edge data. The JSON comes from clients: values that are not integers
+    are left out.
+    """
+    values = [item.get(key) for item in steps if isinstance(item, dict)]
+    values += [i['data'].get(key) for i in connections if isinstance(i, dict) and isinstance(i.get('data'), dict)]
+    return [value for value in map(_as_id, values) if value is not None]
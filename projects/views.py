@@ -1,15 +1,228 @@
+import uuid
+from datetime import timedelta
+from functools import partial
+
 from authentication.models import UserM
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.utils.text import slugify
 from rest_framework import generics, status, viewsets
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 from rest_framework import mixins, filters
+from threeddocs.compression import mark_precompressible
+from threeddocs.renderers import PassthroughRenderer
+
+from .analytics import record_share_view, share_views
+from .atlas import get_atlas
+from .bundles import ARCHIVE_TYPES, PROJECT_FIELDS, BundleError, export_bundle, import_bundle
+from .catalogue import bump_version, get_catalogue
+from .cloning import copy_name, copy_project
+from .deletion import delete_projects
+from .labels import DEFAULT_FONT, DEFAULT_SIZE, LabelError, get_label, validate
+from .lod import FULL_LEVEL, schedule_lods, select_lod
+from .models import Project, ProjectShare, Created3DModelM, Uploaded3DModel, Suggestion, StoredAsset, DeletionJob
+from . import storage
+from .storage import asset_ids
+from .utils import split_data_url
+from .sync import MAX_PAGE_SIZE, PAGE_SIZE, SNAPSHOT_CURSOR, changes, snapshot
+from .texture_jobs import schedule_textures
+from .thumbnails import queue_model
+from .serializers import PROJECT_LIMIT, check_quota, ProjectSerializer, Created3dModelSerializer, Uploaded3dModelSerializer, SuggestionSerializer, \
+    ProjectReadSerializer, Uploaded3dModelReadSerializer, Created3dModelReadSerializer, ProjectSummarySerializer
+
+# Actions served from ``values()`` rows by the read-only fast-path serializers.
+READ_ACTIONS = ('list', 'retrieve')
+# Project actions open to its editors as well as its owner.
+EDITOR_ACTIONS = ('list', 'retrieve', 'update', 'steps', 'step')
+# Most ids one bulk delete of elements or models may name.
+MAX_BULK_IDS = 500
+# Most items one bulk create of elements or models may send.
+MAX_BULK_ITEMS = 100
+# Most editors a project may have besides its owner.
+MAX_EDITORS = 50
+
+
+def requested_ids(request, label):
+    """The ``ids`` list of a bulk request body."""
+    ids = request.data.get('ids') if isinstance(request.data, dict) else None
+    if not isinstance(ids, list) or not ids or not all(str(pk).isdigit() for pk in ids):
+        raise ValidationError({'ids': f'Must be a non-empty list of {label} ids.'})
+    return [int(pk) for pk in ids]
+
+
+def requested_lod(request):
+    """Parse ``?lod=<percent of triangles>``; ``None`` when the original is wanted."""
+    value = request.query_params.get('lod')
+    if value is None:
+        return None
+    try:
+        level = int(value)
+    except ValueError:
+        level = 0
+    if not 1 <= level <= FULL_LEVEL:
+        raise ValidationError({'lod': f'Must be an integer between 1 and {FULL_LEVEL}.'})
+    return level
+
+
+def with_lod(request, data):
+    """
+    Swap ``model_data_url`` for the requested level of detail.
+
+    Falls back to the next more detailed variant (or the original) while the
+    requested one is not built yet; ``lod`` tells the client what it got.
+    """
+    level = requested_lod(request)
+    if level is None:
+        return data
+    variant = select_lod(data['id'], level)
+    if variant is None:
+        return {**data, 'lod': FULL_LEVEL}
+    return {**data, 'model_data_url': variant['model_data_url'], 'lod': variant['level']}
+
+
+ATLAS_PROJECT_FIELDS = ('id', 'owner_id', 'template_id', 'storage', 'steps', 'connections')
+
+
+# Seconds a client is told to wait before asking again for an atlas being built.
+ATLAS_RETRY_AFTER = 2
+
+
+def atlas_response(request, project, public):
+    """
+    Serve a project's texture atlas manifest, answering ``If-None-Match`` with
+    304. While the current atlas is built the previous one is served, or 202.
+    """
+    manifest, current = get_atlas(project)
+    if manifest is None:
+        response = Response({'detail': 'The atlas is being built.'}, status=status.HTTP_202_ACCEPTED)
+        response['Retry-After'] = str(ATLAS_RETRY_AFTER)
+        patch_cache_control(response, no_store=True)
+        return response
+    etag = f'"atlas-{manifest["key"]}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = Response(manifest)
+    response['ETag'] = etag
+    if not current:
+        response['Retry-After'] = str(ATLAS_RETRY_AFTER)
+    patch_cache_control(response, public=public, private=not public, no_cache=True)
+    return response
+
+
+# Request content types accepted by the import endpoint; gzip/bzip2/xz tars are detected by ``tarfile``.
+IMPORT_CONTENT_TYPES = {
+    'application/zip': 'zip', 'application/x-zip-compressed': 'zip',
+    'application/x-tar': 'tar', 'application/gzip': 'tar', 'application/x-gzip': 'tar',
+    'application/x-gtar': 'tar', 'application/x-bzip2': 'tar', 'application/x-xz': 'tar',
+}
+
+
+def copy_response(request, source, template_id):
+    """Copy a project row (``id``, ``name``) for the requesting user and answer 201 with its summary."""
+    name = (request.data.get('name') if isinstance(request.data, dict) else None) or copy_name(source['name'])
+    if not isinstance(name, str) or len(name) > Project._meta.get_field('name').max_length:
+        raise ValidationError({'name': 'Must be a string of at most 255 characters.'})
+    project_id = copy_project(source['id'], request.user.pk, name, template_id)
+    if project_id is None:
+        raise ValidationError({'detail': f'You have reached the limit of {PROJECT_LIMIT} projects.'})
+    project = Project.objects.values(*ProjectSummarySerializer.values_fields).get(pk=project_id)
+    return Response(ProjectSummarySerializer(project).data, status=status.HTTP_201_CREATED)
+
+
+def template_asset(model, key, pk):
+    """
+    ``model`` row ``pk`` of another user when a template of that user
+    references it under ``key`` (copies of templates use their author's
+    assets), otherwise an empty queryset.
+    """
+    if not str(pk).isdigit():
+        return model.objects.none()
+    owner_id = model.objects.filter(pk=pk).values_list('owner_id', flat=True).first()
+    templates = Project.objects.filter(is_template=True, owner_id=owner_id).values('id', 'storage', 'steps', 'connections')
+    if any(int(pk) in asset_ids(template, key) for template in templates.iterator()):
+        return model.objects.filter(pk=pk)
+    return model.objects.none()
+
+
+# Steps per response when only ``steps_offset`` is given, and the most one may ask for.
+STEP_WINDOW = 50
+MAX_STEP_WINDOW = 500
+# Project columns read for a windowed response; the steps come from ``storage.step_window``.
+WINDOW_FIELDS = tuple(field for field in ProjectReadSerializer.values_fields if field != 'steps')
+# Days of share link opens reported by default, and the most one may ask for.
+SHARE_VIEW_DAYS = 30
+MAX_SHARE_VIEW_DAYS = 366
+# Longest lifetime an owner may give a share link (``expiresInDays``).
+MAX_SHARE_LINK_DAYS = 3650
+
+
+def requested_step_window(request):
+    """Parse ``?steps_offset=&steps_limit=`` into ``(offset, limit)``; ``None`` when all steps are wanted."""
+    offset, limit = request.query_params.get('steps_offset'), request.query_params.get('steps_limit')
+    if offset is None and limit is None:
+        return None
+    try:
+        offset, limit = int(offset or 0), int(limit or STEP_WINDOW)
+    except ValueError:
+        offset = limit = -1
+    if offset < 0 or not 1 <= limit <= MAX_STEP_WINDOW:
+        raise ValidationError({'steps': f'steps_offset must be >= 0 and steps_limit between 1 and {MAX_STEP_WINDOW}.'})
+    return offset, limit
+
 
-from .models import Project, ProjectShare, Created3DModelM, Uploaded3DModel, Suggestion
-from .serializers import ProjectSerializer, Created3dModelSerializer, Uploaded3dModelSerializer, SuggestionSerializer
+def with_step_window(project, window):
+    """
+    Serialize a project row read with ``WINDOW_FIELDS`` with only
+    ``steps[offset:offset + limit]``, plus ``stepsOffset`` and ``stepsTotal``.
+    """
+    offset, limit = window
+    steps, total = storage.step_window(project, offset, limit)
+    storage.load_documents([project])
+    project['steps'] = steps
+    return {**ProjectReadSerializer(project).data, 'stepsOffset': offset, 'stepsTotal': total}
+
+
+def requested_archive(value):
+    if value not in ARCHIVE_TYPES:
+        raise ValidationError({'archive': f'Must be one of: {", ".join(ARCHIVE_TYPES)}.'})
+    return value
+
+
+def shared_project(token, fields):
+    """The ``values()`` row of the project shared under ``token``; 404 if there is none or the link expired."""
+    try:
+        token = uuid.UUID(str(token))
+    except ValueError:
+        raise NotFound()
+    project = (Project.objects.filter(Q(share__expires_at__isnull=True) | Q(share__expires_at__gt=timezone.now()),
+                                      share__token=token)
+               .values(*fields).first())
+    if project is None:
+        raise NotFound()
+    return project
+
+
+def deletion_data(job):
+    """Progress of a project ``DeletionJob`` as returned by the API."""
+    return {
+        'id': job.pk,
+        'status': job.status,
+        'projects': len(job.project_ids),
+        'remainingProjects': Project._base_manager.filter(pk__in=job.project_ids).count(),
+        'deletedRows': job.deleted_rows,
+        'createdAt': job.created_at,
+        'finishedAt': job.finished_at,
+    }
 
 
 class ProjectViewSet(viewsets.ModelViewSet):
@@ -21,11 +234,54 @@ class ProjectViewSet(viewsets.ModelViewSet):
     search_fields = ['name'] 
 
     def get_queryset(self):
-        return Project.objects.filter(owner=self.request.user)
+        user = self.request.user
+        queryset = Project.objects.filter(owner=user)
+        if self.action in EDITOR_ACTIONS:
+            # Literal ids and owners rather than a subquery: both arms of the OR
+            # then use an index, and on a partitioned table (projects.partitioning)
+            # only the partitions of these owners are read.
+            edited = list(user.edited_projects.values_list('pk', 'owner_id'))
+            queryset = Project.objects.filter(
+                Q(owner=user) | Q(pk__in=[pk for pk, _ in edited], owner_id__in={owner for _, owner in edited})
+            )
+        if self.action == 'retrieve' and requested_step_window(self.request):
+            return queryset.values(*WINDOW_FIELDS)
+        if self.action in READ_ACTIONS:
+            return queryset.values(*ProjectReadSerializer.values_fields)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action in READ_ACTIONS:
+            return ProjectReadSerializer
+        return ProjectSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        window = requested_step_window(request)
+        if window is None:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(with_step_window(self.get_object(), window))
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
+    def perform_destroy(self, instance):
+        delete_projects(self.request.user, [instance.pk])
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Hide the projects listed in ``ids`` at once and delete them in the background."""
+        job = delete_projects(request.user, requested_ids(request, 'project'))
+        if job is None:
+            raise NotFound()
+        return Response(deletion_data(job), status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path=r'deletions/(?P<job_id>\d+)')
+    def deletion(self, request, job_id=None):
+        job = DeletionJob.objects.filter(pk=job_id, kind='projects', user_id=request.user.pk).first()
+        if job is None:
+            raise NotFound()
+        return Response(deletion_data(job))
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def share(self, request, pk=None):
         try:
@@ -33,8 +289,139 @@ class ProjectViewSet(viewsets.ModelViewSet):
         except Project.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
-        share, _ = ProjectShare.objects.get_or_create(project=project)
-        return Response({'shareToken': str(share.token)})
+        data = request.data if isinstance(request.data, dict) else {}
+        days = data.get('expiresInDays')
+        if days is not None and (not str(days).isdigit() or not 1 <= int(days) <= MAX_SHARE_LINK_DAYS):
+            raise ValidationError({'expiresInDays': f'Must be an integer between 1 and {MAX_SHARE_LINK_DAYS}.'})
+        share, created = ProjectShare.objects.get_or_create(project=project)
+        now = timezone.now()
+        if not created and share.expires_at is not None and share.expires_at <= now:
+            # An expired link stays dead: sharing again hands out a new token.
+            share.token, share.expires_at = uuid.uuid4(), None
+            created = True
+        if 'expiresInDays' in data:
+            # ``null`` removes the expiry; leaving the key out keeps it.
+            share.expires_at = None if days is None else now + timedelta(days=int(days))
+        elif created and settings.SHARE_LINK_TTL is not None:
+            share.expires_at = now + settings.SHARE_LINK_TTL
+        share.save()
+        return Response({'shareToken': str(share.token), 'expiresAt': share.expires_at})
+
+    @action(detail=True, methods=['get'], url_path='share-views')
+    def share_views(self, request, pk=None):
+        """Opens of the share link: the total and per day for the last ``?days=`` (default 30) days."""
+        if not Project.objects.filter(pk=pk, owner=request.user).exists():
+            raise NotFound()
+        days = request.query_params.get('days', str(SHARE_VIEW_DAYS))
+        if not days.isdigit() or not 1 <= int(days) <= MAX_SHARE_VIEW_DAYS:
+            raise ValidationError({'days': f'Must be an integer between 1 and {MAX_SHARE_VIEW_DAYS}.'})
+        return Response(share_views(pk, int(days)))
+
+    @action(detail=True, methods=['get'])
+    def atlas(self, request, pk=None):
+        project = Project.objects.filter(pk=pk, owner=request.user).values(*ATLAS_PROJECT_FIELDS).first()
+        if project is None:
+            raise NotFound()
+        return atlas_response(request, project, public=False)
+
+    @action(detail=True, methods=['get', 'post', 'delete'])
+    def editors(self, request, pk=None):
+        """
+        List, add (by ``email``) or remove (by ``id``) the users who may edit
+        the project with you. Adding answers the same whether or not the email
+        belongs to a user, so it cannot be used to look up accounts.
+        """
+        project = Project.objects.filter(pk=pk, owner=request.user).first()
+        if project is None:
+            raise NotFound()
+        data = request.data if isinstance(request.data, dict) else {}
+        if request.method == 'POST':
+            email = data.get('email')
+            if not isinstance(email, str) or '@' not in email:
+                raise ValidationError({'email': 'Must be an email address.'})
+            if project.editors.count() >= MAX_EDITORS:
+                raise ValidationError({'detail': f'A project can have at most {MAX_EDITORS} editors.'})
+            editor = UserM.objects.filter(email__iexact=email).exclude(pk=request.user.pk).first()
+            if editor is not None:
+                project.editors.add(editor)
+            return Response({'detail': 'If a user has this email address, they can now edit the project.'},
+                            status=status.HTTP_202_ACCEPTED)
+        elif request.method == 'DELETE':
+            editor_id = str(data.get('id') or request.query_params.get('id') or '')
+            if not editor_id.isdigit():
+                raise ValidationError({'id': 'Must be a user id.'})
+            project.editors.remove(*UserM.objects.filter(pk=editor_id))
+        return Response(list(project.editors.order_by('email').values('id', 'email', 'username')))
+
+    @action(detail=True, methods=['get'])
+    def steps(self, request, pk=None):
+        steps, _ = storage.documents(self.get_object())
+        return Response(steps)
+
+    @action(detail=True, methods=['get', 'put', 'delete'], url_path=r'steps/(?P<step_id>[^/]+)')
+    def step(self, request, pk=None, step_id=None):
+        """
+        Read, create or replace, or delete one step without sending the whole
+        project. ``PUT ?after=<step id>`` places the step after another one
+        (``?after=`` for the start); new steps are appended otherwise.
+        """
+        project = self.get_object()
+        if request.method == 'PUT':
+            if not isinstance(request.data, dict):
+                raise ValidationError({'detail': 'A step must be a JSON object.'})
+            try:
+                step, created = storage.put_step(project, step_id, request.data, request.query_params.get('after'))
+            except storage.StepError as exc:
+                raise ValidationError({'detail': str(exc)})
+            return Response(step, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+        if request.method == 'DELETE':
+            if not storage.delete_step(project, step_id):
+                raise NotFound()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        step = storage.get_step(project, step_id)
+        if step is None:
+            raise NotFound()
+        return Response(step)
+
+    @action(detail=True, methods=['post'])
+    def duplicate(self, request, pk=None):
+        source = Project.objects.filter(pk=pk, owner=request.user).values('id', 'name', 'template_id').first()
+        if source is None:
+            raise NotFound()
+        return copy_response(request, source, source['template_id'])
+
+    @action(detail=True, methods=['get'], renderer_classes=[PassthroughRenderer])
+    def export(self, request, pk=None):
+        archive = requested_archive(request.query_params.get('archive', 'zip'))
+        project = (Project.objects.filter(pk=pk, owner=request.user)
+                   .values('id', 'owner_id', 'template_id', 'storage', *PROJECT_FIELDS).first())
+        if project is None:
+            raise NotFound()
+        response = StreamingHttpResponse(export_bundle(project, archive), content_type=ARCHIVE_TYPES[archive])
+        file_name = slugify(project['name']) or f'project-{project["id"]}'
+        response['Content-Disposition'] = f'attachment; filename="{file_name}.{archive}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_project(self, request):
+        """Create a project from a bundle sent as the raw body or as the ``archive`` multipart file."""
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type == 'multipart/form-data':
+            upload = request.FILES.get('archive')
+            if upload is None:
+                raise ValidationError({'archive': 'No file was submitted.'})
+            default = 'zip' if upload.name.lower().endswith('.zip') else 'tar'
+            archive, fileobj = requested_archive(request.query_params.get('archive', default)), upload
+        else:
+            archive = request.query_params.get('archive') or IMPORT_CONTENT_TYPES.get(content_type)
+            archive, fileobj = requested_archive(archive), request.stream
+            if fileobj is None:
+                raise ValidationError({'detail': 'Empty request body.'})
+        try:
+            project, stats = import_bundle(fileobj, archive, request.user)
+        except BundleError as exc:
+            raise ValidationError({'detail': str(exc)})
+        return Response({'project': ProjectSerializer(project).data, **stats}, status=status.HTTP_201_CREATED)
 
 # class ProjectPublicView(generics.RetrieveAPIView):
 #     serializer_class = ProjectSerializer
@@ -56,19 +443,135 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
 
 class ProjectSharedView(generics.RetrieveAPIView):
-    serializer_class = ProjectSerializer
+    serializer_class = ProjectReadSerializer
     permission_classes = [AllowAny]
 
-    def get_object(self):
-        token = self.kwargs['token']
-        try:
-            share = ProjectShare.objects.select_related('project').get(token=token)
-        except ProjectShare.DoesNotExist:
+    def get_object(self, fields=ProjectReadSerializer.values_fields):
+        return shared_project(self.kwargs['token'], fields)
+
+    def retrieve(self, request, *args, **kwargs):
+        window = requested_step_window(request)
+        if window is None:
+            project = self.get_object()
+            response = Response(self.get_serializer(project).data)
+        else:
+            project = self.get_object(WINDOW_FIELDS)
+            response = Response(with_step_window(project, window))
+        record_share_view(project['id'])
+        key = f'shared:{self.kwargs["token"]}:{project["updated_at"].isoformat()}:{window}'
+        return mark_precompressible(response, key=key)
+
+
+class ProjectSharedAtlasView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, token):
+        return atlas_response(request, shared_project(token, ATLAS_PROJECT_FIELDS), public=True)
+
+
+class ProjectTemplateViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericViewSet):
+    """Template gallery: projects marked ``is_template`` (in the admin), copied with ``use``."""
+    permission_classes = [AllowAny]
+    pagination_class = None
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['name']
+
+    def get_queryset(self):
+        serializer_class = self.get_serializer_class()
+        return Project.objects.filter(is_template=True).order_by('name').values(*serializer_class.values_fields)
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return ProjectReadSerializer
+        return ProjectSummarySerializer
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def use(self, request, pk=None):
+        source = Project.objects.filter(pk=pk, is_template=True).values('id', 'name').first()
+        if source is None:
             raise NotFound()
-        return share.project
+        return copy_response(request, source, source['id'])
+
+
+class SyncView(APIView):
+    """Changes to the user's projects, elements and models since ``?cursor`` (a snapshot without one)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        cursor = request.query_params.get('cursor')
+        limit = request.query_params.get('limit', str(PAGE_SIZE))
+        if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+            raise ValidationError({'limit': f'Must be an integer between 1 and {MAX_PAGE_SIZE}.'})
+        if not cursor:
+            return Response(snapshot(request.user, int(limit)))
+        if match := SNAPSHOT_CURSOR.match(cursor):
+            position = (int(match[1]), match[2], int(match[3]))
+            return Response(snapshot(request.user, int(limit), position))
+        if not cursor.isdigit():
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+        return Response(changes(request.user, int(cursor), int(limit)))
+
+
+class BulkLibraryMixin:
+    """
+    ``bulk-create`` and ``bulk-delete`` for the user's element or model
+    library, answering with one result per item. The quota is counted once
+    per batch, before any item is validated, the rows are inserted with one
+    ``bulk_create`` and deleted with ``bulk_delete``. Neither sends model signals, so the background
+    work they would queue is queued by ``bulk_created``.
+    """
+
+    def bulk_created(self, objs):
+        pass
+
+    def bulk_deleting(self, queryset):
+        pass
 
+    @action(detail=False, methods=['post'], url_path='bulk-create')
+    def bulk_create(self, request):
+        items = request.data.get('items') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'items': 'Must be a non-empty list.'})
+        if len(items) > MAX_BULK_ITEMS:
+            raise ValidationError({'items': f'At most {MAX_BULK_ITEMS} items per request.'})
+        model = self.serializer_class.Meta.model
+        # Every item counts, so a batch over the quota is refused before any data URL is decoded.
+        check_quota(model, request.user, len(items))
+        context = {**self.get_serializer_context(), 'quota_checked': True}
+        serializers = [self.serializer_class(data=item, context=context) for item in items]
+        valid = [serializer for serializer in serializers if serializer.is_valid()]
+        objs = []
+        if valid:
+            with transaction.atomic():
+                objs = model.objects.bulk_create([serializer.build(serializer.validated_data) for serializer in valid])
+                self.bulk_created(objs)
+        created = iter(objs)
+        results = [{'status': status.HTTP_400_BAD_REQUEST, 'errors': serializer.errors} if serializer.errors
+                   else {'status': status.HTTP_201_CREATED, 'id': next(created).pk} for serializer in serializers]
+        if len(objs) == len(items):
+            code = status.HTTP_201_CREATED
+        else:
+            code = status.HTTP_207_MULTI_STATUS if objs else status.HTTP_400_BAD_REQUEST
+        return Response({'results': results}, status=code)
 
-class Created3DModelViewSet(mixins.ListModelMixin,
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        ids = requested_ids(request, self.basename)
+        if len(ids) > MAX_BULK_IDS:
+            raise ValidationError({'ids': f'At most {MAX_BULK_IDS} ids per request.'})
+        model = self.serializer_class.Meta.model
+        with transaction.atomic():
+            rows = model.objects.filter(owner=request.user, pk__in=ids)
+            self.bulk_deleting(rows)
+            deleted = set(rows.bulk_delete())
+        return Response({'results': [
+            {'id': pk, 'status': status.HTTP_204_NO_CONTENT if pk in deleted else status.HTTP_404_NOT_FOUND}
+            for pk in ids
+        ]})
+
+
+class Created3DModelViewSet(BulkLibraryMixin,
+                            mixins.ListModelMixin,
                             mixins.CreateModelMixin,
                             mixins.RetrieveModelMixin,
                             mixins.DestroyModelMixin,
@@ -80,19 +583,27 @@ class Created3DModelViewSet(mixins.ListModelMixin,
     search_fields = ['name'] 
 
     def get_queryset(self):
-        return Created3DModelM.objects.filter(owner=self.request.user)
+        queryset = Created3DModelM.objects.filter(owner=self.request.user)
+        if self.action == 'retrieve':
+            queryset = queryset | template_asset(Created3DModelM, 'custom3dElementId', self.kwargs.get('pk'))
+        if self.action == 'list':
+            return queryset.values(*Created3dModelReadSerializer.values_fields,
+                                   texture_inline=Created3dModelReadSerializer.inline())
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return Created3dModelReadSerializer
+        return Created3dModelSerializer
+
+    def bulk_created(self, objs):
+        for element in objs:
+            transaction.on_commit(partial(schedule_textures, element))
     
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def public_element(self, request, pk=None):
-        project_uuid =  request.query_params.get('project_uuid')
-        share = ProjectShare.objects.select_related('project').get(token=project_uuid)
-        project = share.project
-        allowed_elements = [int(item.get("custom3dElementId")) for item in project.steps if item.get("custom3dElementId")]
-        allowed_elements += [
-            int(i['data']['custom3dElementId'])
-            for i in project.connections
-            if i.get('data', {}) and i['data'].get('custom3dElementId')
-        ]
+        project = shared_project(request.query_params.get('project_uuid'), ATLAS_PROJECT_FIELDS)
+        allowed_elements = asset_ids(project, 'custom3dElementId')
         if int(pk) not in allowed_elements:
             raise NotFound()
         try:
@@ -103,7 +614,8 @@ class Created3DModelViewSet(mixins.ListModelMixin,
         return Response(serializer.data)
     
 
-class Uploaded3DModelViewSet(mixins.ListModelMixin,
+class Uploaded3DModelViewSet(BulkLibraryMixin,
+                            mixins.ListModelMixin,
                             mixins.CreateModelMixin,
                             mixins.RetrieveModelMixin,
                             mixins.DestroyModelMixin,
@@ -115,19 +627,38 @@ class Uploaded3DModelViewSet(mixins.ListModelMixin,
     search_fields = ['name'] 
 
     def get_queryset(self):
-        return Uploaded3DModel.objects.filter(owner=self.request.user) | Uploaded3DModel.objects.filter(system_model=True)
+        queryset = Uploaded3DModel.objects.filter(owner=self.request.user) | Uploaded3DModel.objects.filter(system_model=True)
+        if self.action == 'retrieve':
+            queryset = queryset | template_asset(Uploaded3DModel, 'uploadedModelId', self.kwargs.get('pk'))
+        if self.action in READ_ACTIONS:
+            return queryset.values(*Uploaded3dModelReadSerializer.values_fields)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action in READ_ACTIONS:
+            return Uploaded3dModelReadSerializer
+        return Uploaded3dModelSerializer
+
+    def perform_create(self, serializer):
+        model = serializer.save()
+        transaction.on_commit(lambda: schedule_lods(model))
+
+    def bulk_created(self, objs):
+        for model in objs:
+            transaction.on_commit(partial(schedule_lods, model))
+            transaction.on_commit(partial(queue_model, model.pk))
+
+    def bulk_deleting(self, queryset):
+        if queryset.filter(system_model=True).exists():
+            bump_version()
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(with_lod(request, self.get_serializer(self.get_object()).data))
 
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def public_model(self, request, pk=None):
-        project_uuid =  request.query_params.get('project_uuid')
-        share = ProjectShare.objects.select_related('project').get(token=project_uuid)
-        project = share.project
-        allowed_models = [int(item.get("uploadedModelId")) for item in project.steps if item.get("uploadedModelId")]
-        allowed_models += [
-            int(i['data']['uploadedModelId'])
-            for i in project.connections
-            if i.get('data', {}) and i['data'].get('uploadedModelId')
-        ]
+        project = shared_project(request.query_params.get('project_uuid'), ATLAS_PROJECT_FIELDS)
+        allowed_models = asset_ids(project, 'uploadedModelId')
         if int(pk) not in allowed_models:
             raise NotFound()
         try:
@@ -135,17 +666,94 @@ class Uploaded3DModelViewSet(mixins.ListModelMixin,
         except Uploaded3DModel.DoesNotExist:
             raise NotFound()
         serializer = self.get_serializer(element)
-        return Response(serializer.data)
+        return Response(with_lod(request, serializer.data))
     
 class PublicUploaded3DModelViewSet(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
-    serializer_class = Uploaded3dModelSerializer
+    serializer_class = Uploaded3dModelReadSerializer
     permission_classes = [AllowAny]
     pagination_class = None
     filter_backends = [filters.SearchFilter]
     search_fields = ['name'] 
 
     def get_queryset(self):
-        return Uploaded3DModel.objects.filter(system_model=True)
+        return Uploaded3DModel.objects.filter(system_model=True).values(*Uploaded3dModelReadSerializer.values_fields)
+
+    def list(self, request, *args, **kwargs):
+        # Every anonymous visitor gets the same catalogue: serve the cached,
+        # metadata-only copy and let repeat visitors revalidate with 304s.
+        catalogue = get_catalogue()
+        etag = f'"public-models-{catalogue["version"]}-{request.accepted_renderer.format}"'
+        last_modified = int(catalogue['last_modified'].timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            entries = catalogue['entries']
+            terms = [term.lower() for term in filters.SearchFilter().get_search_terms(request)]
+            if terms:
+                entries = [e for e in entries if all(term in e['name'].lower() for term in terms)]
+            response = mark_precompressible(
+                Response(entries), key=f'public-models:{catalogue["version"]}:{",".join(terms)}',
+            )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    @action(detail=True, methods=['get'], renderer_classes=[PassthroughRenderer])
+    def asset(self, request, pk=None):
+        model = self.get_object()
+        level = requested_lod(request)
+        variant = select_lod(model['id'], level) if level is not None else None
+        mime, content = split_data_url((variant or model)['model_data_url'])
+        if content is None:
+            raise NotFound()
+        response = HttpResponse(content, content_type=mime)
+        if 'v' in request.query_params:
+            # Catalogue URLs carry the catalogue version, so the bytes never change under them.
+            patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+        return response
+
+
+class AssetView(APIView):
+    """Serves content-addressed assets; the name embeds the content hash, so it never changes."""
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    renderer_classes = [PassthroughRenderer]
+
+    def get(self, request, name):
+        digest = name.split('.', 1)[0]
+        etag = f'"{digest}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            asset = StoredAsset.objects.filter(pk=digest).values('content_type', 'data').first()
+            if asset is None:
+                raise NotFound()
+            response = HttpResponse(bytes(asset['data']), content_type=asset['content_type'])
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+        return response
+
+
+class LabelView(APIView):
+    """Label texture for ``?text=&color=&font=&size=``; the parameters fully determine the image."""
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    renderer_classes = [PassthroughRenderer]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            label = validate(params.get('text', ''), params.get('color', '#000000'),
+                             params.get('font', DEFAULT_FONT), params.get('size', DEFAULT_SIZE))
+        except LabelError as exc:
+            raise ValidationError({'detail': str(exc)})
+        key, data = get_label(*label)
+        etag = f'"{key}"'
+        response = get_conditional_response(request, etag=etag) or HttpResponse(data, content_type='image/png')
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+        return response
 
 
 class SuggestionViewSet(mixins.CreateModelMixin, GenericViewSet):
@@ -2,6 +2,7 @@
 ASGI config for threeddocs project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections go to ``projects.collab``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -13,4 +14,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'threeddocs.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up: it uses the ORM.
+from projects.collab import application as collab_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await collab_application(scope, receive, send)
+    return await django_application(scope, receive, send)
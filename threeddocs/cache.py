@@ -0,0 +1,22 @@
+"""
+A local memory cache that never evicts live entries.
+
+``LocMemCache`` drops the oldest entries once it holds ``MAX_ENTRIES``, which
+is fine for cached responses but not for state whose loss changes behaviour,
+such as refresh token revocations (``authentication.tokens``). This backend
+only removes entries that have expired. When that frees too little it lets
+the cache grow and waits until it has doubled before scanning again, so a
+cache full of live entries costs one scan per doubling, not one per ``set``.
+"""
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class NoEvictionLocMemCache(LocMemCache):
+    def _cull(self):
+        now = time.time()
+        expired = [key for key, expires in self._expire_info.items() if expires is not None and expires <= now]
+        for key in expired:
+            self._delete(key)
+        self._max_entries = max(self._max_entries, 2 * len(self._cache))
@@ -0,0 +1,245 @@
+"""
+Response compression with Accept-Encoding negotiation.
+
+Supports gzip (always), brotli and zstd (when the ``brotli`` / ``zstandard``
+packages are installed). Views that return the same body to many clients can
+call ``mark_precompressible`` so the compressed bytes are kept in the cache and
+reused instead of being recompressed on every request.
+"""
+import hashlib
+import zlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/msgpack',
+    'application/cbor',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'model/gltf+json',
+    'text/',
+)
+
+
+class GzipCodec:
+    name = 'gzip'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compressobj(self):
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+
+class _BrotliStream:
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return self._obj.finish()
+
+
+class BrotliCodec:
+    name = 'br'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compressobj(self):
+        return _BrotliStream(self.level)
+
+
+class ZstdCodec:
+    name = 'zstd'
+
+    def __init__(self, level):
+        self.compressor = zstandard.ZstdCompressor(level=level)
+
+    def compressobj(self):
+        return self.compressor.compressobj()
+
+
+def compress_bytes(codec, data):
+    obj = codec.compressobj()
+    return obj.compress(data) + obj.flush()
+
+
+def compress_stream(codec, chunks):
+    obj = codec.compressobj()
+    for chunk in chunks:
+        out = obj.compress(chunk)
+        if out:
+            yield out
+    yield obj.flush()
+
+
+async def compress_async_stream(codec, chunks):
+    obj = codec.compressobj()
+    async for chunk in chunks:
+        out = obj.compress(chunk)
+        if out:
+            yield out
+    yield obj.flush()
+
+
+def _build_codecs(precompressed=False):
+    # Per-request bodies favour speed; bodies compressed once and cached
+    # can afford a slower, denser setting.
+    codecs = {'gzip': GzipCodec(9 if precompressed else 6)}
+    if brotli is not None:
+        codecs['br'] = BrotliCodec(9 if precompressed else 4)
+    if zstandard is not None:
+        codecs['zstd'] = ZstdCodec(12 if precompressed else 3)
+    return codecs
+
+
+CODECS = _build_codecs()
+PRECOMPRESSED_CODECS = _build_codecs(precompressed=True)
+
+
+# Settings are read per call so ``override_settings`` and runtime changes apply.
+def _min_size():
+    return getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+
+
+def _cache():
+    return caches[getattr(settings, 'COMPRESSION_CACHE_ALIAS', 'default')]
+
+
+def _cache_timeout():
+    return getattr(settings, 'COMPRESSION_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def _preferred_encodings():
+    """Server preference when the client gives several encodings the same q-value."""
+    return getattr(settings, 'COMPRESSION_ENCODINGS', ['zstd', 'br', 'gzip'])
+
+
+def parse_accept_encoding(header):
+    """Return ``{coding: q}`` for an ``Accept-Encoding`` header."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header, available=None):
+    """Pick the best supported encoding for ``header`` or ``None`` for identity."""
+    available = available if available is not None else CODECS
+    accepted = parse_accept_encoding(header or '')
+    best, best_q = None, 0.0
+    for coding in _preferred_encodings():
+        if coding not in available:
+            continue
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def mark_precompressible(response, key=None):
+    """
+    Allow the middleware to cache the compressed body of ``response``.
+
+    ``key`` should identify the body version (e.g. a token plus ``updated_at``);
+    when omitted the body's content hash is used.
+    """
+    response.precompressible = True
+    response.precompress_key = key
+    return response
+
+
+def _is_compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _precompressed(response, coding):
+    key = response.precompress_key
+    if key is None:
+        key = hashlib.blake2b(response.content, digest_size=20).hexdigest()
+    cache_key = 'precompressed:%s:%s' % (
+        coding,
+        hashlib.blake2b(f'{key}|{response.get("Content-Type", "")}'.encode(), digest_size=20).hexdigest(),
+    )
+    cache = _cache()
+    compressed = cache.get(cache_key)
+    if compressed is None:
+        compressed = compress_bytes(PRECOMPRESSED_CODECS[coding], response.content)
+        cache.set(cache_key, compressed, _cache_timeout())
+    return compressed
+
+
+class CompressionMiddleware:
+    """Compress responses with the best encoding the client accepts."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not _is_compressible(response):
+            return response
+        if not response.streaming and len(response.content) < _min_size():
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+
+        if response.streaming:
+            # Compress chunk by chunk so large bodies never sit in memory whole.
+            if response.is_async:
+                response.streaming_content = compress_async_stream(CODECS[coding], response.streaming_content)
+            else:
+                response.streaming_content = compress_stream(CODECS[coding], response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            if getattr(response, 'precompressible', False) and response.status_code == 200:
+                compressed = _precompressed(response, coding)
+            else:
+                compressed = compress_bytes(CODECS[coding], response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = coding
+        return response
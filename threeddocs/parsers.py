@@ -0,0 +1,207 @@
+"""
+Parsers matching the renderers in ``threeddocs.renderers``.
+
+Bodies are read in chunks and rejected with 413 as soon as they outgrow
+``REQUEST_MAX_BODY_BYTES``, without buffering the rest. JSON is also scanned
+while it arrives (``JSONLimits``): a string longer than
+``JSON_MAX_STRING_BYTES`` (the size of the largest accepted data URL),
+nesting deeper than ``JSON_MAX_DEPTH`` or more members than
+``JSON_MAX_ITEMS`` allows under a top-level key (``steps``, …) aborts the
+request mid-stream, so worker memory stays bounded by the limits rather than
+by what a client sends. MessagePack and CBOR bodies are checked against the
+same limits once decoded (``check_limits``); while they are read only the
+body limit applies.
+"""
+import json
+
+import orjson
+import msgpack
+import cbor2
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import BaseParser
+
+from .renderers import CBORRenderer, MessagePackRenderer, ORJSONRenderer
+
+CHUNK_SIZE = 64 * 1024
+# Bytes dropped from the JSON outside strings before it is walked: all but brackets, commas and quotes.
+NON_STRUCTURAL = bytes(set(range(256)) - set(b'[]{},"'))
+QUOTE, COMMA, OPEN_ARRAY, OPEN_OBJECT = b'",[{'
+# Longest prefix of a string kept to look it up as a key.
+KEY_PREFIX = 256
+
+
+class RequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Request body too large.'
+    default_code = 'request_too_large'
+
+
+class JSONLimits:
+    """
+    Incremental check of a JSON document against the size limits. ``feed``
+    gets the whole buffer read so far and looks at the bytes added since the
+    last call; the document is not validated (the final parse does that),
+    only measured.
+
+    To stay cheap next to orjson the scan avoids a Python step per token:
+    escapes are masked and the text split on quotes with bytes methods, so
+    only brackets, commas and one marker per string are walked in Python.
+    """
+
+    def __init__(self):
+        self.max_string = settings.JSON_MAX_STRING_BYTES
+        self.max_depth = settings.JSON_MAX_DEPTH
+        self.max_items = settings.JSON_MAX_ITEMS
+        self.pos = 0
+        # The string open at ``pos``, if any: bytes so far and its first KEY_PREFIX bytes.
+        self.in_string = False
+        self.string_length = 0
+        self.string_head = b''
+        # Last complete string: a container opening in the top-level object follows its key.
+        self.last_string = b''
+        # One frame per open container: [separators seen, item limit, top-level key]
+        self.stack = []
+        self.top_is_object = False
+
+    def feed(self, buffer):
+        end = len(buffer)
+        # A trailing backslash may escape the next chunk's first byte: keep it for later.
+        while end > self.pos and buffer[end - 1] == 0x5C:
+            end -= 1
+        # Escapes become same-length filler so that only real quotes split the text.
+        pieces = buffer[self.pos:end].replace(b'\\\\', b'__').replace(b'\\"', b'__').split(b'"')
+        self.pos = end
+        if self.in_string:
+            pieces.insert(0, b'')
+        # Even pieces lie outside strings, odd ones inside; the last string may still be open.
+        strings = pieces[1::2]
+        if strings:
+            if self.in_string:
+                carried = self.string_length
+                strings[0] = self.string_head + strings[0][:KEY_PREFIX]
+            else:
+                carried = 0
+            self._check_string(max(len(pieces[1]) + carried, max(map(len, strings))))
+            if len(pieces) % 2 == 0:
+                self.string_length = len(pieces[-1]) + (carried if len(strings) == 1 else 0)
+                self.string_head = strings[-1][:KEY_PREFIX]
+        self.in_string = len(pieces) % 2 == 0
+        self._walk(b'"'.join(pieces[0::2]).translate(None, NON_STRUCTURAL), strings)
+
+    def _walk(self, structure, strings):
+        stack, closed = self.stack, 0
+        for byte in structure:
+            if byte == QUOTE:
+                closed += 1
+            elif byte == COMMA:
+                if stack:
+                    frame = stack[-1]
+                    frame[0] += 1
+                    # n separators mean at least n + 1 members.
+                    if frame[1] is not None and frame[0] >= frame[1]:
+                        raise RequestTooLarge(f'"{frame[2]}" is limited to {frame[1]} items.')
+            elif byte == OPEN_ARRAY or byte == OPEN_OBJECT:
+                if len(stack) >= self.max_depth:
+                    raise RequestTooLarge(f'JSON nested deeper than {self.max_depth} levels.')
+                key = None
+                if len(stack) == 1 and self.top_is_object:
+                    key = (strings[closed - 1] if closed else self.last_string).decode('utf-8', 'replace')
+                elif not stack:
+                    self.top_is_object = byte == OPEN_OBJECT
+                stack.append([0, self.max_items.get(key), key])
+            elif stack:
+                stack.pop()
+        if closed:
+            self.last_string = strings[closed - 1][:KEY_PREFIX]
+
+    def _check_string(self, length):
+        if length > self.max_string:
+            raise RequestTooLarge(f'JSON strings are limited to {self.max_string} bytes.')
+
+
+def _measured(value):
+    """Stand-ins with the same JSON size for values JSON has no type for."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return ' ' * len(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def check_limits(data):
+    """
+    Apply ``JSONLimits`` to an already decoded body (MessagePack, CBOR) by
+    scanning its JSON form, which orjson writes faster than Python could walk
+    the objects. Binary strings count as strings of the same length.
+    """
+    try:
+        body = orjson.dumps(data, default=_measured, option=orjson.OPT_NON_STR_KEYS)
+    except orjson.JSONEncodeError:
+        # Integers wider than 64 bits, keys orjson cannot write, or nesting past its 255 levels.
+        try:
+            body = json.dumps(data, default=_measured, skipkeys=True, ensure_ascii=False,
+                              separators=(',', ':')).encode('utf-8', 'surrogatepass')
+        except RecursionError:
+            raise RequestTooLarge(f'Bodies nested deeper than {settings.JSON_MAX_DEPTH} levels.')
+    JSONLimits().feed(body)
+    return data
+
+
+def read_body(stream, parser_context=None, limits=None):
+    """Read a request body in chunks, enforcing ``REQUEST_MAX_BODY_BYTES`` and ``limits`` as it arrives."""
+    max_body = settings.REQUEST_MAX_BODY_BYTES
+    request = (parser_context or {}).get('request')
+    declared = request.META.get('CONTENT_LENGTH') if request is not None else None
+    if declared and declared.isdigit() and int(declared) > max_body:
+        raise RequestTooLarge(f'Request bodies are limited to {max_body} bytes.')
+    buffer = bytearray()
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            return buffer
+        buffer += chunk
+        if len(buffer) > max_body:
+            raise RequestTooLarge(f'Request bodies are limited to {max_body} bytes.')
+        if limits is not None:
+            limits.feed(buffer)
+
+
+class ORJSONParser(BaseParser):
+    """Drop-in replacement for ``JSONParser`` backed by orjson, enforcing ``JSONLimits`` while reading."""
+
+    media_type = 'application/json'
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        body = read_body(stream, parser_context, JSONLimits())
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        # TypeError: a map key Python cannot hash, such as an array (b'\x81\x90\x00').
+        try:
+            data = msgpack.unpackb(read_body(stream, parser_context), raw=False, strict_map_key=False)
+        except (TypeError, ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
+        return check_limits(data)
+
+
+class CBORParser(BaseParser):
+    media_type = 'application/cbor'
+    renderer_class = CBORRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            data = cbor2.loads(read_body(stream, parser_context))
+        except (ValueError, RecursionError, cbor2.CBORDecodeError) as exc:
+            raise ParseError('CBOR parse error - %s' % str(exc))
+        return check_limits(data)
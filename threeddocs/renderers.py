@@ -0,0 +1,91 @@
+"""
+Faster renderers for editor traffic.
+
+``ORJSONRenderer`` produces the same compact JSON as DRF's ``JSONRenderer``
+but encodes in C. ``MessagePackRenderer`` and ``CBORRenderer`` are picked when
+the client sends ``Accept: application/msgpack`` / ``application/cbor``.
+"""
+import re
+
+import orjson
+import msgpack
+import cbor2
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+# A float orjson writes differently from Python's ``repr`` (which ``json`` and
+# so ``JSONRenderer`` use): in exponent form (``1e16`` for ``1e+16``) or a
+# plain decimal below 1e-4 (``0.00001`` for ``1e-05``). Matches in strings only
+# cost the fallback.
+FLOAT_MISMATCH = re.compile(rb'[:,\[]-?(?:\d+(?:\.\d+)?e|0\.0000)')
+
+
+def to_primitive(obj):
+    """Convert values the binary codecs do not know (Decimal, lazy strings, …) like DRF's JSON encoder does."""
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in replacement for ``JSONRenderer`` backed by orjson."""
+
+    # Datetimes go through ``to_primitive`` so UTC is written ``Z``, as DRF does, not ``+00:00``.
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        # orjson can only indent by two spaces; let DRF handle pretty printing
+        # (e.g. the browsable API) and anything orjson refuses, such as
+        # integers wider than 64 bits, or writes differently (FLOAT_MISMATCH).
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=to_primitive, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if FLOAT_MISMATCH.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep the output a strict JavaScript subset, as JSONRenderer does.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=to_primitive, use_bin_type=True)
+
+
+class CBORRenderer(BaseRenderer):
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return cbor2.dumps(data, default=lambda encoder, value: encoder.encode(to_primitive(value)))
+
+
+class PassthroughRenderer(BaseRenderer):
+    """Lets views that return raw ``HttpResponse`` bodies (assets) accept any ``Accept`` header."""
+
+    media_type = '*/*'
+    format = ''
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
@@ -34,10 +34,12 @@ INSTALLED_APPS = [
     #apps
     'authentication',
     'projects',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'threeddocs.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -86,6 +88,42 @@ DATABASES = {
 
 
 
+# Cache
+# A shared cache (Redis) is needed for cached data to be reused across workers.
+
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Refresh token state (authentication.tokens) must never be evicted: a dropped
+# revocation would make a revoked token valid again. Point TOKEN_REDIS_URL at a
+# Redis running with ``maxmemory-policy noeviction``, apart from the response cache.
+TOKEN_REDIS_URL = os.getenv('TOKEN_REDIS_URL')
+TOKEN_FAMILY_CACHE_ALIAS = 'tokens'
+if TOKEN_REDIS_URL:
+    CACHES['tokens'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': TOKEN_REDIS_URL,
+    }
+else:
+    CACHES['tokens'] = {
+        'BACKEND': 'threeddocs.cache.NoEvictionLocMemCache',
+        'LOCATION': 'tokens',
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -144,12 +182,24 @@ REST_FRAMEWORK = {
         'user': '10000/day',   # 1000 żądań na użytkownika dziennie
         'anon': '1000/day',   
     },
+    'DEFAULT_RENDERER_CLASSES': [
+        'threeddocs.renderers.ORJSONRenderer',
+        'threeddocs.renderers.MessagePackRenderer',
+        'threeddocs.renderers.CBORRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'threeddocs.parsers.ORJSONParser',
+        'threeddocs.parsers.MessagePackParser',
+        'threeddocs.parsers.CBORParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ]
 }
+# For load tests only (``manage.py loadtest``): the day rates above would
+# otherwise answer most of a run with 429s.
+if os.getenv('DJANGO_DISABLE_THROTTLING'):
+    REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'] = []
 
 AUTH_USER_MODEL = 'authentication.UserM'
 
@@ -166,6 +216,12 @@ JWT_COOKIE_HTTPONLY = False
 JWT_COOKIE_SAMESITE = None
 JWT_COOKIE_SECURE = False
 
+# How long a password reset link works, and the default lifetime of project
+# share links (None: until the owner deletes the project). Expired rows are
+# removed by ``purge_expired_tokens``.
+RESET_PASSWORD_TTL = timedelta(hours=1)
+SHARE_LINK_TTL = None
+
 # SimpleJWT token lifetimes
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
@@ -176,6 +232,66 @@ SIMPLE_JWT = {
     'SIGNING_KEY': SECRET_KEY,
 }
 
+# Refresh tokens are rotated and tracked per login in the cache (authentication.tokens).
+# A replaced refresh token is still honoured this many seconds (concurrent refreshes).
+REFRESH_REUSE_GRACE = 10
+
+# Response compression (gzip always; brotli / zstd when installed)
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_ENCODINGS = ['zstd', 'br', 'gzip']
+
+# Processes for CPU-bound background jobs (projects.jobs); 0 runs them inline.
+BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', '2'))
+
+# Level-of-detail variants (percent of triangles kept) built for uploaded models.
+LOD_LEVELS = [50, 10]
+
+# Texture variants built for created elements: largest/smallest power-of-two edge.
+TEXTURE_MAX_SIZE = 2048
+TEXTURE_MIN_SIZE = 32
+
+# Seconds after an edit before project/model thumbnails are re-rendered.
+THUMBNAIL_DELAY = 30
+
+# Fonts for server-rendered element labels: name -> TrueType path (None = Pillow's built-in font).
+LABEL_FONTS = {'default': None}
+
+# Collaborative editing (projects.collab): seconds between coalesced node-move
+# broadcasts and between merges into the database.
+COLLAB_TICK = 0.05
+COLLAB_PERSIST_INTERVAL = 5
+
+# Seconds between writes of buffered share link open counts (projects.analytics).
+SHARE_VIEW_FLUSH_INTERVAL = 5
+
+# ``sweep_assets``: stored assets no row references are deleted once this old
+# (longer than atlas manifests stay cached, see projects.atlas), and texture or
+# LOD jobs still 'processing' after STALE_JOB_TIMEOUT are started again.
+ASSET_GC_GRACE = timedelta(days=8)
+STALE_JOB_TIMEOUT = timedelta(hours=1)
+
+# Seconds a deletion job (projects.deletion) pauses between batches, to leave
+# the database room for other writes.
+DELETION_PAUSE = 0.05
+
+# Engine for new projects' steps and connections (projects.storage): 'rows'
+# (one table row per step and edge) or 'document' (JSON columns on Project).
+PROJECT_STORAGE = os.getenv('PROJECT_STORAGE', 'rows')
+
+# Project JSON columns (projects.fields.CompressedJSONField): 'zstd' compresses
+# writes against the newest trained dictionary, 'json' stores them plain.
+PROJECT_JSON_CODEC = os.getenv('PROJECT_JSON_CODEC', 'zstd')
+PROJECT_JSON_LEVEL = 3
+
+# Request body limits (threeddocs.parsers), enforced while the body is read;
+# anything over them is rejected with 413. The string limit fits a data URL of
+# the largest accepted upload (10 MB, base64-encoded).
+REQUEST_MAX_BODY_BYTES = 16 * 1024 * 1024
+JSON_MAX_STRING_BYTES = 14 * 1024 * 1024
+JSON_MAX_DEPTH = 64
+# Top-level key -> most members its array/object may have.
+JSON_MAX_ITEMS = {'steps': 5000, 'connections': 20000, 'guide': 5000, 'nodePositions': 20000}
+
 CSRF_TRUSTED_ORIGINS = os.getenv("CSRF_TRUSTED_ORIGINS", "").split(",")
 
 GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')